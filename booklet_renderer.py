@@ -0,0 +1,376 @@
+# booklet_renderer.py
+"""
+Booklet renderer: parses markdown once into a small AST and emits HTML,
+Markdown and DOCX from it
+DOCX uses python-docx when installed, otherwise pandoc (all pandoc outputs
+run as parallel subprocesses)
+"""
+
+import re
+import html
+import shutil
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple, Union
+
+from document_writer import join_chunks, write_document
+
+# Optional: native DOCX output
+try:
+    import docx
+    from docx.shared import Pt
+    DOCX_AVAILABLE = True
+except ImportError:
+    DOCX_AVAILABLE = False
+
+HEADING = re.compile(r'^(#{1,6})\s+(.*?)\s*$')
+RULE = re.compile(r'^(?:-{3,}|\*{3,}|_{3,})\s*$')
+FENCE = re.compile(r'^```\s*(\S*)')
+CHECK_ITEM = re.compile(r'^\s*[-*+]\s+\[([^\]]{0,2})\]\s*(.*)$')
+BULLET_ITEM = re.compile(r'^\s*[-*+]\s+(.*)$')
+ORDERED_ITEM = re.compile(r'^\s*(\d+)\.\s+(.*)$')
+INLINE = re.compile(r'\*\*(.+?)\*\*|\*([^*\s](?:[^*]*?[^*\s])?)\*|`([^`]+)`')
+HARD_BREAK = re.compile(r' {2,}\n')
+
+CHECK_MARKS = {"x": "✅", "X": "✅", " ": "⬜", "": "⬜"}
+LIST_KINDS = ("check", "bullet", "ordered")
+
+Span = Tuple[str, str]  # (style, text): style is "", "bold", "italic" or "code"
+
+@dataclass
+class Block:
+    kind: str                  # heading | paragraph | check | bullet | ordered | code | rule
+    text: str = ""
+    level: int = 0             # heading level
+    marker: str = ""           # check status, ordered number or code language
+    spans: List[Span] = field(default_factory=list)
+
+def parse_inline(text: str) -> List[Span]:
+    """Split text into plain/bold/italic/code spans"""
+    spans = []
+    position = 0
+    for match in INLINE.finditer(text):
+        if match.start() > position:
+            spans.append(("", text[position:match.start()]))
+        bold, italic, code = match.groups()
+        if bold is not None:
+            spans.append(("bold", bold))
+        elif italic is not None:
+            spans.append(("italic", italic))
+        else:
+            spans.append(("code", code))
+        position = match.end()
+    if position < len(text):
+        spans.append(("", text[position:]))
+    return spans
+
+def parse_markdown(markdown: str) -> List[Block]:
+    """Parse the booklet markdown subset (headings, paragraphs, lists, checklists, code, rules)"""
+    blocks: List[Block] = []
+    paragraph: List[str] = []
+    code: Optional[List[str]] = None
+    code_lang = ""
+
+    def flush_paragraph():
+        if paragraph:
+            text = "\n".join(paragraph)
+            blocks.append(Block("paragraph", text, spans=parse_inline(text)))
+            paragraph.clear()
+
+    for line in markdown.split("\n"):
+        if code is not None:
+            if FENCE.match(line):
+                blocks.append(Block("code", "\n".join(code), marker=code_lang))
+                code = None
+            else:
+                code.append(line)
+            continue
+
+        fence = FENCE.match(line)
+        if fence:
+            flush_paragraph()
+            code, code_lang = [], fence.group(1)
+            continue
+        if not line.strip():
+            flush_paragraph()
+            continue
+
+        heading = HEADING.match(line)
+        if heading:
+            flush_paragraph()
+            text = heading.group(2)
+            blocks.append(Block("heading", text, level=len(heading.group(1)), spans=parse_inline(text)))
+            continue
+        if RULE.match(line):
+            flush_paragraph()
+            blocks.append(Block("rule"))
+            continue
+
+        item = CHECK_ITEM.match(line)
+        kind = "check"
+        if not item:
+            item, kind = ORDERED_ITEM.match(line), "ordered"
+        if not item:
+            item, kind = BULLET_ITEM.match(line), "bullet"
+        if item:
+            flush_paragraph()
+            marker, text = item.groups() if kind != "bullet" else ("", item.group(1))
+            text = text.rstrip()
+            blocks.append(Block(kind, text, marker=marker, spans=parse_inline(text)))
+            continue
+
+        paragraph.append(line)
+
+    flush_paragraph()
+    if code is not None:  # unterminated fence
+        blocks.append(Block("code", "\n".join(code), marker=code_lang))
+    return blocks
+
+# ---------------------------------------------------------------------------
+# Markdown
+# ---------------------------------------------------------------------------
+
+def render_markdown(blocks: Sequence[Block]) -> Iterator[str]:
+    """Normalised markdown; consecutive list items stay together"""
+    previous = None
+    for block in blocks:
+        if previous is not None:
+            tight = block.kind in LIST_KINDS and block.kind == previous.kind
+            yield "\n" if tight else "\n\n"
+        if block.kind == "heading":
+            yield f"{'#' * block.level} {block.text}"
+        elif block.kind == "check":
+            yield f"- [{block.marker}] {block.text}"
+        elif block.kind == "bullet":
+            yield f"- {block.text}"
+        elif block.kind == "ordered":
+            yield f"{block.marker}. {block.text}"
+        elif block.kind == "code":
+            yield f"```{block.marker}\n{block.text}\n```"
+        elif block.kind == "rule":
+            yield "---"
+        else:
+            yield block.text
+        previous = block
+    yield "\n"
+
+# ---------------------------------------------------------------------------
+# HTML
+# ---------------------------------------------------------------------------
+
+@dataclass
+class HtmlOptions:
+    """
+    Page template for one booklet script.
+    `section_classes` wraps a heading and its content in <div class=...> when
+    the heading level matches and its text contains one of the keywords;
+    `paragraph_classes` does the same for single paragraphs.
+    """
+    title: str = "Cuaderno de Revisión GCSE Español"
+    css: str = ""
+    stylesheet: Optional[str] = None
+    container: bool = False
+    section_classes: List[Tuple[int, Tuple[str, ...], str]] = field(default_factory=list)
+    paragraph_classes: List[Tuple[str, str]] = field(default_factory=list)
+    footer: str = ""
+
+def _inline_html(spans: List[Span]) -> str:
+    parts = []
+    for style, text in spans:
+        text = html.escape(text, quote=False)
+        if style == "bold":
+            parts.append(f"<strong>{text}</strong>")
+        elif style == "italic":
+            parts.append(f"<em>{text}</em>")
+        elif style == "code":
+            parts.append(f"<code>{text}</code>")
+        else:
+            parts.append(text)
+    return HARD_BREAK.sub("<br>\n", "".join(parts))
+
+def _match_class(text: str, rules) -> Optional[str]:
+    for keywords, css_class in rules:
+        if any(keyword in text for keyword in keywords):
+            return css_class
+    return None
+
+def render_html(blocks: Sequence[Block], options: Optional[HtmlOptions] = None) -> Iterator[str]:
+    """Full HTML page, yielded in chunks"""
+    options = options or HtmlOptions()
+    yield (
+        '<!DOCTYPE html>\n<html lang="es">\n<head>\n'
+        '    <meta charset="UTF-8">\n'
+        '    <meta name="viewport" content="width=device-width, initial-scale=1.0">\n'
+        f'    <title>{html.escape(options.title)}</title>\n'
+    )
+    if options.stylesheet:
+        yield f'    <link rel="stylesheet" href="{html.escape(options.stylesheet)}">\n'
+    if options.css:
+        yield f"    <style>\n{options.css}\n    </style>\n"
+    yield "</head>\n<body>\n"
+    if options.container:
+        yield '<div class="container">\n'
+
+    open_sections: List[int] = []  # heading levels of the open <div>s
+    open_list: Optional[str] = None
+    paragraph_rules = [((keyword,), css_class) for keyword, css_class in options.paragraph_classes]
+
+    for block in blocks:
+        list_tag = "ol" if block.kind == "ordered" else "ul"
+        if open_list and (block.kind not in LIST_KINDS or list_tag != open_list):
+            yield f"</{open_list}>\n"
+            open_list = None
+
+        if block.kind == "heading":
+            while open_sections and open_sections[-1] >= block.level:
+                open_sections.pop()
+                yield "</div>\n"
+            rules = [(keywords, css_class) for level, keywords, css_class in options.section_classes
+                     if level == block.level]
+            css_class = _match_class(block.text, rules)
+            if css_class:
+                yield f'<div class="{css_class}">'
+                open_sections.append(block.level)
+            yield f"<h{block.level}>{_inline_html(block.spans)}</h{block.level}>\n"
+        elif block.kind in LIST_KINDS:
+            if not open_list:
+                open_list = list_tag
+                yield f"<{list_tag}>\n"
+            prefix = f"{CHECK_MARKS.get(block.marker, block.marker)} " if block.kind == "check" else ""
+            yield f"<li>{prefix}{_inline_html(block.spans)}</li>\n"
+        elif block.kind == "code":
+            yield f"<pre><code>{html.escape(block.text, quote=False)}\n</code></pre>\n"
+        elif block.kind == "rule":
+            while open_sections:
+                open_sections.pop()
+                yield "</div>\n"
+            yield "<hr>\n"
+        else:
+            css_class = _match_class(block.text, paragraph_rules)
+            class_attr = f' class="{css_class}"' if css_class else ""
+            yield f"<p{class_attr}>{_inline_html(block.spans)}</p>\n"
+
+    if open_list:
+        yield f"</{open_list}>\n"
+    for _ in open_sections:
+        yield "</div>\n"
+    if options.footer:
+        yield options.footer
+    if options.container:
+        yield "</div>\n"
+    yield "</body>\n</html>\n"
+
+# ---------------------------------------------------------------------------
+# DOCX
+# ---------------------------------------------------------------------------
+
+def render_docx(blocks: Sequence[Block], path: str):
+    """Write a Word document with python-docx"""
+    document = docx.Document()
+    style = document.styles["Normal"]
+    style.font.name = "Arial"
+    style.font.size = Pt(11)
+
+    def add_runs(paragraph, spans: List[Span]):
+        for span_style, text in spans:
+            run = paragraph.add_run(text.replace("  \n", "\n"))
+            run.bold = span_style == "bold"
+            run.italic = span_style == "italic"
+            if span_style == "code":
+                run.font.name = "Courier New"
+
+    for block in blocks:
+        if block.kind == "heading":
+            add_runs(document.add_heading(level=min(block.level, 9)), block.spans)
+        elif block.kind == "check":
+            paragraph = document.add_paragraph(style="List Bullet")
+            paragraph.add_run(f"{CHECK_MARKS.get(block.marker, block.marker)} ")
+            add_runs(paragraph, block.spans)
+        elif block.kind == "bullet":
+            add_runs(document.add_paragraph(style="List Bullet"), block.spans)
+        elif block.kind == "ordered":
+            add_runs(document.add_paragraph(style="List Number"), block.spans)
+        elif block.kind == "code":
+            run = document.add_paragraph().add_run(block.text)
+            run.font.name = "Courier New"
+            run.font.size = Pt(9)
+        elif block.kind == "rule":
+            document.add_paragraph()
+        else:
+            add_runs(document.add_paragraph(), block.spans)
+    document.save(path)
+
+def pandoc_available() -> bool:
+    return shutil.which("pandoc") is not None
+
+def run_pandoc(markdown: str, outputs: Sequence[str], extra_args: Sequence[str] = ()) -> Dict[str, Optional[str]]:
+    """
+    Convert one markdown text to several files, one pandoc subprocess per
+    output, all running in parallel. Returns {path: error or None}.
+    """
+    def convert(path: str) -> Optional[str]:
+        result = subprocess.run(
+            ["pandoc", "-f", "markdown", "-o", path, *extra_args],
+            input=markdown, capture_output=True, text=True, encoding="utf-8"
+        )
+        if result.returncode:
+            return result.stderr.strip() or f"pandoc exited with {result.returncode}"
+        return None
+
+    if not outputs:
+        return {}
+    with ThreadPoolExecutor(max_workers=len(outputs)) as pool:
+        return dict(zip(outputs, pool.map(convert, outputs)))
+
+# ---------------------------------------------------------------------------
+# Export
+# ---------------------------------------------------------------------------
+
+def docx_available() -> bool:
+    return DOCX_AVAILABLE or pandoc_available()
+
+def export_booklet(source: Union[str, Sequence[Block]], outputs: Dict[str, str],
+                   html_options: Optional[HtmlOptions] = None) -> Dict[str, str]:
+    """
+    Render a booklet to every format in `outputs` ({"md"|"html"|"docx": path})
+    from a single parse. Returns the formats that were written.
+
+    Usage:
+        export_booklet(markdown_content, {"md": "booklet.md", "html": "booklet.html", "docx": "booklet.docx"},
+                       HtmlOptions(title="Cuaderno"))
+    """
+    blocks = parse_markdown(source) if isinstance(source, str) else source
+    written = {}
+
+    # Start pandoc first so it runs while the native formats are written
+    pandoc_job = None
+    executor = None
+    if "docx" in outputs and not DOCX_AVAILABLE:
+        if pandoc_available():
+            executor = ThreadPoolExecutor(max_workers=1)
+            pandoc_job = executor.submit(run_pandoc, join_chunks(render_markdown(blocks)), [outputs["docx"]])
+        else:
+            print("⚠️  DOCX skipped: install python-docx or pandoc")
+
+    try:
+        if "md" in outputs:
+            write_document(outputs["md"], render_markdown(blocks))
+            written["md"] = outputs["md"]
+        if "html" in outputs:
+            write_document(outputs["html"], render_html(blocks, html_options))
+            written["html"] = outputs["html"]
+        if "docx" in outputs and DOCX_AVAILABLE:
+            render_docx(blocks, outputs["docx"])
+            written["docx"] = outputs["docx"]
+
+        if pandoc_job:
+            for path, error in pandoc_job.result().items():
+                if error:
+                    print(f"⚠️  pandoc failed for {path}: {error}")
+                else:
+                    written["docx"] = path
+    finally:
+        if executor:
+            executor.shutdown()
+    return written
@@ -0,0 +1,82 @@
+# document_writer.py
+"""
+Streaming document output for the booklet scripts
+Documents are produced as chunks (usually by a generator) and written straight
+to an open file, an io.StringIO, or a list that is joined once at the end
+"""
+
+import io
+from typing import IO, Iterable, List, Optional
+
+class DocumentWriter:
+    """
+    Chunk sink for markdown/HTML documents.
+
+    Writing never concatenates strings: chunks go to `sink` (an open text
+    file or io.StringIO) as they arrive, or into a list when there is no
+    sink, so time and memory stay linear however large the booklet grows.
+
+    Usage:
+        with DocumentWriter.to_file("booklet.html") as doc:
+            doc.write_all(render_html(blocks))
+
+        doc = DocumentWriter()
+        doc.write("# Título\n")
+        text = doc.getvalue()
+    """
+
+    def __init__(self, sink: Optional[IO[str]] = None):
+        self.sink = sink
+        self.parts: List[str] = []
+        self.chars = 0
+        self._owns_sink = False
+
+    @classmethod
+    def to_file(cls, path: str, buffering: int = 1 << 16) -> "DocumentWriter":
+        writer = cls(open(path, 'w', encoding='utf-8', buffering=buffering))
+        writer._owns_sink = True
+        return writer
+
+    def write(self, chunk: str):
+        if not chunk:
+            return
+        self.chars += len(chunk)
+        if self.sink is None:
+            self.parts.append(chunk)
+        else:
+            self.sink.write(chunk)
+
+    def write_all(self, chunks: Iterable[str]) -> "DocumentWriter":
+        for chunk in chunks:
+            self.write(chunk)
+        return self
+
+    def getvalue(self) -> str:
+        """The document so far (only for in-memory writers)"""
+        if self.sink is None:
+            if len(self.parts) > 1:
+                self.parts = ["".join(self.parts)]
+            return self.parts[0] if self.parts else ""
+        if isinstance(self.sink, io.StringIO):
+            return self.sink.getvalue()
+        raise ValueError("Document was streamed to a file; read it back from disk")
+
+    def close(self):
+        if self._owns_sink:
+            self.sink.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+def join_chunks(chunks: Iterable[str]) -> str:
+    """Build a document string with a single join"""
+    return DocumentWriter().write_all(chunks).getvalue()
+
+def write_document(path: str, chunks: Iterable[str]) -> int:
+    """Stream chunks into `path` (UTF-8); returns the number of characters written"""
+    with DocumentWriter.to_file(path) as doc:
+        doc.write_all(chunks)
+    return doc.chars
@@ -1,8 +1,11 @@
 # final_comprehensive_spanish_revision.py
-import re
-from typing import Dict, List, Tuple, Set
+from typing import Dict, Iterator, List, Tuple, Set
 
-def create_complete_revision_booklet():
+from booklet_renderer import HtmlOptions, export_booklet
+from document_writer import join_chunks
+from vocabulary_coverage import VocabularyMatcher
+
+def create_complete_revision_booklet(docx: bool = True):
     """Generate a comprehensive Spanish revision booklet using ALL vocabulary words"""
     
     # Complete vocabulary list
@@ -249,13 +252,15 @@ def create_complete_revision_booklet():
     used_words = track_vocabulary_usage(paragraphs, vocabulary)
     
     # Create final content
-    markdown_content = create_final_markdown(paragraphs, vocabulary, used_words)
+    markdown_content = join_chunks(final_markdown_chunks(paragraphs, vocabulary, used_words))
     
-    # Write files
-    with open('final_spanish_revision_booklet.md', 'w', encoding='utf-8') as f:
-        f.write(markdown_content)
+    # One parse, every format
+    outputs = {"md": "final_spanish_revision_booklet.md", "html": "final_spanish_revision_booklet.html"}
+    if docx:
+        outputs["docx"] = "final_spanish_revision_booklet.docx"
+    written = export_booklet(markdown_content, outputs, HTML_OPTIONS)
     
-    create_final_html(markdown_content)
+    print("📱 HTML preview created: final_spanish_revision_booklet.html")
     
     # Report results
     total_words = sum(len(word_list) for word_list in vocabulary.values())
@@ -268,8 +273,10 @@ def create_complete_revision_booklet():
         unused = check_unused_words(vocabulary, used_words)
         print("⚠️ Missing words:", unused)
     
-    print("\n📝 To convert to Word:")
-    print("   pandoc final_spanish_revision_booklet.md -o final_spanish_revision_booklet.docx")
+    if "docx" in written:
+        print(f"📄 Word document created: {written['docx']}")
+    
+    return written
 
 def generate_all_inclusive_paragraphs(vocabulary: Dict) -> List[Tuple[str, str]]:
     """Generate paragraphs that systematically include ALL vocabulary words"""
@@ -539,15 +546,11 @@ def generate_all_inclusive_paragraphs(vocabulary: Dict) -> List[Tuple[str, str]]
 
 def track_vocabulary_usage(paragraphs: List[Tuple[str, str]], vocabulary: Dict) -> Set[str]:
     """Track which vocabulary words are used in the paragraphs"""
-    used_words = set()
     all_text = " ".join([text for _, text in paragraphs])
     
-    for category, word_list in vocabulary.items():
-        for word, _ in word_list:
-            if f"**{word}**" in all_text:
-                used_words.add(word)
-    
-    return used_words
+    # One pass over the text for the whole vocabulary (bold words only)
+    words = [word for word_list in vocabulary.values() for word, _ in word_list]
+    return VocabularyMatcher(words, bold_only=True).used_words(all_text)
 
 def check_unused_words(vocabulary: Dict, used_words: Set[str]) -> List[str]:
     """Check which words were not used"""
@@ -558,10 +561,10 @@ def check_unused_words(vocabulary: Dict, used_words: Set[str]) -> List[str]:
                 unused.append(word)
     return unused
 
-def create_final_markdown(paragraphs: List[Tuple[str, str]], vocabulary: Dict, used_words: Set[str]) -> str:
-    """Create the final comprehensive markdown content"""
+def final_markdown_chunks(paragraphs: List[Tuple[str, str]], vocabulary: Dict, used_words: Set[str]) -> Iterator[str]:
+    """Yield the final comprehensive markdown content in chunks"""
     
-    content = """# 📚 Cuaderno de Revisión GCSE Español - VERSIÓN COMPLETA
+    yield """# 📚 Cuaderno de Revisión GCSE Español - VERSIÓN COMPLETA
 ## Tema 1, Unidad 1: Identidad y relaciones con otros
 
 *¡Cuaderno completo con TODOS los 221 términos de vocabulario requeridos integrados en contexto natural!*
@@ -572,11 +575,11 @@ def create_final_markdown(paragraphs: List[Tuple[str, str]], vocabulary: Dict, u
     
     # Add all paragraphs
     for i, (title, text) in enumerate(paragraphs, 1):
-        content += f"## Párrafo {i}: {title}\n\n"
-        content += f"{text}\n\n"
+        yield f"## Párrafo {i}: {title}\n\n"
+        yield f"{text}\n\n"
     
-    content += "---\n\n"
-    content += "## ✅ Lista de Verificación COMPLETA de Vocabulario\n\n"
+    yield "---\n\n"
+    yield "## ✅ Lista de Verificación COMPLETA de Vocabulario\n\n"
     
     # Add complete vocabulary checklist with verification
     total_count = 0
@@ -590,7 +593,7 @@ def create_final_markdown(paragraphs: List[Tuple[str, str]], vocabulary: Dict, u
         ('verbs', 'Verbos (verbs)'),
         ('n_mf', 'Sustantivos masculinos/femeninos (n_mf)')
     ]:
-        content += f"\n### {category_name}\n"
+        yield f"\n### {category_name}\n"
         for word, definition in vocabulary[category_key]:
             total_count += 1
             if word in used_words:
@@ -598,22 +601,22 @@ def create_final_markdown(paragraphs: List[Tuple[str, str]], vocabulary: Dict, u
                 status = "✅"
             else:
                 status = "❌"
-            content += f"- [{status}] **{word}** - {definition}\n"
+            yield f"- [{status}] **{word}** - {definition}\n"
     
     # Add final statistics
     coverage_percentage = (used_count / total_count) * 100
-    content += f"\n### 📊 Estadísticas Finales de Cobertura\n"
-    content += f"- **Total de vocabulario**: {total_count} palabras\n"
-    content += f"- **Palabras utilizadas**: {used_count} palabras\n"
-    content += f"- **Porcentaje de cobertura**: {coverage_percentage:.1f}%\n\n"
+    yield f"\n### 📊 Estadísticas Finales de Cobertura\n"
+    yield f"- **Total de vocabulario**: {total_count} palabras\n"
+    yield f"- **Palabras utilizadas**: {used_count} palabras\n"
+    yield f"- **Porcentaje de cobertura**: {coverage_percentage:.1f}%\n\n"
     
     if coverage_percentage == 100:
-        content += "🎉 **¡ÉXITO COMPLETO!** Todas las palabras del vocabulario han sido utilizadas.\n\n"
+        yield "🎉 **¡ÉXITO COMPLETO!** Todas las palabras del vocabulario han sido utilizadas.\n\n"
     else:
-        content += f"⚠️ **Faltan {total_count - used_count} palabras por incluir.**\n\n"
+        yield f"⚠️ **Faltan {total_count - used_count} palabras por incluir.**\n\n"
     
     # Add conversion and usage instructions
-    content += """---
+    yield """---
 
 ## 📖 Guía Completa de Conversión y Uso
 
@@ -658,19 +661,9 @@ pandoc final_spanish_revision_booklet.md -o final_spanish_revision_booklet.docx
 
 *© 2024 - Cuaderno de Revisión GCSE Español - Versión Completa con 221 términos de vocabulario*
 """
-    
-    return content
 
-def create_final_html(markdown_content: str):
-    """Create final HTML version with enhanced styling"""
-    html_content = f"""<!DOCTYPE html>
-<html lang="es">
-<head>
-    <meta charset="UTF-8">
-    <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <title>📚 Cuaderno de Revisión GCSE Español - COMPLETO</title>
-    <style>
-        body {{
+HTML_STYLE = """
+        body {
             font-family: 'Georgia', 'Times New Roman', serif;
             max-width: 1000px;
             margin: 0 auto;
@@ -678,15 +671,15 @@ def create_final_html(markdown_content: str):
             line-height: 1.8;
             background: linear-gradient(135deg, #f5f7fa 0%, #c3cfe2 100%);
             color: #2c3e50;
-        }}
-        .container {{
+        }
+        .container {
             background-color: white;
             padding: 40px;
             border-radius: 15px;
             box-shadow: 0 10px 30px rgba(0, 0, 0, 0.1);
             border: 3px solid #3498db;
-        }}
-        h1 {{
+        }
+        h1 {
             color: #2c3e50;
             text-align: center;
             border-bottom: 4px solid #3498db;
@@ -694,8 +687,8 @@ def create_final_html(markdown_content: str):
             margin-bottom: 40px;
             font-size: 2.5em;
             text-shadow: 2px 2px 4px rgba(0,0,0,0.1);
-        }}
-        h2 {{
+        }
+        h2 {
             color: #34495e;
             margin-top: 40px;
             padding: 15px 20px;
@@ -703,16 +696,16 @@ def create_final_html(markdown_content: str):
             color: white;
             border-radius: 10px;
             box-shadow: 0 4px 8px rgba(0,0,0,0.2);
-        }}
-        h3 {{
+        }
+        h3 {
             color: #7f8c8d;
             margin-top: 30px;
             padding: 10px 15px;
             background-color: #ecf0f1;
             border-left: 5px solid #3498db;
             border-radius: 5px;
-        }}
-        strong {{
+        }
+        strong {
             color: #e74c3c;
             font-weight: bold;
             background-color: #fef9e7;
@@ -720,35 +713,35 @@ def create_final_html(markdown_content: str):
             border-radius: 4px;
             border: 1px solid #f39c12;
             box-shadow: 0 1px 2px rgba(0,0,0,0.1);
-        }}
-        .paragraph {{
+        }
+        .paragraph {
             background: linear-gradient(135deg, #f8f9fa 0%, #e9ecef 100%);
             padding: 25px;
             border-left: 6px solid #3498db;
             margin: 25px 0;
             border-radius: 8px;
             box-shadow: 0 3px 6px rgba(0,0,0,0.1);
-        }}
-        .checklist {{
+        }
+        .checklist {
             background: linear-gradient(135deg, #d4edda 0%, #c3e6cb 100%);
             padding: 20px;
             border-radius: 8px;
             margin: 20px 0;
             border: 2px solid #28a745;
-        }}
-        ul {{
+        }
+        ul {
             list-style-type: none;
             padding-left: 0;
-        }}
-        li {{
+        }
+        li {
             margin: 10px 0;
             padding: 8px 12px;
             background-color: white;
             border-radius: 5px;
             border-left: 4px solid #3498db;
             box-shadow: 0 2px 4px rgba(0,0,0,0.05);
-        }}
-        .success {{
+        }
+        .success {
             background: linear-gradient(135deg, #d4edda 0%, #c3e6cb 100%);
             padding: 20px;
             border-radius: 10px;
@@ -758,31 +751,31 @@ def create_final_html(markdown_content: str):
             font-size: 1.2em;
             color: #155724;
             margin: 30px 0;
-        }}
-        .instructions {{
+        }
+        .instructions {
             background: linear-gradient(135deg, #fff3cd 0%, #ffeeba 100%);
             padding: 25px;
             border-radius: 10px;
             border: 2px solid #ffc107;
             margin: 25px 0;
-        }}
-        code {{
+        }
+        code {
             background-color: #f8f9fa;
             padding: 4px 8px;
             border-radius: 4px;
             font-family: 'Courier New', monospace;
             color: #e83e8c;
             border: 1px solid #dee2e6;
-        }}
-        pre {{
+        }
+        pre {
             background-color: #f8f9fa;
             padding: 20px;
             border-radius: 8px;
             overflow-x: auto;
             border: 1px solid #dee2e6;
             box-shadow: inset 0 1px 3px rgba(0,0,0,0.1);
-        }}
-        .footer {{
+        }
+        .footer {
             text-align: center;
             margin-top: 40px;
             padding: 20px;
@@ -791,99 +784,27 @@ def create_final_html(markdown_content: str):
             border-top: 3px solid #3498db;
             font-style: italic;
             color: #6c757d;
-        }}
-    </style>
-</head>
-<body>
-    <div class="container">
+        }
 """
-    
-    # Convert markdown to HTML with enhanced formatting
-    lines = markdown_content.split('\n')
-    in_paragraph = False
-    in_checklist = False
-    in_instructions = False
-    
-    for line in lines:
-        if line.startswith('# '):
-            html_content += f"<h1>{line[2:]}</h1>\n"
-        elif line.startswith('## '):
-            if in_paragraph:
-                html_content += "</div>\n"
-                in_paragraph = False
-            if in_checklist:
-                html_content += "</div>\n"
-                in_checklist = False
-            if in_instructions:
-                html_content += "</div>\n"
-                in_instructions = False
-                
-            if 'Párrafo' in line:
-                html_content += f'<div class="paragraph"><h2>{line[3:]}</h2>\n'
-                in_paragraph = True
-            elif 'Verificación' in line or 'Estadísticas' in line:
-                html_content += f'<div class="checklist"><h2>{line[3:]}</h2>\n'
-                in_checklist = True
-            elif 'Guía' in line or 'Conversión' in line:
-                html_content += f'<div class="instructions"><h2>{line[3:]}</h2>\n'
-                in_instructions = True
-            else:
-                html_content += f"<h2>{line[3:]}</h2>\n"
-        elif line.startswith('### '):
-            html_content += f"<h3>{line[4:]}</h3>\n"
-        elif line.startswith('- [✅]'):
-            formatted_line = re.sub(r'\*\*(.*?)\*\*', r'<strong>\1</strong>', line[6:])
-            html_content += f"<li>✅ {formatted_line}</li>\n"
-        elif line.startswith('- [❌]'):
-            formatted_line = re.sub(r'\*\*(.*?)\*\*', r'<strong>\1</strong>', line[6:])
-            html_content += f"<li>❌ {formatted_line}</li>\n"
-        elif line.startswith('```'):
-            if '<pre>' in html_content and '</pre>' not in html_content:
-                html_content += "</code></pre>\n"
-            else:
-                html_content += "<pre><code>\n"
-        elif '🎉 **¡ÉXITO COMPLETO!**' in line:
-            formatted_line = re.sub(r'\*\*(.*?)\*\*', r'<strong>\1</strong>', line)
-            html_content += f'<div class="success">{formatted_line}</div>\n'
-        elif line.startswith('---'):
-            if in_paragraph:
-                html_content += "</div>\n"
-                in_paragraph = False
-            if in_checklist:
-                html_content += "</div>\n"
-                in_checklist = False
-            if in_instructions:
-                html_content += "</div>\n"
-                in_instructions = False
-            html_content += "<hr>\n"
-        elif line.strip() and not line.startswith('*'):
-            formatted_line = re.sub(r'\*\*(.*?)\*\*', r'<strong>\1</strong>', line)
-            if '<pre>' in html_content and '</pre>' not in html_content:
-                html_content += f"{line}\n"
-            else:
-                html_content += f"<p>{formatted_line}</p>\n"
-        elif line.strip():
-            formatted_line = re.sub(r'\*\*(.*?)\*\*', r'<strong>\1</strong>', line)
-            html_content += f"<p><em>{formatted_line}</em></p>\n"
-    
-    # Close any open divs
-    if in_paragraph or in_checklist or in_instructions:
-        html_content += "</div>\n"
-    
-    html_content += """
-        <div class="footer">
+
+HTML_FOOTER = """<div class="footer">
             <p>📚 Cuaderno de Revisión GCSE Español - Versión Final Completa</p>
             <p>Generado automáticamente con todos los 221 términos de vocabulario requeridos</p>
         </div>
-    </div>
-</body>
-</html>
 """
-    
-    with open('final_spanish_revision_booklet.html', 'w', encoding='utf-8') as f:
-        f.write(html_content)
-    
-    print("📱 HTML final creado: final_spanish_revision_booklet.html")
+
+HTML_OPTIONS = HtmlOptions(
+    title="📚 Cuaderno de Revisión GCSE Español - COMPLETO",
+    css=HTML_STYLE,
+    container=True,
+    section_classes=[
+        (2, ("Párrafo",), "paragraph"),
+        (2, ("Verificación", "Estadísticas"), "checklist"),
+        (2, ("Guía", "Conversión"), "instructions"),
+    ],
+    paragraph_classes=[("🎉 **¡ÉXITO COMPLETO!**", "success")],
+    footer=HTML_FOOTER,
+)
 
 if __name__ == "__main__":
     create_complete_revision_booklet()
@@ -1,9 +1,11 @@
 # generate_spanish_revision.py
-import re
 import random
-from typing import Dict, List, Tuple
+from typing import Dict, Iterator, List, Tuple
 
-def create_revision_booklet():
+from booklet_renderer import HtmlOptions, export_booklet
+from document_writer import join_chunks
+
+def create_revision_booklet(docx: bool = True):
     """Main function to create the Spanish revision booklet"""
     
     # Complete vocabulary list organized by type
@@ -250,18 +252,21 @@ def create_revision_booklet():
     vocab_tracker = create_vocab_tracker(vocabulary)
     
     # Generate markdown content
-    markdown_content = create_markdown_content(paragraphs, vocab_tracker)
+    markdown_content = join_chunks(markdown_chunks(paragraphs, vocab_tracker))
     
-    # Write to file
-    with open('spanish_revision_booklet.md', 'w', encoding='utf-8') as f:
-        f.write(markdown_content)
+    # One parse, every format
+    outputs = {"md": "spanish_revision_booklet.md", "html": "spanish_revision_booklet.html"}
+    if docx:
+        outputs["docx"] = "spanish_revision_booklet.docx"
+    written = export_booklet(markdown_content, outputs, HTML_OPTIONS)
     
     print("✅ Markdown file created: spanish_revision_booklet.md")
-    print("📝 To convert to Word document, run:")
-    print("   pandoc spanish_revision_booklet.md -o spanish_revision_booklet.docx")
+    if "docx" in written:
+        print(f"📄 Word document created: {written['docx']}")
+    
+    print("📱 HTML preview created: spanish_revision_booklet.html")
     
-    # Also create a simple HTML version for preview
-    create_html_version(markdown_content)
+    return written
 
 def generate_all_paragraphs(vocabulary: Dict) -> List[Tuple[str, str]]:
     """Generate all 12 paragraphs with vocabulary integration"""
@@ -370,10 +375,10 @@ def create_vocab_tracker(vocabulary: Dict) -> Dict:
     
     return tracker
 
-def create_markdown_content(paragraphs: List[Tuple[str, str]], vocab_tracker: Dict) -> str:
-    """Create the complete markdown content"""
+def markdown_chunks(paragraphs: List[Tuple[str, str]], vocab_tracker: Dict) -> Iterator[str]:
+    """Yield the complete markdown content in chunks"""
     
-    content = """# Cuaderno de Revisión GCSE Español
+    yield """# Cuaderno de Revisión GCSE Español
 ## Tema 1, Unidad 1: Identidad y relaciones con otros
 
 ---
@@ -382,14 +387,14 @@ def create_markdown_content(paragraphs: List[Tuple[str, str]], vocab_tracker: Di
     
     # Add paragraphs
     for i, (title, text) in enumerate(paragraphs, 1):
-        content += f"## Párrafo {i}: {title}\n"
-        content += f"{text}\n\n"
+        yield f"## Párrafo {i}: {title}\n"
+        yield f"{text}\n\n"
     
-    content += "---\n\n"
-    content += "## Lista de Verificación de Vocabulario\n\n"
+    yield "---\n\n"
+    yield "## Lista de Verificación de Vocabulario\n\n"
     
     # Add vocabulary checklist
-    content += "### Adjetivos (adj)\n"
+    yield "### Adjetivos (adj)\n"
     for word, definition in [
         ('inglés', 'English'),
         ('responsable', 'responsible'),
@@ -403,16 +408,16 @@ def create_markdown_content(paragraphs: List[Tuple[str, str]], vocab_tracker: Di
         ('online', 'online'),
         ('perezoso', 'lazy')
     ]:
-        content += f"- [x] **{word}** - {definition}\n"
+        yield f"- [x] **{word}** - {definition}\n"
     
-    content += "\n### Expresiones de múltiples palabras (mwp)\n"
+    yield "\n### Expresiones de múltiples palabras (mwp)\n"
     for word, definition in [
         ('medios de comunicación', 'media'),
         ('al aire libre', 'in the open air, outdoors')
     ]:
-        content += f"- [x] **{word}** - {definition}\n"
+        yield f"- [x] **{word}** - {definition}\n"
     
-    content += "\n### Sustantivos femeninos (n f)\n"
+    yield "\n### Sustantivos femeninos (n f)\n"
     fem_nouns = [
         ('historia', 'history, story'),
         ('relación', 'relationship'),
@@ -454,9 +459,9 @@ def create_markdown_content(paragraphs: List[Tuple[str, str]], vocab_tracker: Di
     ]
     
     for word, definition in fem_nouns:
-        content += f"- [x] **{word}** - {definition}\n"
+        yield f"- [x] **{word}** - {definition}\n"
     
-    content += "\n### Sustantivos masculinos (n m)\n"
+    yield "\n### Sustantivos masculinos (n m)\n"
     masc_nouns = [
         ('club', 'club'),
         ('examen', 'exam'),
@@ -508,9 +513,9 @@ def create_markdown_content(paragraphs: List[Tuple[str, str]], vocab_tracker: Di
     ]
     
     for word, definition in masc_nouns:
-        content += f"- [x] **{word}** - {definition}\n"
+        yield f"- [x] **{word}** - {definition}\n"
     
-    content += "\n### Verbos (v)\n"
+    yield "\n### Verbos (v)\n"
     verbs = [
         ('llamar/llamarse', '(to) call, name / (to) be called'),
         ('trabajar', '(to) work'),
@@ -543,9 +548,9 @@ def create_markdown_content(paragraphs: List[Tuple[str, str]], vocab_tracker: Di
     ]
     
     for word, definition in verbs:
-        content += f"- [x] **{word}** - {definition}\n"
+        yield f"- [x] **{word}** - {definition}\n"
     
-    content += "\n### Sustantivos masculinos/femeninos (n m/f)\n"
+    yield "\n### Sustantivos masculinos/femeninos (n m/f)\n"
     mf_nouns = [
         ('profesor', 'teacher'),
         ('compañero', 'classmate, group member, colleague, companion'),
@@ -558,10 +563,10 @@ def create_markdown_content(paragraphs: List[Tuple[str, str]], vocab_tracker: Di
     ]
     
     for word, definition in mf_nouns:
-        content += f"- [x] **{word}** - {definition}\n"
+        yield f"- [x] **{word}** - {definition}\n"
     
     # Add conversion instructions
-    content += """
+    yield """
 ---
 
 ## Recomendaciones para Conversión a Documento Word (.docx)
@@ -588,113 +593,64 @@ def create_markdown_content(paragraphs: List[Tuple[str, str]], vocab_tracker: Di
 - Las palabras en negrita facilitan la identificación del vocabulario clave
 - Perfecto para práctica de pronunciación y fluidez en español
 """
-    
-    return content
 
-def create_html_version(markdown_content: str):
-    """Create an HTML preview version"""
-    html_content = f"""<!DOCTYPE html>
-<html lang="es">
-<head>
-    <meta charset="UTF-8">
-    <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <title>Cuaderno de Revisión GCSE Español</title>
-    <style>
-        body {{
+HTML_STYLE = """
+        body {
             font-family: Arial, sans-serif;
             max-width: 800px;
             margin: 0 auto;
             padding: 20px;
             line-height: 1.6;
-        }}
-        h1 {{
+        }
+        h1 {
             color: #2c3e50;
             text-align: center;
             border-bottom: 3px solid #3498db;
             padding-bottom: 10px;
-        }}
-        h2 {{
+        }
+        h2 {
             color: #34495e;
             margin-top: 30px;
-        }}
-        h3 {{
+        }
+        h3 {
             color: #7f8c8d;
-        }}
-        strong {{
+        }
+        strong {
             color: #e74c3c;
             font-weight: bold;
-        }}
-        .paragraph {{
+        }
+        .paragraph {
             background-color: #f8f9fa;
             padding: 15px;
             border-left: 4px solid #3498db;
             margin: 15px 0;
-        }}
-        .checklist {{
+        }
+        .checklist {
             background-color: #f1f8ff;
             padding: 15px;
             border-radius: 5px;
-        }}
-        ul {{
+        }
+        ul {
             list-style-type: none;
             padding-left: 0;
-        }}
-        li {{
+        }
+        li {
             margin: 5px 0;
             padding: 3px 0;
-        }}
-        .instructions {{
+        }
+        .instructions {
             background-color: #fff3cd;
             padding: 15px;
             border-radius: 5px;
             border: 1px solid #ffeaa7;
-        }}
-    </style>
-</head>
-<body>
-"""
-    
-    # Convert markdown to basic HTML
-    lines = markdown_content.split('\n')
-    in_paragraph = False
-    
-    for line in lines:
-        if line.startswith('# '):
-            html_content += f"<h1>{line[2:]}</h1>\n"
-        elif line.startswith('## '):
-            if 'Párrafo' in line:
-                html_content += f'<div class="paragraph"><h2>{line[3:]}</h2>\n'
-                in_paragraph = True
-            else:
-                if in_paragraph:
-                    html_content += "</div>\n"
-                    in_paragraph = False
-                html_content += f"<h2>{line[3:]}</h2>\n"
-        elif line.startswith('### '):
-            html_content += f'<div class="checklist"><h3>{line[4:]}</h3>\n'
-        elif line.startswith('- [x]'):
-            html_content += f"<ul><li>✅ {line[6:]}</li></ul>\n"
-        elif line.startswith('---'):
-            if in_paragraph:
-                html_content += "</div>\n"
-                in_paragraph = False
-            html_content += "<hr>\n"
-        elif line.strip() and not line.startswith('1.') and not line.startswith('2.'):
-            # Convert **bold** to <strong>
-            formatted_line = re.sub(r'\*\*(.*?)\*\*', r'<strong>\1</strong>', line)
-            html_content += f"<p>{formatted_line}</p>\n"
-        elif line.strip():
-            html_content += f"<p>{line}</p>\n"
-    
-    html_content += """
-</body>
-</html>
+        }
 """
-    
-    with open('spanish_revision_booklet.html', 'w', encoding='utf-8') as f:
-        f.write(html_content)
-    
-    print("📱 HTML preview created: spanish_revision_booklet.html")
+
+HTML_OPTIONS = HtmlOptions(
+    title="Cuaderno de Revisión GCSE Español",
+    css=HTML_STYLE,
+    section_classes=[(2, ("Párrafo",), "paragraph"), (3, ("",), "checklist")],
+)
 
 if __name__ == "__main__":
     create_revision_booklet()
\ No newline at end of file
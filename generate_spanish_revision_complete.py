@@ -1,8 +1,11 @@
 # generate_spanish_revision_complete.py
-import re
-from typing import Dict, List, Tuple, Set
+from typing import Dict, Iterator, List, Tuple, Set
 
-def create_revision_booklet():
+from booklet_renderer import HtmlOptions, export_booklet
+from document_writer import join_chunks
+from vocabulary_coverage import VocabularyMatcher
+
+def create_revision_booklet(docx: bool = True):
     """Main function to create the Spanish revision booklet"""
     
     # Complete vocabulary list organized by type
@@ -249,11 +252,13 @@ def create_revision_booklet():
     used_words = track_vocabulary_usage(paragraphs, vocabulary)
     
     # Generate markdown content with verification
-    markdown_content = create_markdown_content(paragraphs, vocabulary, used_words)
+    markdown_content = join_chunks(markdown_chunks(paragraphs, vocabulary, used_words))
     
-    # Write to file
-    with open('spanish_revision_booklet_complete.md', 'w', encoding='utf-8') as f:
-        f.write(markdown_content)
+    # One parse, every format
+    outputs = {"md": "spanish_revision_booklet_complete.md", "html": "spanish_revision_booklet_complete.html"}
+    if docx:
+        outputs["docx"] = "spanish_revision_booklet_complete.docx"
+    written = export_booklet(markdown_content, outputs, HTML_OPTIONS)
     
     print("✅ Complete markdown file created: spanish_revision_booklet_complete.md")
     print(f"📊 Vocabulary coverage: {len(used_words)}/{get_total_vocab_count(vocabulary)} words used")
@@ -268,11 +273,12 @@ def create_revision_booklet():
     else:
         print("🎉 All vocabulary words have been successfully used!")
     
-    print("📝 To convert to Word document, run:")
-    print("   pandoc spanish_revision_booklet_complete.md -o spanish_revision_booklet_complete.docx")
+    if "docx" in written:
+        print(f"📄 Word document created: {written['docx']}")
+    
+    print("📱 HTML preview created: spanish_revision_booklet_complete.html")
     
-    # Also create HTML version
-    create_html_version(markdown_content)
+    return written
 
 def generate_comprehensive_paragraphs(vocabulary: Dict) -> List[Tuple[str, str]]:
     """Generate comprehensive paragraphs that use ALL vocabulary words"""
@@ -583,19 +589,11 @@ def generate_comprehensive_paragraphs(vocabulary: Dict) -> List[Tuple[str, str]]
 
 def track_vocabulary_usage(paragraphs: List[Tuple[str, str]], vocabulary: Dict) -> Set[str]:
     """Track which vocabulary words are actually used in the paragraphs"""
-    used_words = set()
-    
-    # Combine all paragraph text
     all_text = " ".join([text for _, text in paragraphs])
     
-    # Check each vocabulary word
-    for category, word_list in vocabulary.items():
-        for word, definition in word_list:
-            # Look for the word in bold format
-            if f"**{word}**" in all_text:
-                used_words.add(word)
-    
-    return used_words
+    # One pass over the text for the whole vocabulary (bold words only)
+    words = [word for word_list in vocabulary.values() for word, _ in word_list]
+    return VocabularyMatcher(words, bold_only=True).used_words(all_text)
 
 def get_total_vocab_count(vocabulary: Dict) -> int:
     """Get total count of vocabulary words"""
@@ -617,10 +615,10 @@ def check_unused_vocabulary(vocabulary: Dict, used_words: Set[str]) -> Dict:
     
     return unused
 
-def create_markdown_content(paragraphs: List[Tuple[str, str]], vocabulary: Dict, used_words: Set[str]) -> str:
-    """Create the complete markdown content with verification"""
+def markdown_chunks(paragraphs: List[Tuple[str, str]], vocabulary: Dict, used_words: Set[str]) -> Iterator[str]:
+    """Yield the complete markdown content with verification, in chunks"""
     
-    content = """# Cuaderno de Revisión GCSE Español
+    yield """# Cuaderno de Revisión GCSE Español
 ## Tema 1, Unidad 1: Identidad y relaciones con otros
 
 *Cuaderno completo con todo el vocabulario requerido integrado en contexto*
@@ -631,54 +629,54 @@ def create_markdown_content(paragraphs: List[Tuple[str, str]], vocabulary: Dict,
     
     # Add paragraphs
     for i, (title, text) in enumerate(paragraphs, 1):
-        content += f"## Párrafo {i}: {title}\n\n"
-        content += f"{text}\n\n"
+        yield f"## Párrafo {i}: {title}\n\n"
+        yield f"{text}\n\n"
     
-    content += "---\n\n"
-    content += "## ✅ Lista de Verificación Completa de Vocabulario\n\n"
+    yield "---\n\n"
+    yield "## ✅ Lista de Verificación Completa de Vocabulario\n\n"
     
     # Add comprehensive vocabulary checklist
-    content += "### Adjetivos (adj)\n"
+    yield "### Adjetivos (adj)\n"
     for word, definition in vocabulary['adj']:
         status = "✅" if word in used_words else "❌"
-        content += f"- [{status}] **{word}** - {definition}\n"
+        yield f"- [{status}] **{word}** - {definition}\n"
     
-    content += "\n### Expresiones de múltiples palabras (mwp)\n"
+    yield "\n### Expresiones de múltiples palabras (mwp)\n"
     for word, definition in vocabulary['mwp']:
         status = "✅" if word in used_words else "❌"
-        content += f"- [{status}] **{word}** - {definition}\n"
+        yield f"- [{status}] **{word}** - {definition}\n"
     
-    content += "\n### Sustantivos femeninos (n_f)\n"
+    yield "\n### Sustantivos femeninos (n_f)\n"
     for word, definition in vocabulary['n_f']:
         status = "✅" if word in used_words else "❌"
-        content += f"- [{status}] **{word}** - {definition}\n"
+        yield f"- [{status}] **{word}** - {definition}\n"
     
-    content += "\n### Sustantivos masculinos (n_m)\n"
+    yield "\n### Sustantivos masculinos (n_m)\n"
     for word, definition in vocabulary['n_m']:
         status = "✅" if word in used_words else "❌"
-        content += f"- [{status}] **{word}** - {definition}\n"
+        yield f"- [{status}] **{word}** - {definition}\n"
     
-    content += "\n### Verbos (verbs)\n"
+    yield "\n### Verbos (verbs)\n"
     for word, definition in vocabulary['verbs']:
         status = "✅" if word in used_words else "❌"
-        content += f"- [{status}] **{word}** - {definition}\n"
+        yield f"- [{status}] **{word}** - {definition}\n"
     
-    content += "\n### Sustantivos masculinos/femeninos (n_mf)\n"
+    yield "\n### Sustantivos masculinos/femeninos (n_mf)\n"
     for word, definition in vocabulary['n_mf']:
         status = "✅" if word in used_words else "❌"
-        content += f"- [{status}] **{word}** - {definition}\n"
+        yield f"- [{status}] **{word}** - {definition}\n"
     
     # Add usage statistics
     total_words = get_total_vocab_count(vocabulary)
     used_count = len(used_words)
     
-    content += f"\n### 📊 Estadísticas de Uso\n"
-    content += f"- **Total de vocabulario**: {total_words} palabras\n"
-    content += f"- **Palabras utilizadas**: {used_count} palabras\n"
-    content += f"- **Porcentaje de cobertura**: {(used_count/total_words)*100:.1f}%\n\n"
+    yield f"\n### 📊 Estadísticas de Uso\n"
+    yield f"- **Total de vocabulario**: {total_words} palabras\n"
+    yield f"- **Palabras utilizadas**: {used_count} palabras\n"
+    yield f"- **Porcentaje de cobertura**: {(used_count/total_words)*100:.1f}%\n\n"
     
     # Add conversion instructions
-    content += """---
+    yield """---
 
 ## 📖 Guía de Conversión a Documento Word
 
@@ -711,183 +709,108 @@ pandoc spanish_revision_booklet_complete.md -o spanish_revision_booklet_complete
 
 *¡Perfecto para estudiantes de Year 11 preparándose para sus exámenes GCSE de español!*
 """
-    
-    return content
 
-def create_html_version(markdown_content: str):
-    """Create an HTML preview version"""
-    html_content = f"""<!DOCTYPE html>
-<html lang="es">
-<head>
-    <meta charset="UTF-8">
-    <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <title>Cuaderno de Revisión GCSE Español - Completo</title>
-    <style>
-        body {{
+HTML_STYLE = """
+        body {
             font-family: 'Arial', sans-serif;
             max-width: 900px;
             margin: 0 auto;
             padding: 20px;
             line-height: 1.6;
             background-color: #f8f9fa;
-        }}
-        .container {{
+        }
+        .container {
             background-color: white;
             padding: 30px;
             border-radius: 10px;
             box-shadow: 0 4px 6px rgba(0, 0, 0, 0.1);
-        }}
-        h1 {{
+        }
+        h1 {
             color: #2c3e50;
             text-align: center;
             border-bottom: 3px solid #3498db;
             padding-bottom: 15px;
             margin-bottom: 30px;
-        }}
-        h2 {{
+        }
+        h2 {
             color: #34495e;
             margin-top: 35px;
             padding-left: 10px;
             border-left: 4px solid #3498db;
-        }}
-        h3 {{
+        }
+        h3 {
             color: #7f8c8d;
             margin-top: 25px;
-        }}
-        strong {{
+        }
+        strong {
             color: #e74c3c;
             font-weight: bold;
             background-color: #fef9e7;
             padding: 1px 3px;
             border-radius: 3px;
-        }}
-        .paragraph {{
+        }
+        .paragraph {
             background-color: #f8f9fa;
             padding: 20px;
             border-left: 4px solid #3498db;
             margin: 20px 0;
             border-radius: 5px;
-        }}
-        .checklist {{
+        }
+        .checklist {
             background-color: #f1f8ff;
             padding: 15px;
             border-radius: 5px;
             margin: 15px 0;
-        }}
-        ul {{
+        }
+        ul {
             list-style-type: none;
             padding-left: 0;
-        }}
-        li {{
+        }
+        li {
             margin: 8px 0;
             padding: 5px 0;
             border-bottom: 1px solid #ecf0f1;
-        }}
-        li:last-child {{
+        }
+        li:last-child {
             border-bottom: none;
-        }}
-        .instructions {{
+        }
+        .instructions {
             background-color: #fff3cd;
             padding: 20px;
             border-radius: 5px;
             border: 1px solid #ffeaa7;
             margin: 20px 0;
-        }}
-        .stats {{
+        }
+        .stats {
             background-color: #e8f5e8;
             padding: 15px;
             border-radius: 5px;
             border: 1px solid #28a745;
-        }}
-        code {{
+        }
+        code {
             background-color: #f4f4f4;
             padding: 2px 4px;
             border-radius: 3px;
             font-family: 'Courier New', monospace;
-        }}
-        pre {{
+        }
+        pre {
             background-color: #f4f4f4;
             padding: 15px;
             border-radius: 5px;
             overflow-x: auto;
-        }}
-    </style>
-</head>
-<body>
-    <div class="container">
+        }
 """
-    
-    # Convert markdown to HTML
-    lines = markdown_content.split('\n')
-    in_paragraph = False
-    in_checklist = False
-    
-    for line in lines:
-        if line.startswith('# '):
-            html_content += f"<h1>{line[2:]}</h1>\n"
-        elif line.startswith('## '):
-            if in_paragraph:
-                html_content += "</div>\n"
-                in_paragraph = False
-            if in_checklist:
-                html_content += "</div>\n"
-                in_checklist = False
-                
-            if 'Párrafo' in line:
-                html_content += f'<div class="paragraph"><h2>{line[3:]}</h2>\n'
-                in_paragraph = True
-            elif 'Verificación' in line or 'Estadísticas' in line:
-                html_content += f'<div class="checklist"><h2>{line[3:]}</h2>\n'
-                in_checklist = True
-            else:
-                html_content += f"<h2>{line[3:]}</h2>\n"
-        elif line.startswith('### '):
-            if 'Estadísticas' in line:
-                html_content += f'<div class="stats"><h3>{line[4:]}</h3>\n'
-            else:
-                html_content += f"<h3>{line[4:]}</h3>\n"
-        elif line.startswith('- ['):
-            formatted_line = re.sub(r'\*\*(.*?)\*\*', r'<strong>\1</strong>', line[4:])
-            html_content += f"<li>{formatted_line}</li>\n"
-        elif line.startswith('```'):
-            if '<pre>' in html_content and '</pre>' not in html_content:
-                html_content += "</pre>\n"
-            else:
-                html_content += "<pre><code>\n"
-        elif line.startswith('---'):
-            if in_paragraph:
-                html_content += "</div>\n"
-                in_paragraph = False
-            if in_checklist:
-                html_content += "</div>\n"
-                in_checklist = False
-            html_content += "<hr>\n"
-        elif line.strip() and not line.startswith('*'):
-            # Convert **bold** to <strong>
-            formatted_line = re.sub(r'\*\*(.*?)\*\*', r'<strong>\1</strong>', line)
-            if '<pre>' in html_content and '</pre>' not in html_content:
-                html_content += f"{line}\n"
-            else:
-                html_content += f"<p>{formatted_line}</p>\n"
-        elif line.strip():
-            formatted_line = re.sub(r'\*\*(.*?)\*\*', r'<strong>\1</strong>', line)
-            html_content += f"<p><em>{formatted_line}</em></p>\n"
-    
-    if in_paragraph:
-        html_content += "</div>\n"
-    if in_checklist:
-        html_content += "</div>\n"
-    
-    html_content += """
-    </div>
-</body>
-</html>
-"""
-    
-    with open('spanish_revision_booklet_complete.html', 'w', encoding='utf-8') as f:
-        f.write(html_content)
-    
-    print("📱 HTML preview created: spanish_revision_booklet_complete.html")
+
+HTML_OPTIONS = HtmlOptions(
+    title="Cuaderno de Revisión GCSE Español - Completo",
+    css=HTML_STYLE,
+    container=True,
+    section_classes=[
+        (2, ("Párrafo",), "paragraph"),
+        (2, ("Verificación", "Estadísticas"), "checklist"),
+        (3, ("Estadísticas",), "stats"),
+    ],
+)
 
 if __name__ == "__main__":
     create_revision_booklet()
@@ -0,0 +1,366 @@
+# http_transport.py
+"""
+Shared HTTP transport for the text-generation APIs
+Pooled keep-alive sessions, timeouts and retries with jitter, plus provider
+adapters for every entry in config.API_ENDPOINTS
+"""
+
+import json
+import time
+import random
+import asyncio
+import threading
+from dataclasses import dataclass
+from typing import Callable, Dict, Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from config import API_ENDPOINTS
+
+# Optional: async transport (HTTP/2 when the `h2` package is installed)
+try:
+    import httpx
+    HTTPX_AVAILABLE = True
+except ImportError:
+    HTTPX_AVAILABLE = False
+
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+RETRY_STATUSES = {408, 429, 500, 502, 503, 504}
+
+@dataclass
+class TransportSettings:
+    connect_timeout: float = 5.0
+    read_timeout: float = 60.0
+    max_retries: int = 3
+    backoff_base: float = 0.5
+    backoff_max: float = 10.0
+    pool_size: int = 16
+
+def backoff_delay(attempt: int, settings: TransportSettings, retry_after: Optional[str] = None) -> float:
+    """Full-jitter exponential backoff; honours a numeric Retry-After header"""
+    if retry_after:
+        try:
+            return min(float(retry_after), settings.backoff_max)
+        except ValueError:
+            pass
+    return random.uniform(0, min(settings.backoff_max, settings.backoff_base * (2 ** attempt)))
+
+class HTTPTransport:
+    """
+    Synchronous transport: one requests.Session with a connection pool, so
+    every paragraph reuses an open TCP+TLS connection instead of a new handshake.
+    Safe to share between threads.
+    """
+
+    def __init__(self, settings: Optional[TransportSettings] = None):
+        self.settings = settings or TransportSettings()
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=self.settings.pool_size, pool_maxsize=self.settings.pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.requests_made = 0
+        self.retries = 0
+
+    def post_json(self, url: str, payload: Dict, headers: Optional[Dict] = None) -> Dict:
+        """POST JSON and return the decoded response, retrying transient failures"""
+        settings = self.settings
+        for attempt in range(settings.max_retries + 1):
+            last_attempt = attempt == settings.max_retries
+            try:
+                self.requests_made += 1
+                response = self.session.post(
+                    url, json=payload, headers=headers,
+                    timeout=(settings.connect_timeout, settings.read_timeout)
+                )
+            except (requests.ConnectionError, requests.Timeout):
+                if last_attempt:
+                    raise
+                self.retries += 1
+                time.sleep(backoff_delay(attempt, settings))
+                continue
+
+            if response.status_code in RETRY_STATUSES and not last_attempt:
+                self.retries += 1
+                time.sleep(backoff_delay(attempt, settings, response.headers.get("Retry-After")))
+                continue
+
+            response.raise_for_status()
+            return response.json()
+
+    def close(self):
+        self.session.close()
+
+class AsyncHTTPTransport:
+    """
+    Async transport on one pooled httpx.AsyncClient; uses HTTP/2 when `h2` is
+    installed so many concurrent requests share a single connection.
+
+    Usage:
+        async with AsyncHTTPTransport() as transport:
+            data = await transport.post_json(url, payload, headers)
+    """
+
+    def __init__(self, settings: Optional[TransportSettings] = None, http2: Optional[bool] = None):
+        if not HTTPX_AVAILABLE:
+            raise ImportError("httpx is required for AsyncHTTPTransport (pip install httpx)")
+        self.settings = settings or TransportSettings()
+        self.http2 = HTTP2_AVAILABLE if http2 is None else http2
+        self.client = httpx.AsyncClient(
+            http2=self.http2,
+            timeout=httpx.Timeout(self.settings.read_timeout, connect=self.settings.connect_timeout),
+            limits=httpx.Limits(max_connections=self.settings.pool_size,
+                                max_keepalive_connections=self.settings.pool_size)
+        )
+        self.requests_made = 0
+        self.retries = 0
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.aclose()
+
+    async def post_json(self, url: str, payload: Dict, headers: Optional[Dict] = None) -> Dict:
+        settings = self.settings
+        for attempt in range(settings.max_retries + 1):
+            last_attempt = attempt == settings.max_retries
+            try:
+                self.requests_made += 1
+                response = await self.client.post(url, json=payload, headers=headers)
+            except (httpx.ConnectError, httpx.TimeoutException, httpx.RemoteProtocolError):
+                if last_attempt:
+                    raise
+                self.retries += 1
+                await asyncio.sleep(backoff_delay(attempt, settings))
+                continue
+
+            if response.status_code in RETRY_STATUSES and not last_attempt:
+                self.retries += 1
+                await asyncio.sleep(backoff_delay(attempt, settings, response.headers.get("Retry-After")))
+                continue
+
+            response.raise_for_status()
+            return response.json()
+
+    async def aclose(self):
+        await self.client.aclose()
+
+class AsyncRateLimiter:
+    """
+    Limits concurrent requests and spaces request starts so that no more than
+    `requests_per_minute` begin in any minute.
+
+    Usage:
+        limiter = AsyncRateLimiter(concurrency=8, requests_per_minute=500)
+        async with limiter:
+            await call_api()
+    """
+
+    def __init__(self, concurrency: int = 8, requests_per_minute: Optional[float] = 500):
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._interval = 60.0 / requests_per_minute if requests_per_minute else 0.0
+        self._next_start = 0.0
+        self._lock = asyncio.Lock()
+
+    async def __aenter__(self):
+        await self._semaphore.acquire()
+        if self._interval:
+            async with self._lock:
+                now = time.monotonic()
+                wait = self._next_start - now
+                self._next_start = max(now, self._next_start) + self._interval
+            if wait > 0:
+                await asyncio.sleep(wait)
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        self._semaphore.release()
+
+_default_transport = None
+_default_lock = threading.Lock()
+
+def get_transport() -> HTTPTransport:
+    """Process-wide transport shared by all generators"""
+    global _default_transport
+    with _default_lock:
+        if _default_transport is None:
+            _default_transport = HTTPTransport()
+        return _default_transport
+
+# ---------------------------------------------------------------------------
+# Provider adapters
+# ---------------------------------------------------------------------------
+
+def _messages(system: Optional[str], prompt: str):
+    messages = [{"role": "user", "content": prompt}]
+    if system:
+        messages.insert(0, {"role": "system", "content": system})
+    return messages
+
+def _parse_chat(result: Dict) -> str:
+    # OpenAI-compatible, with the plain {"response": ...} shape some endpoints return
+    if "choices" in result:
+        return result["choices"][0]["message"]["content"]
+    if "response" in result:
+        return result["response"]
+    raise ValueError(f"Unexpected API response format: {result}")
+
+@dataclass
+class ProviderAdapter:
+    """How to talk to one provider: headers, request body and response text"""
+    name: str
+    endpoint: str
+    headers: Callable[[Optional[str]], Dict]
+    payload: Callable[[str, Optional[str], str, int, float], Dict]
+    parse: Callable[[Dict], str]
+
+ADAPTERS: Dict[str, ProviderAdapter] = {
+    "openai": ProviderAdapter(
+        name="openai",
+        endpoint=API_ENDPOINTS["openai"],
+        headers=lambda key: {"Authorization": f"Bearer {key}", "Content-Type": "application/json"},
+        payload=lambda model, system, prompt, max_tokens, temperature: {
+            "model": model,
+            "messages": _messages(system, prompt),
+            "max_tokens": max_tokens,
+            "temperature": temperature
+        },
+        parse=_parse_chat
+    ),
+    "claude": ProviderAdapter(
+        name="claude",
+        endpoint=API_ENDPOINTS["claude"],
+        headers=lambda key: {"x-api-key": key, "Content-Type": "application/json", "anthropic-version": "2023-06-01"},
+        payload=lambda model, system, prompt, max_tokens, temperature: dict(
+            {"model": model, "max_tokens": max_tokens, "messages": [{"role": "user", "content": prompt}]},
+            **({"system": system} if system else {})
+        ),
+        parse=lambda result: result["content"][0]["text"]
+    ),
+    "custom": ProviderAdapter(
+        name="custom",
+        endpoint=API_ENDPOINTS["custom"],
+        headers=lambda key: {"Authorization": f"Bearer {key}"} if key else {},
+        payload=lambda model, system, prompt, max_tokens, temperature: {"prompt": prompt, "max_tokens": max_tokens},
+        parse=_parse_chat
+    ),
+}
+
+class ProviderClient:
+    """
+    Sends prompts to one provider through a shared transport.
+
+    Usage:
+        client = ProviderClient("claude", api_key="...", model="claude-3-sonnet")
+        text = client.complete("Escribe un párrafo...")
+    """
+
+    def __init__(self, provider: str, api_key: Optional[str], model: str, endpoint: Optional[str] = None,
+                 system_prompt: Optional[str] = None, max_tokens: int = 300, temperature: float = 0.7,
+                 transport: Optional[HTTPTransport] = None):
+        if provider not in ADAPTERS:
+            raise ValueError(f"Unsupported API type: {provider}")
+        self.adapter = ADAPTERS[provider]
+        self.endpoint = endpoint or self.adapter.endpoint
+        if not self.endpoint:
+            raise ValueError(f"No endpoint configured for {provider} (see config.API_ENDPOINTS)")
+        self.api_key = api_key
+        self.model = model
+        self.system_prompt = system_prompt
+        self.max_tokens = max_tokens
+        self.temperature = temperature
+        self.transport = transport or get_transport()
+
+    def _request(self, prompt: str) -> Tuple[Dict, Dict]:
+        payload = self.adapter.payload(self.model, self.system_prompt, prompt, self.max_tokens, self.temperature)
+        return payload, self.adapter.headers(self.api_key)
+
+    def complete(self, prompt: str) -> str:
+        payload, headers = self._request(prompt)
+        return self.adapter.parse(self.transport.post_json(self.endpoint, payload, headers)).strip()
+
+    async def complete_async(self, prompt: str, transport: AsyncHTTPTransport) -> str:
+        payload, headers = self._request(prompt)
+        return self.adapter.parse(await transport.post_json(self.endpoint, payload, headers)).strip()
+
+# ---------------------------------------------------------------------------
+# Local stub server (manual check: python http_transport.py)
+# ---------------------------------------------------------------------------
+
+def run_stub_server(port: int = 0, fail_first: int = 1):
+    """
+    Start a local server that answers every provider format, failing the
+    first `fail_first` requests with 503 to exercise retries.
+    Returns (server, base_url); call server.shutdown() when done.
+    """
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    state = {"failures": fail_first}
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"  # keep-alive
+        disable_nagle_algorithm = True
+
+        def log_message(self, *args):
+            pass
+
+        def do_POST(self):
+            body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+            if state["failures"] > 0:
+                state["failures"] -= 1
+                self._send(503, {"error": "try again"})
+                return
+            prompt = body.get("prompt") or body["messages"][-1]["content"]
+            text = f"echo: {prompt}"
+            if self.path.startswith("/claude"):
+                self._send(200, {"content": [{"text": text}]})
+            elif self.path.startswith("/custom"):
+                self._send(200, {"response": text})
+            else:
+                self._send(200, {"choices": [{"message": {"content": text}}]})
+
+        def _send(self, status, data):
+            raw = json.dumps(data).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(raw)))
+            self.end_headers()
+            self.wfile.write(raw)
+
+    server = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+def main():
+    server, base_url = run_stub_server()
+    transport = HTTPTransport(TransportSettings(backoff_base=0.05))
+    try:
+        for provider in ADAPTERS:
+            client = ProviderClient(provider, "test-key", "stub-model", endpoint=f"{base_url}/{provider}",
+                                    transport=transport)
+            start = time.time()
+            replies = [client.complete(f"prompt {i}") for i in range(20)]
+            assert replies[-1] == "echo: prompt 19", replies[-1]
+            print(f"✅ {provider}: 20 calls in {time.time() - start:.2f}s")
+        print(f"🔁 {transport.requests_made} requests, {transport.retries} retried")
+
+        if HTTPX_AVAILABLE:
+            async def run_async():
+                client = ProviderClient("openai", "test-key", "stub-model", endpoint=f"{base_url}/openai")
+                async with AsyncHTTPTransport(TransportSettings(backoff_base=0.05)) as async_transport:
+                    replies = await asyncio.gather(*(client.complete_async(f"p{i}", async_transport) for i in range(50)))
+                assert replies[49] == "echo: p49"
+                print(f"✅ async: {len(replies)} concurrent calls (http2={async_transport.http2})")
+            asyncio.run(run_async())
+    finally:
+        transport.close()
+        server.shutdown()
+
+if __name__ == "__main__":
+    main()
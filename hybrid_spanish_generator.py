@@ -6,11 +6,14 @@ Hybrid approach: API + Python for 2000+ vocabulary words
 
 import openai
 import json
-import re
-from typing import Dict, List, Tuple, Set
+from typing import Dict, Iterator, List, Tuple, Set
 from dataclasses import dataclass
 import time
 
+from config import Config
+from document_writer import join_chunks
+from vocabulary_coverage import CoverageTracker, VocabularyMatcher
+
 @dataclass
 class VocabularyStats:
     total_words: int
@@ -93,13 +96,22 @@ class SpanishRevisionGenerator:
         # Simple template-based generation as fallback
         return f"Paragraph about {theme} using words: {', '.join(words)}"
     
-    def generate_comprehensive_booklet(self, vocabulary: Dict, themes: List[str]) -> Tuple[str, VocabularyStats]:
+    def generate_comprehensive_booklet(self, vocabulary: Dict, themes: List[str],
+                                       min_coverage: float = Config.MIN_COVERAGE_PERCENTAGE) -> Tuple[str, VocabularyStats]:
         """
         Generate complete revision booklet using hybrid approach
+        
+        Coverage is tracked after every API response: each prompt asks for
+        words that are still uncovered, and the batch size follows how many
+        requested words the model actually uses. Generation stops once
+        `min_coverage` is reached; only what is left gets filler content.
         """
         all_words = self._flatten_vocabulary(vocabulary)
-        used_words = set()
+        # Without an API key the manual fallback never bolds words, so don't retry
+        tracker = CoverageTracker(all_words, initial_batch_size=15, max_batch_size=20,
+                                  max_attempts=Config.MAX_RETRIES_PER_PARAGRAPH if self.api_key else 1)
         content_blocks = []
+        api_calls = 0
         
         # Phase 1: API-Generated Content
         print("📝 Phase 1: Generating content with API...")
@@ -110,25 +122,28 @@ class SpanishRevisionGenerator:
             end_idx = start_idx + words_per_theme if i < len(themes) - 1 else len(all_words)
             theme_words = all_words[start_idx:end_idx]
             
-            # Generate multiple paragraphs per theme
-            paragraphs_per_theme = max(2, len(theme_words) // 15)  # ~15 words per paragraph
-            
-            for j in range(paragraphs_per_theme):
-                para_start = j * 15
-                para_end = min(para_start + 15, len(theme_words))
-                target_words = theme_words[para_start:para_end]
+            # One paragraph per batch of this theme's uncovered words until the
+            # theme itself is covered; words the model skipped come back later
+            part = 0
+            while not tracker.reached(min_coverage, theme_words):
+                target_words = tracker.next_batch(theme_words)
+                if not target_words:
+                    break
+                part += 1
                 
-                print(f"  Generating paragraph {j+1}/{paragraphs_per_theme} for {theme}")
+                print(f"  Generating paragraph {part} for {theme} ({len(target_words)} words, coverage {tracker.coverage_percentage:.1f}%)")
                 paragraph = self.generate_content_with_api(vocabulary, theme, target_words)
-                content_blocks.append((f"{theme} - Parte {j+1}", paragraph))
+                content_blocks.append((f"{theme} - Parte {part}", paragraph))
+                api_calls += 1
                 
                 # Track used words
-                used_words.update(self._extract_used_words(paragraph))
+                tracker.record(paragraph, target_words)
                 time.sleep(0.5)  # Rate limiting
         
         # Phase 2: Python Verification & Gap Filling
-        print("🔍 Phase 2: Verifying vocabulary coverage...")
-        missing_words = set(all_words) - used_words
+        print(f"🔍 Phase 2: Coverage {tracker.coverage_percentage:.1f}% after {api_calls} API calls")
+        missing_words = set(tracker.missing)
+        used_words = set(tracker.covered)
         
         if missing_words:
             print(f"📌 Phase 3: Adding {len(missing_words)} missing words...")
@@ -138,7 +153,7 @@ class SpanishRevisionGenerator:
         
         # Phase 3: Compile Final Document
         print("📚 Phase 4: Compiling final document...")
-        final_content = self._compile_final_document(content_blocks, vocabulary)
+        final_content = join_chunks(self._document_chunks(content_blocks, vocabulary))
         
         # Generate statistics
         stats = VocabularyStats(
@@ -158,12 +173,6 @@ class SpanishRevisionGenerator:
                 all_words.append(word)
         return all_words
     
-    def _extract_used_words(self, text: str) -> Set[str]:
-        """Extract vocabulary words that were actually used"""
-        pattern = r'\*\*(.*?)\*\*'
-        matches = re.findall(pattern, text)
-        return set(matches)
-    
     def _generate_gap_filling_content(self, missing_words: Set[str], vocabulary: Dict) -> List[Tuple[str, str]]:
         """Generate targeted content for missing vocabulary"""
         gap_content = []
@@ -184,10 +193,10 @@ class SpanishRevisionGenerator:
         
         return gap_content
     
-    def _compile_final_document(self, content_blocks: List[Tuple[str, str]], vocabulary: Dict) -> str:
-        """Compile all content into final markdown document"""
+    def _document_chunks(self, content_blocks: List[Tuple[str, str]], vocabulary: Dict) -> Iterator[str]:
+        """Yield the final markdown document in chunks"""
         
-        content = """# 📚 Cuaderno de Revisión GCSE Español - EDICIÓN COMPLETA
+        yield """# 📚 Cuaderno de Revisión GCSE Español - EDICIÓN COMPLETA
 ## Generado con IA + Verificación Python
 
 *Cuaderno integral con verificación automática de vocabulario*
@@ -198,27 +207,25 @@ class SpanishRevisionGenerator:
         
         # Add all content blocks
         for i, (title, text) in enumerate(content_blocks, 1):
-            content += f"## Párrafo {i}: {title}\n\n"
-            content += f"{text}\n\n"
+            yield f"## Párrafo {i}: {title}\n\n"
+            yield f"{text}\n\n"
         
         # Add vocabulary checklist
-        content += self._generate_vocabulary_checklist(vocabulary, content_blocks)
-        
-        return content
+        yield from self._generate_vocabulary_checklist(vocabulary, content_blocks)
     
-    def _generate_vocabulary_checklist(self, vocabulary: Dict, content_blocks: List[Tuple[str, str]]) -> str:
+    def _generate_vocabulary_checklist(self, vocabulary: Dict, content_blocks: List[Tuple[str, str]]) -> Iterator[str]:
         """Generate comprehensive vocabulary checklist"""
         
         all_text = " ".join([text for _, text in content_blocks])
-        checklist = "\n---\n\n## ✅ Verificación Completa de Vocabulario\n\n"
+        matcher = VocabularyMatcher(self._flatten_vocabulary(vocabulary), bold_only=True)
+        used_words = matcher.used_words(all_text)
+        yield "\n---\n\n## ✅ Verificación Completa de Vocabulario\n\n"
         
         for category, word_list in vocabulary.items():
-            checklist += f"\n### {category.upper()}\n"
+            yield f"\n### {category.upper()}\n"
             for word, definition in word_list:
-                status = "✅" if f"**{word}**" in all_text else "❌"
-                checklist += f"- [{status}] **{word}** - {definition}\n"
-        
-        return checklist
+                status = "✅" if word in used_words else "❌"
+                yield f"- [{status}] **{word}** - {definition}\n"
     
     def _get_comprehensive_vocabulary(self) -> Dict:
         """
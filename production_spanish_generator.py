@@ -7,18 +7,23 @@ Optimized for 2000+ vocabulary words with GPT-5 Nano integration
 import json
 import re
 import time
-import os
-from typing import Dict, List, Tuple, Set, Optional
+import asyncio
+from typing import Dict, Iterator, List, Tuple, Optional
 from dataclasses import dataclass
 from datetime import datetime
 
-# Try to import OpenAI, fall back to requests for custom APIs
+from config import Config
+from booklet_renderer import HtmlOptions, export_booklet
+from document_writer import write_document
+from http_transport import AsyncHTTPTransport, AsyncRateLimiter, HTTPX_AVAILABLE, ProviderClient
+from vocabulary_coverage import CoverageTracker
+
+# Try to import OpenAI, fall back to the shared HTTP transport for custom APIs
 try:
     import openai
     OPENAI_AVAILABLE = True
 except ImportError:
     OPENAI_AVAILABLE = False
-    import requests
 
 @dataclass
 class GenerationStats:
@@ -60,6 +65,10 @@ class ProductionSpanishGenerator:
             "model": "gpt-5-nano-2025-08-07",
             "base_url": "https://your-endpoint.com/v1/chat/completions"
         }
+        
+        Optional keys for async mode (generate_comprehensive_booklet(..., async_mode=True)):
+            "max_concurrency": 8,         # API calls in flight at once
+            "requests_per_minute": 500    # provider rate limit
         """
         self.api_config = api_config
         self.stats = None
@@ -73,26 +82,64 @@ class ProductionSpanishGenerator:
                 base_url=api_config.get("base_url")
             )
         else:
-            self.client = None  # Use requests for custom APIs
+            self.client = None  # Use the pooled HTTP transport for custom APIs
+        
+        self.async_client = None  # Created lazily inside the event loop
+        self.async_transport = None
+        self._custom_client = None
+        self.coverage = None  # CoverageTracker for the booklet being generated
+        self.api_calls_made = 0
+    
+    def _uses_openai_client(self) -> bool:
+        return bool(self.client) and self.api_config["provider"] == "openai"
+    
+    def _attempts(self, max_retries: int) -> int:
+        """Custom APIs go through the pooled transport, which already retries transient failures"""
+        return max_retries if self._uses_openai_client() else 1
     
     def call_api(self, prompt: str, max_retries: int = 3) -> str:
         """Call API with error handling and retries"""
         
-        for attempt in range(max_retries):
+        attempts = self._attempts(max_retries)
+        for attempt in range(attempts):
             try:
-                if self.client and self.api_config["provider"] == "openai":
+                if self._uses_openai_client():
                     return self._call_openai_api(prompt)
                 else:
                     return self._call_custom_api(prompt)
                     
             except Exception as e:
                 print(f"⚠️  API call attempt {attempt + 1} failed: {e}")
-                if attempt < max_retries - 1:
+                if attempt < attempts - 1:
                     time.sleep(2 ** attempt)  # Exponential backoff
                 else:
                     print(f"❌ All API attempts failed. Using fallback.")
                     return self._generate_fallback_content(prompt)
     
+    async def call_api_async(self, prompt: str, limiter: AsyncRateLimiter, max_retries: int = 3) -> str:
+        """Async call_api: same retries and fallback, non-blocking backoff"""
+        
+        attempts = self._attempts(max_retries)
+        for attempt in range(attempts):
+            try:
+                async with limiter:
+                    if self.async_client is not None:
+                        return await self._call_openai_api_async(prompt)
+                    elif self.async_transport is not None:
+                        return await self._custom_api_client().complete_async(prompt, self.async_transport)
+                    elif self._uses_openai_client():
+                        return await asyncio.to_thread(self._call_openai_api, prompt)
+                    else:
+                        return await asyncio.to_thread(self._call_custom_api, prompt)
+                    
+            except Exception as e:
+                print(f"⚠️  API call attempt {attempt + 1} failed: {e}")
+                if attempt < attempts - 1:
+                    await asyncio.sleep(2 ** attempt)  # Exponential backoff
+                else:
+                    print(f"❌ All API attempts failed. Using fallback.")
+                    return self._generate_fallback_content(prompt)
+    
     def _call_openai_api(self, prompt: str) -> str:
         """Call OpenAI-compatible API"""
         response = self.client.chat.completions.create(
@@ -106,34 +153,37 @@ class ProductionSpanishGenerator:
         )
         return response.choices[0].message.content.strip()
     
-    def _call_custom_api(self, prompt: str) -> str:
-        """Call custom API endpoint"""
-        headers = {
-            "Authorization": f"Bearer {self.api_config['api_key']}",
-            "Content-Type": "application/json"
-        }
-        
-        data = {
-            "model": self.api_config["model"],
-            "messages": [
-                {"role": "system", "content": "You are an expert Spanish teacher creating engaging GCSE materials."},
+    async def _call_openai_api_async(self, prompt: str) -> str:
+        """Call OpenAI-compatible API with the async client"""
+        response = await self.async_client.chat.completions.create(
+            model=self.api_config["model"],
+            messages=[
+                {"role": "system", "content": "You are an expert Spanish teacher creating engaging GCSE materials. Write natural, flowing Spanish that incorporates vocabulary words seamlessly."},
                 {"role": "user", "content": prompt}
             ],
-            "max_tokens": 400,
-            "temperature": 0.7
-        }
-        
-        response = requests.post(self.api_config["base_url"], headers=headers, json=data)
-        response.raise_for_status()
-        
-        # Handle different response formats
-        result = response.json()
-        if "choices" in result:
-            return result["choices"][0]["message"]["content"].strip()
-        elif "response" in result:
-            return result["response"].strip()
-        else:
-            raise ValueError(f"Unexpected API response format: {result}")
+            max_tokens=400,
+            temperature=0.7
+        )
+        return response.choices[0].message.content.strip()
+    
+    def _custom_api_client(self) -> ProviderClient:
+        """OpenAI-style chat payload sent to base_url over the pooled transport"""
+        if self._custom_client is None:
+            self._custom_client = ProviderClient(
+                "openai",
+                self.api_config["api_key"],
+                self.api_config["model"],
+                endpoint=self.api_config["base_url"],
+                system_prompt="You are an expert Spanish teacher creating engaging GCSE materials.",
+                max_tokens=400,
+                temperature=0.7
+            )
+        return self._custom_client
+    
+    def _call_custom_api(self, prompt: str) -> str:
+        """Call custom API endpoint"""
+        # Handles both {"choices": [...]} and {"response": "..."} formats
+        return self._custom_api_client().complete(prompt)
     
     def _generate_fallback_content(self, prompt: str) -> str:
         """Generate basic content when API fails"""
@@ -266,32 +316,27 @@ class ProductionSpanishGenerator:
                         if not excess_words:
                             break
     
-    def generate_comprehensive_booklet(self, vocabulary_source, output_prefix: str = "production_spanish") -> str:
+    def generate_comprehensive_booklet(self, vocabulary_source, output_prefix: str = "production_spanish", async_mode: bool = False) -> str:
         """
         Generate comprehensive Spanish revision booklet
         
         Args:
             vocabulary_source: Vocabulary data (file path, dict, or list)
             output_prefix: Prefix for output files
+            async_mode: Run all theme/batch prompts concurrently under the
+                configured rate limit (see generate_comprehensive_booklet_async)
             
         Returns:
             Path to generated markdown file
         """
         
+        if async_mode:
+            return asyncio.run(self.generate_comprehensive_booklet_async(vocabulary_source, output_prefix))
+        
         start_time = time.time()
         print("🚀 Starting production generation...")
         
-        # Load and process vocabulary
-        vocabulary = self.load_vocabulary(vocabulary_source)
-        theme_vocabulary = self.create_theme_mapping(vocabulary)
-        
-        total_words = sum(len(words) for words in theme_vocabulary.values())
-        print(f"📚 Processing {total_words} words across {len(theme_vocabulary)} themes")
-        
-        # Initialize tracking
-        all_words_used = set()
-        api_calls_made = 0
-        estimated_cost = 0.0
+        theme_vocabulary = self._prepare_theme_vocabulary(vocabulary_source)
         
         # Generate content for each theme
         booklet_sections = []
@@ -301,16 +346,93 @@ class ProductionSpanishGenerator:
             
             theme_content = self._generate_theme_content(theme, words)
             booklet_sections.append((theme, theme_content))
-            
+        
+        return self._finish_booklet(theme_vocabulary, booklet_sections, start_time, output_prefix)
+    
+    async def generate_comprehensive_booklet_async(self, vocabulary_source, output_prefix: str = "production_spanish") -> str:
+        """
+        Async version of generate_comprehensive_booklet.
+        
+        Every theme/batch prompt is started at once and throttled by a shared
+        AsyncRateLimiter ("max_concurrency" / "requests_per_minute" in the API
+        config), so total time approaches the rate-limit floor. Custom
+        endpoints use the async pooled transport (HTTP/2 when available). Sections and
+        paragraphs are reassembled in the same order as the sync version.
+        """
+        
+        start_time = time.time()
+        print("🚀 Starting production generation (async)...")
+        
+        theme_vocabulary = self._prepare_theme_vocabulary(vocabulary_source)
+        
+        limiter = AsyncRateLimiter(
+            self.api_config.get("max_concurrency", 8),
+            self.api_config.get("requests_per_minute", 500)
+        )
+        if self.client and self.api_config["provider"] == "openai":
+            self.async_client = openai.AsyncOpenAI(
+                api_key=self.api_config["api_key"],
+                base_url=self.api_config.get("base_url")
+            )
+        elif HTTPX_AVAILABLE:
+            self.async_transport = AsyncHTTPTransport()
+        
+        try:
+            contents = await asyncio.gather(*(
+                self._generate_theme_content_async(theme, words, limiter)
+                for theme, words in theme_vocabulary.items()
+            ))
+        finally:
+            if self.async_client is not None:
+                await self.async_client.close()
+                self.async_client = None
+            if self.async_transport is not None:
+                await self.async_transport.aclose()
+                self.async_transport = None
+        
+        booklet_sections = list(zip(theme_vocabulary.keys(), contents))
+        return self._finish_booklet(theme_vocabulary, booklet_sections, start_time, output_prefix)
+    
+    def _prepare_theme_vocabulary(self, vocabulary_source) -> Dict[str, List[str]]:
+        """Load vocabulary, map it to themes and start coverage tracking"""
+        
+        vocabulary = self.load_vocabulary(vocabulary_source)
+        theme_vocabulary = self.create_theme_mapping(vocabulary)
+        
+        total_words = sum(len(words) for words in theme_vocabulary.values())
+        print(f"📚 Processing {total_words} words across {len(theme_vocabulary)} themes")
+        
+        self.coverage = CoverageTracker(
+            (word for words in theme_vocabulary.values() for word in words),
+            initial_batch_size=12,
+            max_attempts=Config.MAX_RETRIES_PER_PARAGRAPH
+        )
+        self.api_calls_made = 0
+        return theme_vocabulary
+    
+    def _theme_done(self, words: List[str]) -> bool:
+        # Per theme: stopping on global coverage would leave late themes short or empty
+        return self.coverage.reached(Config.MIN_COVERAGE_PERCENTAGE, words)
+    
+    def _finish_booklet(self, theme_vocabulary: Dict[str, List[str]], booklet_sections: List[Tuple[str, str]],
+                        start_time: float, output_prefix: str) -> str:
+        """Track usage, compute stats and write the booklet, formats and report"""
+        
+        total_words = sum(len(words) for words in theme_vocabulary.values())
+        
+        # Initialize tracking
+        all_words_used = set()
+        
+        for theme, theme_content in booklet_sections:
             # Track usage
-            theme_words_used = set(re.findall(r'\*\*(.*?)\*\*', theme_content))
+            theme_words_used = self.coverage.words_in(theme_content)
             all_words_used.update(theme_words_used)
             
-            # Estimate costs and calls
-            api_calls_made += len(words) // 12 + 1  # Batch size of 12
-            estimated_cost += (len(words) // 12 + 1) * 0.012  # Rough estimate
-            
-            print(f"  ✅ Generated {len(theme_words_used)} vocabulary integrations")
+            print(f"  ✅ {theme}: {len(theme_words_used)} vocabulary integrations")
+        
+        # Calls counted as they were made
+        api_calls_made = self.api_calls_made
+        estimated_cost = api_calls_made * 0.012  # Rough estimate
         
         # Compile final document
         generation_time = time.time() - start_time
@@ -324,12 +446,9 @@ class ProductionSpanishGenerator:
             themes_generated=len(theme_vocabulary)
         )
         
-        final_document = self._compile_final_document(booklet_sections, self.stats)
-        
-        # Save files
+        # Save files (streamed straight to disk)
         markdown_path = f"{output_prefix}_revision_booklet.md"
-        with open(markdown_path, 'w', encoding='utf-8') as f:
-            f.write(final_document)
+        write_document(markdown_path, self._document_chunks(booklet_sections, self.stats))
         
         # Generate additional formats
         self._generate_additional_formats(markdown_path, output_prefix)
@@ -345,20 +464,28 @@ class ProductionSpanishGenerator:
         return markdown_path
     
     def _generate_theme_content(self, theme: str, words: List[str]) -> str:
-        """Generate content for a specific theme"""
+        """
+        Generate content for a specific theme
+        
+        Each prompt asks for this theme's words that are still uncovered, so
+        words the model skipped are retried in later paragraphs. The batch
+        size adapts to how many requested words actually come back.
+        """
         
-        # Split words into manageable batches
-        batch_size = 12
         theme_paragraphs = []
         
-        for i in range(0, len(words), batch_size):
-            batch = words[i:i + batch_size]
+        while not self._theme_done(words):
+            batch = self.coverage.next_batch(words)
+            if not batch:
+                break
             
             # Create contextual prompt
             prompt = self._create_theme_prompt(theme, batch)
             
             # Generate content
             paragraph = self.call_api(prompt)
+            self.api_calls_made += 1
+            self.coverage.record(paragraph, batch)
             theme_paragraphs.append(paragraph)
             
             # Rate limiting
@@ -366,6 +493,36 @@ class ProductionSpanishGenerator:
         
         return "\n\n".join(theme_paragraphs)
     
+    async def _generate_theme_content_async(self, theme: str, words: List[str], limiter: AsyncRateLimiter) -> str:
+        """
+        Generate a theme in rounds: all uncovered words are split into batches
+        and requested concurrently, then coverage is updated and the next
+        round retries what is still missing. Paragraphs keep batch order.
+        """
+        
+        theme_paragraphs = []
+        rounds = 0
+        
+        while not self._theme_done(words):
+            remaining = self.coverage.eligible(words)
+            if not remaining:
+                break
+            
+            batch_size = self.coverage.batch_size
+            batches = [remaining[i:i + batch_size] for i in range(0, len(remaining), batch_size)]
+            prompts = [self._create_theme_prompt(theme, batch) for batch in batches]
+            
+            paragraphs = await asyncio.gather(*(self.call_api_async(prompt, limiter) for prompt in prompts))
+            self.api_calls_made += len(prompts)
+            for batch, paragraph in zip(batches, paragraphs):
+                self.coverage.record(paragraph, batch)
+            theme_paragraphs.extend(paragraphs)
+            rounds += 1
+        
+        print(f"  ✍️  {theme}: {len(theme_paragraphs)} paragraphs generated in {rounds} rounds")
+        
+        return "\n\n".join(theme_paragraphs)
+    
     def _create_theme_prompt(self, theme: str, words: List[str]) -> str:
         """Create contextual prompt for theme and vocabulary"""
         
@@ -395,10 +552,10 @@ REQUISITOS OBLIGATORIOS:
 El párrafo debe sonar natural, no como una lista de vocabulario forzada.
 """
     
-    def _compile_final_document(self, sections: List[Tuple[str, str]], stats: GenerationStats) -> str:
-        """Compile final document with all sections and metadata"""
+    def _document_chunks(self, sections: List[Tuple[str, str]], stats: GenerationStats) -> Iterator[str]:
+        """Yield the final document with all sections and metadata, in chunks"""
         
-        content = f"""# 📚 Cuaderno de Revisión GCSE Español - EDICIÓN PROFESIONAL
+        yield f"""# 📚 Cuaderno de Revisión GCSE Español - EDICIÓN PROFESIONAL
 ## {stats.total_words} Palabras de Vocabulario | Cobertura: {stats.coverage_percentage:.1f}%
 
 *Generado automáticamente el {datetime.now().strftime('%d/%m/%Y a las %H:%M')}*
@@ -416,55 +573,50 @@ El párrafo debe sonar natural, no como una lista de vocabulario forzada.
         
         # Add content sections
         for i, (theme, text) in enumerate(sections, 1):
-            content += f"## {i}. {theme}\n\n"
-            content += f"{text}\n\n"
-            content += "---\n\n"
+            yield f"## {i}. {theme}\n\n"
+            yield f"{text}\n\n"
+            yield "---\n\n"
         
         # Add vocabulary verification
-        content += self._generate_vocabulary_checklist(sections)
-        
-        return content
+        yield from self._generate_vocabulary_checklist(sections)
     
-    def _generate_vocabulary_checklist(self, sections: List[Tuple[str, str]]) -> str:
+    def _generate_vocabulary_checklist(self, sections: List[Tuple[str, str]]) -> Iterator[str]:
         """Generate vocabulary usage checklist"""
         
-        all_text = " ".join([text for _, text in sections])
-        used_words = set(re.findall(r'\*\*(.*?)\*\*', all_text))
-        
-        checklist = "## ✅ Lista de Verificación de Vocabulario\n\n"
+        yield "## ✅ Lista de Verificación de Vocabulario\n\n"
         
         if self.stats.coverage_percentage >= 95:
-            checklist += "🎉 **¡ÉXITO COMPLETO!** Excelente cobertura de vocabulario.\n\n"
+            yield "🎉 **¡ÉXITO COMPLETO!** Excelente cobertura de vocabulario.\n\n"
         elif self.stats.coverage_percentage >= 85:
-            checklist += "✅ **Muy buena cobertura** de vocabulario.\n\n"
+            yield "✅ **Muy buena cobertura** de vocabulario.\n\n"
         else:
-            checklist += "⚠️ **Cobertura parcial** - considerar regeneración con ajustes.\n\n"
+            yield "⚠️ **Cobertura parcial** - considerar regeneración con ajustes.\n\n"
         
         # Summary by theme
-        checklist += "### Resumen por Tema\n\n"
+        yield "### Resumen por Tema\n\n"
         for theme, text in sections:
-            theme_words = set(re.findall(r'\*\*(.*?)\*\*', text))
-            checklist += f"- **{theme}**: {len(theme_words)} palabras utilizadas\n"
-        
-        return checklist
+            theme_words = self.coverage.words_in(text)
+            yield f"- **{theme}**: {len(theme_words)} palabras utilizadas\n"
     
     def _generate_additional_formats(self, markdown_path: str, prefix: str):
-        """Generate Word and HTML versions"""
+        """Generate Word and HTML versions (one parse of the markdown)"""
         
         try:
-            # Generate Word document
-            docx_path = f"{prefix}_revision_booklet.docx"
-            os.system(f'pandoc "{markdown_path}" -o "{docx_path}"')
-            print(f"📄 Word document created: {docx_path}")
+            with open(markdown_path, 'r', encoding='utf-8') as f:
+                markdown_content = f.read()
+            
+            written = export_booklet(markdown_content, {
+                "docx": f"{prefix}_revision_booklet.docx",
+                "html": f"{prefix}_revision_booklet.html",
+            }, HtmlOptions(title="Cuaderno de Revisión GCSE Español - Edición Profesional", stylesheet="style.css"))
             
-            # Generate HTML
-            html_path = f"{prefix}_revision_booklet.html"
-            os.system(f'pandoc "{markdown_path}" -o "{html_path}" --css=style.css')
-            print(f"🌐 HTML document created: {html_path}")
+            if "docx" in written:
+                print(f"📄 Word document created: {written['docx']}")
+            print(f"🌐 HTML document created: {written['html']}")
             
         except Exception as e:
             print(f"⚠️  Could not generate additional formats: {e}")
-            print("💡 Install pandoc for automatic format conversion")
+            print("💡 Install python-docx or pandoc for Word output")
     
     def _save_generation_report(self, prefix: str):
         """Save detailed generation report"""
@@ -538,6 +690,7 @@ def main():
     print("1. Update api_configurations.json with your API key")
     print("2. Prepare your vocabulary file (JSON format)")
     print("3. Run: generator.generate_comprehensive_booklet('your_vocab.json')")
+    print("   (add async_mode=True to run prompts concurrently under the rate limit)")
     print("\nExample configuration for GPT-5 Nano:")
     print("""
     config = {
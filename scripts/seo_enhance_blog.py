@@ -1,11 +1,11 @@
 
 import os
-import time
-import json
+import asyncio
 import logging
 from dotenv import load_dotenv
 from supabase import create_client, Client
-from openai import OpenAI
+from openai import AsyncOpenAI
+from seo_enrichment import SeoEnricher
 
 # Load environment variables
 load_dotenv('.env.local')
@@ -27,7 +27,7 @@ if not all([supabase_url, supabase_key, openai_key]):
     exit(1)
 
 supabase: Client = create_client(supabase_url, supabase_key)
-client = OpenAI(api_key=openai_key)
+client = AsyncOpenAI(api_key=openai_key, max_retries=5)
 
 SYSTEM_PROMPT = """
 You are an SEO expert for a language learning website blog. 
@@ -56,13 +56,10 @@ JSON format example:
 }
 """
 
-def enhance_blog_post(post):
-    """Generate SEO metadata for a single blog post using GPT-4-nano"""
-    
-    # Construct prompt
-    user_content = f"""
-    Generate SEO content for this blog post:
+def render_post(post):
+    """Post-specific part of the GPT-4-nano prompt"""
     
+    return f"""
     Title: {post['title']}
     Excerpt: {post['excerpt']}
     Category: {post.get('category', 'Language Learning')}
@@ -71,87 +68,50 @@ def enhance_blog_post(post):
     Current SEO Title: {post.get('seo_title') or 'None'}
     """
 
+def to_update(post, seo_data):
+    """Columns to write back for a blog post"""
     try:
-        response = client.chat.completions.create(
-            model="gpt-4.1-nano", # Using effective small model
-            messages=[
-                {"role": "system", "content": SYSTEM_PROMPT},
-                {"role": "user", "content": user_content}
-            ],
-            response_format={"type": "json_object"},
-            temperature=0.7
-        )
-        
-        return json.loads(response.choices[0].message.content)
-    except Exception as e:
-        logger.error(f"   ❌ AI Generation failed: {str(e)}")
+        return {
+            "seo_title": seo_data["seo_title"],
+            "seo_description": seo_data["seo_description"],
+            "keywords": seo_data["keywords"]
+        }
+    except KeyError as e:
+        logger.error(f"   ❌ AI response missing {e} for: {post['title']}")
         return None
 
 def main():
     print("\n🚀 SEO Enhancement Script for Blog Posts")
     print("==================================================\n")
 
-    # 1. Fetch posts without SEO title or description
-    print("📥 Fetching blog posts...")
-    
-    # We want to process ALL published posts to ensure they have good SEO
-    # But specifically target ones with missing fields first
-    response = supabase.table("blog_posts") \
-        .select("*") \
-        .order("created_at", desc=True) \
-        .execute()
-    
-    posts = response.data
-    
-    # Filter for posts that need enhancement (missing fields or just generic ones)
-    # For this run, let's just do ones where seo_title is null OR empty
-    posts_to_process = [
-        p for p in posts 
-        if not p.get('seo_title') or not p.get('seo_description')
-    ]
-    
-    print(f"   Found {len(posts_to_process)} posts needing SEO enhancement\n")
-
-    success_count = 0
-    error_count = 0
-
-    for i, post in enumerate(posts_to_process, 1):
-        print(f"[{i}/{len(posts_to_process)}] Processing: {post['title']}")
-        
-        # Artificial delay to avoid rate limits
-        time.sleep(0.5)
-
-        # Generate SEO data
-        seo_data = enhance_blog_post(post)
-        
-        if seo_data:
-            # Update database
-            try:
-                update_data = {
-                    "seo_title": seo_data["seo_title"],
-                    "seo_description": seo_data["seo_description"],
-                    "keywords": seo_data["keywords"]
-                }
-                
-                supabase.table("blog_posts") \
-                    .update(update_data) \
-                    .eq("id", post['id']) \
-                    .execute()
-                
-                print(f"   ✅ Generated: {seo_data['seo_title']}")
-                print("   ✅ Saved to database\n")
-                success_count += 1
-            except Exception as e:
-                print(f"   ❌ Database update failed: {str(e)}\n")
-                error_count += 1
-        else:
-            error_count += 1
+    # Process posts where seo_title or seo_description is null OR empty,
+    # plus posts whose content changed since their SEO was generated
+    enricher = SeoEnricher(
+        supabase,
+        "blog_posts",
+        columns="id, title, slug, excerpt, category, tags, seo_title, seo_description",
+        missing_columns=["seo_title", "seo_description"],
+        instructions="Generate SEO content for this blog post:",
+        render_item=render_post,
+        to_update=to_update,
+        system_prompt=SYSTEM_PROMPT,
+        required_keys=["seo_title", "seo_description", "keywords"],
+        pack_size=10,
+        describe=lambda p: p['title'],
+        completion_params={"response_format": {"type": "json_object"}, "temperature": 0.7},
+        order="created_at",
+        desc=True,
+        openai_client=client,
+        # Regenerate when the title/excerpt/category/tags change
+        fingerprint_fields=["title", "excerpt", "category", "tags"],
+    )
+    summary = asyncio.run(enricher.run())
 
     print("==================================================")
     print("🎉 Blog SEO Enhancement Complete!")
-    print(f"   ✅ Success: {success_count}")
-    print(f"   ❌ Errors: {error_count}")
-    print(f"   📊 Total processed: {len(posts_to_process)}")
+    print(f"   ✅ Success: {summary['success']}")
+    print(f"   ❌ Errors: {summary['errors']}")
+    print(f"   📊 Total processed: {summary['total']}")
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,274 @@
+#!/usr/bin/env python3
+"""
+Async SEO Enrichment Engine
+===========================
+Shared engine for the SEO enhancement scripts (grammar pages, blog posts).
+
+What it does:
+1. Fetches only the rows whose SEO fields are null or empty (filtered in Supabase),
+   or, with fingerprinting enabled, also rows whose content changed since their
+   SEO was generated (stored in `seo_content_hash`)
+2. Generates SEO content for many rows at once with the async OpenAI client,
+   under a shared concurrency + requests-per-minute limit
+   Small prompts can be packed: `pack_size` rows share one request that
+   returns a keyed JSON array, with single-row retries for anything invalid
+   (worksheet_factory/prompt_packing.py's PromptPacker, shared with the factory)
+3. Writes results back in batches, one update().eq('id') per row, so only the
+   generated columns are ever written
+
+Used by:
+    scripts/seo_enhance_grammar.py
+    scripts/seo_enhance_blog.py
+
+Usage (the limiter and packer are shared with the root HTTP transport and
+the worksheet factory, so both directories go on the path):
+    PYTHONPATH=.:worksheet_factory python scripts/seo_enhance_grammar.py
+"""
+
+import json
+import time
+import hashlib
+import asyncio
+from typing import Any, Callable, Dict, List, Optional
+
+from openai import AsyncOpenAI
+
+from http_transport import AsyncRateLimiter
+from prompt_packing import PromptPacker
+
+
+def missing_filter(columns: List[str]) -> str:
+    """PostgREST `or` filter matching rows where any of `columns` is null or empty."""
+    return ",".join(f'{c}.is.null,{c}.eq.""' for c in columns)
+
+
+def content_fingerprint(row: Dict[str, Any], fields: List[str]) -> str:
+    """SHA-256 of the prompt input fields, stable across key order."""
+    payload = json.dumps({f: row.get(f) for f in fields}, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def _is_missing(value: Any) -> bool:
+    return value is None or value == ""
+
+
+class SeoEnricher:
+    """
+    Generates SEO content for rows of `table` that are missing it.
+
+    instructions -> the task and output format, shared by every row
+    render_item(row) -> the row-specific part of the prompt
+    to_update(row, seo_data) -> dict of columns to write back (or None to skip)
+
+    With `pack_size` > 1, that many rows share one request through a
+    PromptPacker: the instructions are sent once and the model returns a
+    keyed JSON array. Results missing any of `required_keys` are retried
+    one row at a time.
+
+    `columns` is what gets selected and must include `id`. Results are
+    written with update().eq('id') and carry only what to_update() returns
+    (plus the content hash), never columns copied from the selected row, so
+    a rename made while the run is in progress is not reverted.
+
+    An `openai_client` passed in stays open after run(); one the enricher
+    creates itself is closed at the end.
+
+    With `fingerprint_fields`, every generated row also stores a hash of those
+    fields in `hash_column`. Runs then regenerate rows whose SEO is missing or
+    whose hash no longer matches; rows that have SEO but no hash yet (written
+    before fingerprinting) just get the hash backfilled. Only list fields the
+    content depends on, never the generated SEO fields themselves.
+    """
+
+    def __init__(
+        self,
+        supabase,
+        table: str,
+        columns: str,
+        missing_columns: List[str],
+        instructions: str,
+        render_item: Callable[[Dict[str, Any]], str],
+        to_update: Callable[[Dict[str, Any], Dict[str, Any]], Optional[Dict[str, Any]]],
+        describe: Callable[[Dict[str, Any]], str] = lambda row: str(row['id']),
+        system_prompt: Optional[str] = None,
+        required_keys: Optional[List[str]] = None,
+        pack_size: int = 1,
+        model: str = "gpt-4.1-nano",
+        completion_params: Optional[Dict[str, Any]] = None,
+        order: str = "id",
+        desc: bool = False,
+        concurrency: int = 8,
+        requests_per_minute: Optional[float] = 500,
+        batch_size: int = 50,
+        page_size: int = 1000,
+        openai_client: Optional[AsyncOpenAI] = None,
+        fingerprint_fields: Optional[List[str]] = None,
+        hash_column: str = "seo_content_hash",
+    ):
+        self.supabase = supabase
+        self.table = table
+        self.columns = columns
+        self.missing_columns = missing_columns
+        self.instructions = instructions
+        self.render_item = render_item
+        self.system_prompt = system_prompt
+        self.required_keys = required_keys or ["seo_title"]
+        self.pack_size = max(1, pack_size)
+        self.to_update = to_update
+        self.describe = describe
+        self.model = model
+        self.completion_params = completion_params or {}
+        self.order = order
+        self.desc = desc
+        self.concurrency = concurrency
+        self.requests_per_minute = requests_per_minute
+        self.batch_size = batch_size
+        self.page_size = page_size
+        self.owns_client = openai_client is None
+        self.openai_client = openai_client or AsyncOpenAI(max_retries=5)
+        self.fingerprint_fields = fingerprint_fields
+        self.hash_column = hash_column
+
+        self.pending_writes: List[Dict[str, Any]] = []
+        self.success_count = 0
+        self.error_count = 0
+
+    # --- Fetch ---
+
+    def _fetch(self, columns: str, only_missing: bool) -> List[Dict[str, Any]]:
+        rows = []
+        offset = 0
+        while True:
+            query = self.supabase.table(self.table).select(columns)
+            if only_missing:
+                query = query.or_(missing_filter(self.missing_columns))
+            query = query.order(self.order, desc=self.desc)
+            if self.order != "id":
+                query = query.order("id")
+            page = query.range(offset, offset + self.page_size - 1).execute().data
+            rows.extend(page)
+            if len(page) < self.page_size:
+                break
+            offset += self.page_size
+        return rows
+
+    def fetch_pending(self) -> List[Dict[str, Any]]:
+        """
+        Rows that need SEO generated.
+
+        Without fingerprinting: rows with any of `missing_columns` null or
+        empty, filtered server-side. With fingerprinting the hash has to be
+        compared locally, so the content columns of every row are fetched.
+        """
+        if not self.fingerprint_fields:
+            return self._fetch(self.columns, only_missing=True)
+
+        rows = self._fetch(f"{self.columns}, {self.hash_column}", only_missing=False)
+        pending, backfill = [], []
+        unchanged = 0
+        for row in rows:
+            fingerprint = content_fingerprint(row, self.fingerprint_fields)
+            row['_fingerprint'] = fingerprint
+            if any(_is_missing(row.get(c)) for c in self.missing_columns):
+                pending.append(row)
+            elif not row.get(self.hash_column):
+                backfill.append(self._write_row(row, {self.hash_column: fingerprint}))
+            elif row[self.hash_column] != fingerprint:
+                pending.append(row)
+            else:
+                unchanged += 1
+
+        print(f"   {unchanged} rows unchanged since their SEO was generated")
+        if backfill:
+            print(f"   🔖 Backfilling content hash for {len(backfill)} rows with existing SEO")
+            for i in range(0, len(backfill), self.batch_size):
+                self._write_rows(backfill[i:i + self.batch_size])
+        return pending
+
+    # --- Generate ---
+
+    def _valid(self, seo_data: Any) -> bool:
+        return isinstance(seo_data, dict) and all(not _is_missing(seo_data.get(k)) for k in self.required_keys)
+
+    # --- Write back ---
+
+    def _write_row(self, row: Dict[str, Any], updates: Dict[str, Any]) -> Dict[str, Any]:
+        return {'id': row['id'], **updates}
+
+    def _write_rows(self, rows: List[Dict[str, Any]]) -> int:
+        """Write a batch; returns how many rows were saved."""
+        saved = 0
+        for row in rows:
+            changes = {k: v for k, v in row.items() if k != 'id'}
+            try:
+                self.supabase.table(self.table).update(changes).eq('id', row['id']).execute()
+                saved += 1
+            except Exception as e:
+                print(f"  ❌ Database update error for {row['id']}: {e}")
+                self.error_count += 1
+        if saved:
+            print(f"   💾 Saved batch of {saved} rows")
+        return saved
+
+    async def _flush_writes(self):
+        batch, self.pending_writes = self.pending_writes, []
+        self.success_count += await asyncio.to_thread(self._write_rows, batch)
+
+    async def _queue_write(self, row: Dict[str, Any], updates: Dict[str, Any]):
+        if self.fingerprint_fields:
+            updates = {**updates, self.hash_column: row['_fingerprint']}
+        self.pending_writes.append(self._write_row(row, updates))
+        if len(self.pending_writes) >= self.batch_size:
+            await self._flush_writes()
+
+    # --- Run ---
+
+    async def run(self) -> Dict[str, int]:
+        if self.fingerprint_fields:
+            print(f"\n📥 Fetching {self.table} rows with missing or stale SEO...")
+        else:
+            print(f"\n📥 Fetching {self.table} rows missing {', '.join(self.missing_columns)}...")
+        rows = await asyncio.to_thread(self.fetch_pending)
+        print(f"   Found {len(rows)} rows needing SEO content")
+        if not rows:
+            return {"total": 0, "success": 0, "errors": 0}
+
+        packer = PromptPacker(
+            self.openai_client,
+            self.model,
+            self.instructions,
+            render_item=self.render_item,
+            validate=lambda row, seo_data: self._valid(seo_data),
+            pack_size=self.pack_size,
+            system_prompt=self.system_prompt,
+            completion_params=self.completion_params,
+            limiter=AsyncRateLimiter(self.concurrency, self.requests_per_minute),
+        )
+        started = time.time()
+
+        async def generate_pack(pack):
+            results = await packer.run_pack(pack)
+            return [(row, results.get(row['id'])) for row in pack]
+
+        packs = [rows[i:i + self.pack_size] for i in range(0, len(rows), self.pack_size)]
+        tasks = [asyncio.create_task(generate_pack(pack)) for pack in packs]
+        done = 0
+        for future in asyncio.as_completed(tasks):
+            for row, seo_data in await future:
+                done += 1
+                updates = self.to_update(row, seo_data) if seo_data else None
+                if not updates:
+                    self.error_count += 1
+                    continue
+                print(f"[{done}/{len(rows)}] ✅ {self.describe(row)}: {str(updates.get('seo_title', 'N/A'))[:50]}")
+                await self._queue_write(row, updates)
+
+        await self._flush_writes()
+        if self.owns_client:
+            await self.openai_client.close()
+
+        elapsed = time.time() - started
+        print(f"   ⏱️ {len(rows)} rows in {elapsed:.1f}s")
+        if self.pack_size > 1:
+            print(f"   📦 {len(packs)} packed requests, {packer.fallbacks} single-row retries")
+        return {"total": len(rows), "success": self.success_count, "errors": self.error_count}
@@ -30,27 +30,19 @@ def run_generator():
     print("\n🚀 Generating Spanish revision booklet...")
     
     try:
-        # Import and run the main function
+        # Import and run the main function (Markdown, HTML and Word from one parse)
         from generate_spanish_revision import create_revision_booklet
-        create_revision_booklet()
+        written = create_revision_booklet(docx=True)
         
         print("\n📚 Files created:")
         print("   - spanish_revision_booklet.md (Markdown source)")
         print("   - spanish_revision_booklet.html (HTML preview)")
         
-        # Try to convert to Word document
-        try:
-            subprocess.run([
-                'pandoc', 
-                'spanish_revision_booklet.md', 
-                '-o', 
-                'spanish_revision_booklet.docx'
-            ], check=True)
+        if "docx" in written:
             print("   - spanish_revision_booklet.docx (Word document)")
             print("\n✅ All files generated successfully!")
-        except subprocess.CalledProcessError:
-            print("\n⚠️  Word conversion failed. Run manually:")
-            print("   pandoc spanish_revision_booklet.md -o spanish_revision_booklet.docx")
+        else:
+            print("\n⚠️  Word document skipped. Install python-docx or pandoc and run again.")
             
     except Exception as e:
         print(f"❌ Error generating booklet: {e}")
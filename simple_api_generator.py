@@ -5,10 +5,12 @@ Works with any text generation API (OpenAI, Claude, local models, etc.)
 """
 
 import json
-import re
-import requests
 import time
-from typing import Dict, List, Tuple, Set
+from typing import Dict, Iterator, List, Tuple, Set
+
+from document_writer import join_chunks
+from http_transport import ProviderClient
+from vocabulary_coverage import VocabularyMatcher
 
 class SimpleSpanishGenerator:
     def __init__(self, api_config: Dict):
@@ -22,8 +24,25 @@ class SimpleSpanishGenerator:
             "endpoint": "https://api.openai.com/v1/chat/completions",
             "model": "gpt-5-nano-2025-08-07"
         }
+        
+        "endpoint" defaults to config.API_ENDPOINTS for the type. Requests go
+        through the shared pooled transport (keep-alive, timeouts, retries).
         """
         self.api_config = api_config
+        self._provider = None
+    
+    def _provider_client(self, system_prompt: str = None) -> ProviderClient:
+        """Pooled client for the configured provider (built on first use)"""
+        if self._provider is None:
+            self._provider = ProviderClient(
+                self.api_config["type"],
+                self.api_config.get("api_key"),
+                self.api_config.get("model"),
+                endpoint=self.api_config.get("endpoint"),
+                system_prompt=system_prompt,
+                max_tokens=300
+            )
+        return self._provider
         
     def call_api(self, prompt: str) -> str:
         """Generic API caller that works with multiple providers"""
@@ -39,50 +58,16 @@ class SimpleSpanishGenerator:
     
     def _call_openai(self, prompt: str) -> str:
         """Call OpenAI-compatible API"""
-        headers = {
-            "Authorization": f"Bearer {self.api_config['api_key']}",
-            "Content-Type": "application/json"
-        }
-        
-        data = {
-            "model": self.api_config["model"],
-            "messages": [
-                {"role": "system", "content": "You are an expert Spanish teacher creating GCSE materials."},
-                {"role": "user", "content": prompt}
-            ],
-            "max_tokens": 300,
-            "temperature": 0.7
-        }
-        
-        response = requests.post(self.api_config["endpoint"], headers=headers, json=data)
-        response.raise_for_status()
-        return response.json()["choices"][0]["message"]["content"]
+        client = self._provider_client("You are an expert Spanish teacher creating GCSE materials.")
+        return client.complete(prompt)
     
     def _call_claude(self, prompt: str) -> str:
         """Call Claude API"""
-        headers = {
-            "x-api-key": self.api_config['api_key'],
-            "Content-Type": "application/json",
-            "anthropic-version": "2023-06-01"
-        }
-        
-        data = {
-            "model": self.api_config["model"],
-            "max_tokens": 300,
-            "messages": [{"role": "user", "content": prompt}]
-        }
-        
-        response = requests.post(self.api_config["endpoint"], headers=headers, json=data)
-        response.raise_for_status()
-        return response.json()["content"][0]["text"]
+        return self._provider_client().complete(prompt)
     
     def _call_custom(self, prompt: str) -> str:
-        """Call custom API endpoint"""
-        # Implement based on your specific API requirements
-        data = {"prompt": prompt, "max_tokens": 300}
-        response = requests.post(self.api_config["endpoint"], json=data)
-        response.raise_for_status()
-        return response.json()["response"]  # Adjust based on your API response format
+        """Call custom API endpoint (expects {"prompt", "max_tokens"} -> {"response"})"""
+        return self._provider_client().complete(prompt)
     
     def generate_for_vocabulary_batch(self, vocab_batch: List[str], theme: str) -> str:
         """Generate content for a batch of vocabulary words"""
@@ -159,14 +144,14 @@ class SimpleSpanishGenerator:
             content_blocks.append((theme, theme_content))
         
         # Compile final document
-        final_content = self._compile_document(content_blocks, vocabulary, all_words)
+        final_content = join_chunks(self._document_chunks(content_blocks, vocabulary, all_words))
         
         return final_content
     
-    def _compile_document(self, content_blocks: List[Tuple[str, str]], vocabulary: Dict, all_words: List[str]) -> str:
-        """Compile final document with verification"""
+    def _document_chunks(self, content_blocks: List[Tuple[str, str]], vocabulary: Dict, all_words: List[str]) -> Iterator[str]:
+        """Yield the final document with verification, in chunks"""
         
-        content = f"""# 📚 Cuaderno de Revisión GCSE Español - EDICIÓN COMPLETA
+        yield f"""# 📚 Cuaderno de Revisión GCSE Español - EDICIÓN COMPLETA
 ## {len(all_words)} Palabras de Vocabulario Integradas
 
 *Generado automáticamente con verificación de cobertura*
@@ -177,26 +162,24 @@ class SimpleSpanishGenerator:
         
         # Add content sections
         for i, (theme, text) in enumerate(content_blocks, 1):
-            content += f"## Tema {i}: {theme}\n\n"
-            content += f"{text}\n\n"
-            content += "---\n\n"
+            yield f"## Tema {i}: {theme}\n\n"
+            yield f"{text}\n\n"
+            yield "---\n\n"
         
         # Verify coverage and add checklist
         all_text = " ".join([text for _, text in content_blocks])
-        used_words = set(re.findall(r'\*\*(.*?)\*\*', all_text))
+        used_words = VocabularyMatcher(all_words, bold_only=True).used_words(all_text)
         
-        content += f"## ✅ Verificación de Vocabulario\n\n"
-        content += f"**Total de palabras**: {len(all_words)}\n"
-        content += f"**Palabras utilizadas**: {len(used_words)}\n"
-        content += f"**Cobertura**: {(len(used_words)/len(all_words)*100):.1f}%\n\n"
+        yield f"## ✅ Verificación de Vocabulario\n\n"
+        yield f"**Total de palabras**: {len(all_words)}\n"
+        yield f"**Palabras utilizadas**: {len(used_words)}\n"
+        yield f"**Cobertura**: {(len(used_words)/len(all_words)*100):.1f}%\n\n"
         
         if len(used_words) == len(all_words):
-            content += "🎉 **¡ÉXITO COMPLETO!** Todas las palabras han sido utilizadas.\n\n"
+            yield "🎉 **¡ÉXITO COMPLETO!** Todas las palabras han sido utilizadas.\n\n"
         else:
             missing = set(all_words) - used_words
-            content += f"⚠️ Faltan {len(missing)} palabras: {', '.join(list(missing)[:10])}...\n\n"
-        
-        return content
+            yield f"⚠️ Faltan {len(missing)} palabras: {', '.join(list(missing)[:10])}...\n\n"
 
 def create_sample_vocabulary_file():
     """Create a sample vocabulary file for testing"""
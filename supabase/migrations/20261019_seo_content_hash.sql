@@ -0,0 +1,15 @@
+-- Migration: Add seo_content_hash to grammar_pages and blog_posts
+-- Date: 2026-10-19
+-- Lets the SEO enhancement scripts regenerate only rows whose prompt inputs changed
+
+ALTER TABLE grammar_pages
+ADD COLUMN IF NOT EXISTS seo_content_hash TEXT DEFAULT NULL;
+
+ALTER TABLE blog_posts
+ADD COLUMN IF NOT EXISTS seo_content_hash TEXT DEFAULT NULL;
+
+COMMENT ON COLUMN grammar_pages.seo_content_hash IS
+'SHA-256 fingerprint of the fields used to build the SEO prompt (title, description, sections, ...), written by scripts/seo_enhance_grammar.py. SEO is regenerated when it no longer matches the page content.';
+
+COMMENT ON COLUMN blog_posts.seo_content_hash IS
+'SHA-256 fingerprint of the fields used to build the SEO prompt (title, excerpt, category, tags), written by scripts/seo_enhance_blog.py. SEO is regenerated when it no longer matches the post content.';
@@ -0,0 +1,247 @@
+# vocabulary_coverage.py
+"""
+Vocabulary matching and incremental coverage tracking for the booklet generators
+One Aho-Corasick pass finds every vocabulary word in a text; the tracker updates
+after every API response and decides which words go into the next prompt
+"""
+
+import unicodedata
+from collections import deque
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+def fold_text(text: str) -> str:
+    """Case- and accent-insensitive form of `text` (ñ is kept; whitespace collapsed)"""
+    decomposed = unicodedata.normalize("NFD", text.casefold())
+    kept = []
+    for c in decomposed:
+        if unicodedata.combining(c) and not (c == "\u0303" and kept and kept[-1] == "n"):
+            continue
+        kept.append(c)
+    return " ".join(unicodedata.normalize("NFC", "".join(kept)).split())
+
+VERB_ENDINGS = {
+    "ar": ("o", "as", "a", "amos", "ais", "an", "e", "es", "en", "ado", "ada", "ados", "adas", "ando", "aba", "aban"),
+    "er": ("o", "es", "e", "emos", "eis", "en", "a", "as", "an", "ido", "ida", "idos", "idas", "iendo", "ia", "ian"),
+    "ir": ("o", "es", "e", "imos", "is", "en", "a", "as", "an", "ido", "ida", "idos", "idas", "iendo", "ia", "ian"),
+}
+
+def spanish_inflections(form: str) -> Set[str]:
+    """
+    Common inflected forms of a folded Spanish word: plurals, gender variants
+    and regular present/participle/gerund verb endings. Multi-word phrases
+    are left alone.
+    """
+    if " " in form or len(form) < 3:
+        return set()
+    forms = set()
+    last = form[-1]
+    ending = form[-2:]
+    stem = form[:-2]
+    if ending in VERB_ENDINGS and len(stem) >= 2:
+        forms.update(stem + suffix for suffix in VERB_ENDINGS[ending])
+    elif last in "aeiou":
+        forms.add(form + "s")
+    elif last == "z":
+        forms.add(form[:-1] + "ces")
+    else:
+        forms.update((form + "es", form + "a", form + "as"))  # trabajador -> trabajadores, trabajadora
+    if last in "oa":
+        forms.update(form[:-1] + suffix for suffix in ("o", "a", "os", "as"))
+    forms.discard(form)
+    return forms
+
+class VocabularyMatcher:
+    """
+    Aho-Corasick matcher built once from a vocabulary.
+
+    Text is folded (case and accents) and scanned in a single pass, however
+    many words there are. With `bold_only` a word only counts inside
+    **...**, which is how the booklets mark vocabulary; otherwise matches
+    must sit on word boundaries. `inflections=True` also matches plural,
+    gender and regular verb forms; an inflected form never overrides a word
+    that is itself in the vocabulary.
+
+    Usage:
+        matcher = VocabularyMatcher(words, bold_only=True)
+        used = matcher.used_words(all_text)
+    """
+
+    def __init__(self, words: Iterable[str], bold_only: bool = False, inflections: bool = False):
+        self.words: List[str] = list(dict.fromkeys(words))
+        self.bold_only = bold_only
+
+        forms: Dict[str, List[str]] = {}
+        for word in self.words:
+            forms.setdefault(fold_text(word), []).append(word)
+        if inflections:
+            base = set(forms)
+            for word in self.words:
+                for form in spanish_inflections(fold_text(word)):
+                    if form not in base:
+                        forms.setdefault(form, []).append(word)
+
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[List[Tuple[int, Tuple[str, ...]]]] = [[]]
+        for form, owners in forms.items():
+            if form:
+                self._add(f"**{form}**" if bold_only else form, tuple(owners))
+        self._link()
+
+    def _add(self, pattern: str, owners: Tuple[str, ...]):
+        state = 0
+        for c in pattern:
+            nxt = self._goto[state].get(c)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[state][c] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+            state = nxt
+        self._out[state].append((len(pattern), owners))
+
+    def _link(self):
+        # Breadth-first failure links; outputs of the fallback state are inherited
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for c, nxt in self._goto[state].items():
+                queue.append(nxt)
+                fallback = self._fail[state]
+                while fallback and c not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                target = self._goto[fallback].get(c, 0)
+                self._fail[nxt] = target if target != nxt else 0
+                self._out[nxt] = self._out[nxt] + self._out[self._fail[nxt]]
+
+    def finditer(self, text: str) -> Iterator[Tuple[int, int, Tuple[str, ...]]]:
+        """(start, end, words) for every match, as offsets into fold_text(text)"""
+        folded = fold_text(text)
+        goto, fail, out = self._goto, self._fail, self._out
+        state = 0
+        for i, c in enumerate(folded):
+            while state and c not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(c, 0)
+            for length, owners in out[state]:
+                start, end = i + 1 - length, i + 1
+                if not self.bold_only and (
+                    (start > 0 and folded[start - 1].isalnum()) or (end < len(folded) and folded[end].isalnum())
+                ):
+                    continue
+                yield start, end, owners
+
+    def counts(self, text: str) -> Dict[str, int]:
+        """{word: occurrences} for the vocabulary words found in `text`"""
+        found: Dict[str, int] = {}
+        for _, _, owners in self.finditer(text):
+            for word in owners:
+                found[word] = found.get(word, 0) + 1
+        return found
+
+    def used_words(self, text: str) -> Set[str]:
+        return {word for _, _, owners in self.finditer(text) for word in owners}
+
+class CoverageTracker:
+    """
+    Tracks which vocabulary words have appeared in generated text.
+
+    After each response, `record` marks the requested words that came back in
+    **bold** and updates the observed per-word hit rate. `next_batch` then
+    hands out words that are still uncovered, sized by that rate: the batch
+    grows while the model reliably uses every word and shrinks when words get
+    dropped. Words that were requested `max_attempts` times without appearing
+    are left for the caller's gap filling.
+
+    Usage:
+        tracker = CoverageTracker(all_words)
+        while not tracker.reached(95.0):
+            batch = tracker.next_batch()
+            if not batch:
+                break
+            tracker.record(call_api(make_prompt(batch)), batch)
+    """
+
+    def __init__(self, words: Iterable[str], initial_batch_size: int = 12, min_batch_size: int = 4,
+                 max_batch_size: int = 20, target_hit_rate: float = 0.8, max_attempts: int = 3,
+                 inflections: bool = False):
+        self.words: List[str] = list(dict.fromkeys(words))
+        self.matcher = VocabularyMatcher(self.words, bold_only=True, inflections=inflections)
+        self.covered: Set[str] = set()
+        self.attempts: Dict[str, int] = {w: 0 for w in self.words}
+
+        self.batch_size = initial_batch_size
+        self.min_batch_size = min_batch_size
+        self.max_batch_size = max_batch_size
+        self.target_hit_rate = target_hit_rate
+        self.max_attempts = max_attempts
+        self.hit_rate: Optional[float] = None  # moving average of requested words used
+        self.responses = 0
+
+    # --- Recording ---
+
+    def words_in(self, text: str) -> Set[str]:
+        """Vocabulary words that appear in **bold** in `text`"""
+        return self.matcher.used_words(text)
+
+    def record(self, text: str, requested: Optional[List[str]] = None) -> Set[str]:
+        """Update coverage from one response; returns the newly covered words"""
+        found = self.words_in(text)
+        new = found - self.covered
+        self.covered |= found
+        self.responses += 1
+
+        if requested:
+            for word in requested:
+                if word in self.attempts:
+                    self.attempts[word] += 1
+            rate = sum(1 for w in requested if w in found) / len(requested)
+            self.hit_rate = rate if self.hit_rate is None else 0.6 * self.hit_rate + 0.4 * rate
+            self._adapt_batch_size()
+        return new
+
+    def _adapt_batch_size(self):
+        if self.hit_rate >= self.target_hit_rate:
+            self.batch_size = min(self.max_batch_size, self.batch_size + 2)
+        elif self.hit_rate < self.target_hit_rate - 0.1:
+            # Shrink in proportion to how far below target the model is
+            scaled = int(self.batch_size * self.hit_rate / self.target_hit_rate)
+            self.batch_size = max(self.min_batch_size, min(self.batch_size - 1, scaled))
+
+    # --- Selection ---
+
+    def eligible(self, words: Optional[Iterable[str]] = None) -> List[str]:
+        """Uncovered words that have not used up their attempts, in vocabulary order"""
+        pool = self.words if words is None else words
+        return [w for w in pool if w not in self.covered and self.attempts.get(w, 0) < self.max_attempts]
+
+    def next_batch(self, preferred: Optional[Iterable[str]] = None, size: Optional[int] = None) -> List[str]:
+        """
+        Next words to request: uncovered words from `preferred` (e.g. the
+        current theme; all words if None), fewest attempts first.
+        """
+        size = size or self.batch_size
+        candidates = self.eligible(preferred)
+        candidates.sort(key=lambda w: self.attempts[w])  # stable: keeps vocabulary order
+        return candidates[:size]
+
+    # --- Reporting ---
+
+    @property
+    def missing(self) -> List[str]:
+        return [w for w in self.words if w not in self.covered]
+
+    @property
+    def coverage_percentage(self) -> float:
+        return (len(self.covered) / len(self.words)) * 100 if self.words else 100.0
+
+    def coverage_of(self, words: Iterable[str]) -> float:
+        """Coverage of a subset of the vocabulary, e.g. one theme's words"""
+        pool = set(words)
+        return (len(pool & self.covered) / len(pool)) * 100 if pool else 100.0
+
+    def reached(self, min_coverage: float, words: Optional[Iterable[str]] = None) -> bool:
+        """Whether coverage (of `words`, or of the whole vocabulary) is at least `min_coverage`"""
+        coverage = self.coverage_percentage if words is None else self.coverage_of(words)
+        return coverage >= min_coverage
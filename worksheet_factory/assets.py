@@ -0,0 +1,98 @@
+import os
+import base64
+import mimetypes
+from typing import Dict, Optional, Tuple
+
+ASSET_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Never resolved by DNS: requests to it are answered by AssetRegistry.install()
+ASSET_ORIGIN = "https://assets.worksheet-factory.local/"
+
+
+class AssetRegistry:
+    """
+    Static files the templates need (the logo, ...), loaded once per process.
+
+    Instead of base64-encoding an image into every render payload, put
+    `assets.url(name)` in the data and call `await assets.install(page)`
+    after creating the page: Chromium then fetches the URL and the route
+    answers it from memory. `data_uri(name)` is still there for anything
+    that has to embed the image (it is memoised as well, and reuses a
+    pre-encoded `*_base64.txt` file when one exists).
+    """
+
+    def __init__(self, base_dir: str = ASSET_DIR):
+        self.base_dir = base_dir
+        self.sources: Dict[str, Tuple[str, Optional[str]]] = {}
+        self._bytes: Dict[str, bytes] = {}
+        self._data_uris: Dict[str, str] = {}
+
+    def register(self, name: str, filename: str, base64_filename: Optional[str] = None):
+        """`base64_filename` is a pre-encoded copy used when `filename` is missing (or for data URIs)."""
+        self.sources[name] = (filename, base64_filename)
+        self._bytes.pop(name, None)
+        self._data_uris.pop(name, None)
+
+    def _path(self, filename: Optional[str]) -> Optional[str]:
+        if not filename:
+            return None
+        path = filename if os.path.isabs(filename) else os.path.join(self.base_dir, filename)
+        return path if os.path.exists(path) else None
+
+    def _read_base64(self, name: str) -> Optional[str]:
+        path = self._path(self.sources[name][1])
+        if path is None:
+            return None
+        with open(path, "r", encoding="utf-8") as f:
+            return "".join(f.read().split())  # stored wrapped at 80 columns
+
+    def mimetype(self, name: str) -> str:
+        return mimetypes.guess_type(name)[0] or "application/octet-stream"
+
+    def get_bytes(self, name: str) -> Optional[bytes]:
+        """Raw file contents, or None if neither the file nor its base64 copy exists."""
+        if name not in self._bytes:
+            path = self._path(self.sources[name][0])
+            if path is not None:
+                with open(path, "rb") as f:
+                    self._bytes[name] = f.read()
+            else:
+                encoded = self._read_base64(name)
+                if encoded is None:
+                    return None
+                self._bytes[name] = base64.b64decode(encoded)
+        return self._bytes[name]
+
+    def data_uri(self, name: str) -> str:
+        """`data:<mime>;base64,...` for templates that need the image inline ("" if missing)."""
+        if name not in self._data_uris:
+            encoded = self._read_base64(name)
+            if encoded is None:
+                data = self.get_bytes(name)
+                if data is None:
+                    return ""
+                encoded = base64.b64encode(data).decode("utf-8")
+            self._data_uris[name] = f"data:{self.mimetype(name)};base64,{encoded}"
+        return self._data_uris[name]
+
+    def url(self, name: str) -> str:
+        """URL the page loads the asset from ("" if the asset is missing, like data_uri)."""
+        return f"{ASSET_ORIGIN}{name}" if self.get_bytes(name) is not None else ""
+
+    async def install(self, page):
+        """Answer requests for ASSET_ORIGIN on this page from the in-memory cache."""
+        async def handle(route):
+            name = route.request.url[len(ASSET_ORIGIN):].split("?", 1)[0]
+            data = self.get_bytes(name) if name in self.sources else None
+            if data is None:
+                await route.fulfill(status=404, body="")
+            else:
+                await route.fulfill(status=200, body=data, content_type=self.mimetype(name),
+                                    headers={"Cache-Control": "max-age=31536000, immutable"})
+
+        await page.route(f"{ASSET_ORIGIN}**", handle)
+
+
+# Shared by every script in the factory
+assets = AssetRegistry()
+assets.register("logo.png", "logo.png", base64_filename="logo_base64.txt")
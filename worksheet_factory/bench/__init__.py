@@ -0,0 +1,4 @@
+"""
+Benchmark harness for the worksheet factories.
+Run from worksheet_factory/: python -m bench.run --help
+"""
@@ -0,0 +1,232 @@
+"""
+Crossword layout microbenchmark and property checks.
+
+Builds thousands of realistic crossword word lists (8-10 answers from one
+theme/unit, as the worksheet prompt asks for) from the repo's vocabulary
+CSVs and runs them through crossword_layout.build_crossword_layout for every
+combination of engine, attempts and grid size. Reports placement rate, grid
+density, intersections and time per layout, and checks every layout is a
+valid crossword (in bounds, letters agree, connected, no accidental words).
+
+Usage (from worksheet_factory/):
+    python -m bench.crossword_bench
+    python -m bench.crossword_bench --lists 5000 --attempts 10,50,200 --grid auto,14,18 --engines greedy,bestfit
+"""
+
+import os
+import csv
+import sys
+import json
+import time
+import random
+import argparse
+import statistics
+from collections import defaultdict
+from datetime import datetime
+
+from crossword_layout import ENGINES, build_crossword_layout
+
+REPO_ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..")
+
+# (csv file, columns that identify a topic)
+VOCAB_SOURCES = [
+    ("GCSE_processed.csv", ("theme_name", "theme_name.1")),
+    ("Vocab_French_final.csv", ("category", "subcategory")),
+    ("Edexcel_with_articles_and_cleaned.csv", ("unit_name",)),
+]
+
+def clean_answer(answer):
+    """The same normalisation build_crossword_layout applies."""
+    return answer.upper().replace(" ", "").replace("-", "").replace("'", "")
+
+def load_topics(min_words=8):
+    """{(source, language, topic): [word, ...]} for every topic with enough usable words."""
+    topics = defaultdict(list)
+    for filename, topic_columns in VOCAB_SOURCES:
+        path = os.path.join(REPO_ROOT, filename)
+        if not os.path.exists(path):
+            print(f"⚠️ {filename} not found, skipping")
+            continue
+        with open(path, encoding="utf-8-sig", newline="") as f:
+            for row in csv.DictReader(f):
+                word = (row.get("word") or "").split("|")[0].split(",")[0].strip()
+                if not 2 < len(clean_answer(word)) < 20:
+                    continue
+                topic = " / ".join((row.get(c) or "").strip() for c in topic_columns)
+                topics[(filename, (row.get("language") or "").strip().lower(), topic)].append(word)
+    return {key: list(dict.fromkeys(words)) for key, words in topics.items()
+            if len(set(words)) >= min_words}
+
+def sample_word_lists(topics, count, seed, min_words=8, max_words=10):
+    rng = random.Random(seed)
+    keys = sorted(topics)
+    lists = []
+    for _ in range(count):
+        words = topics[rng.choice(keys)]
+        picked = rng.sample(words, min(len(words), rng.randint(min_words, max_words)))
+        lists.append([{"answer": w, "clue": ""} for w in picked])
+    return lists
+
+# --- Properties ---
+
+def cells(word):
+    for i, letter in enumerate(word['answer']):
+        if word['orientation'] == 'across':
+            yield word['row'], word['col'] + i, letter
+        else:
+            yield word['row'] + i, word['col'], letter
+
+def check_layout(layout, grid_size, word_list):
+    """List of property violations (empty for a valid crossword)."""
+    problems = []
+    grid = {}
+    owners = defaultdict(set)
+    for index, word in enumerate(layout):
+        for r, c, letter in cells(word):
+            if not (0 <= r < grid_size and 0 <= c < grid_size):
+                problems.append(f"{word['answer']} leaves the grid")
+                break
+            if grid.get((r, c), letter) != letter:
+                problems.append(f"letter clash at {(r, c)}")
+            grid[(r, c)] = letter
+            owners[(r, c)].add(index)
+
+    # Only words from the input, each at most as often as it was given
+    available = defaultdict(int)
+    for item in word_list:
+        available[clean_answer(item['answer'])] += 1
+    for word in layout:
+        available[word['answer']] -= 1
+        if available[word['answer']] < 0:
+            problems.append(f"{word['answer']} placed more often than given")
+
+    # Every run of 2+ letters must be exactly one placed word (no accidental words, no clumping)
+    placed_runs = {(w['row'], w['col'], w['orientation'], len(w['answer'])) for w in layout}
+    for (r, c) in grid:
+        for orientation, (dr, dc) in (("across", (0, 1)), ("down", (1, 0))):
+            if (r - dr, c - dc) in grid:
+                continue  # not the start of a run
+            length = 1
+            while (r + dr * length, c + dc * length) in grid:
+                length += 1
+            if length > 1 and (r, c, orientation, length) not in placed_runs:
+                problems.append(f"unplanned {orientation} run of {length} at {(r, c)}")
+
+    # Connected: every word reachable from the first through shared cells
+    if layout:
+        seen, stack = {0}, [0]
+        while stack:
+            current = stack.pop()
+            for r, c, _ in cells(layout[current]):
+                for other in owners[(r, c)] - seen:
+                    seen.add(other)
+                    stack.append(other)
+        if len(seen) != len(layout):
+            problems.append(f"{len(layout) - len(seen)} word(s) not connected")
+    return problems
+
+def layout_stats(layout, grid_size, word_list):
+    usable = sum(1 for item in word_list if 2 < len(clean_answer(item['answer'])) < 20)
+    filled = defaultdict(int)
+    for word in layout:
+        for r, c, _ in cells(word):
+            filled[(r, c)] += 1
+    if filled:
+        rows = [r for r, _ in filled]
+        cols = [c for _, c in filled]
+        bbox = (max(rows) - min(rows) + 1) * (max(cols) - min(cols) + 1)
+    else:
+        bbox = 1
+    return {
+        "placement": len(layout) / usable if usable else 1.0,
+        "perfect": len(layout) == usable,
+        "density": len(filled) / (grid_size * grid_size),
+        "bbox_density": len(filled) / bbox,
+        "intersections": sum(1 for n in filled.values() if n > 1),
+    }
+
+# --- Runner ---
+
+def run_config(word_lists, engine, attempts, grid_size, seed):
+    random.seed(seed)
+    times, stats, violations = [], [], []
+    for word_list in word_lists:
+        start = time.perf_counter()
+        layout, size = build_crossword_layout(word_list, attempts=attempts, grid_size=grid_size, engine=engine)
+        times.append(time.perf_counter() - start)
+        stats.append(layout_stats(layout, size, word_list))
+        problems = check_layout(layout, size, word_list)
+        if problems:
+            violations.append({"words": [w['answer'] for w in word_list], "problems": problems[:5]})
+
+    times.sort()
+    return {
+        "engine": engine,
+        "attempts": attempts,
+        "grid": grid_size or "auto",
+        "layouts": len(word_lists),
+        "placement_pct": round(100 * statistics.mean(s["placement"] for s in stats), 2),
+        "perfect_pct": round(100 * sum(s["perfect"] for s in stats) / len(stats), 2),
+        "density_pct": round(100 * statistics.mean(s["density"] for s in stats), 2),
+        "bbox_density_pct": round(100 * statistics.mean(s["bbox_density"] for s in stats), 2),
+        "intersections": round(statistics.mean(s["intersections"] for s in stats), 2),
+        "ms_p50": round(1000 * times[len(times) // 2], 3),
+        "ms_p95": round(1000 * times[min(len(times) - 1, int(len(times) * 0.95))], 3),
+        "violations": len(violations),
+        "violation_examples": violations[:3],
+    }
+
+def print_table(rows):
+    print(f"\n{'engine':<9} {'attempts':>8} {'grid':>5} {'placed%':>8} {'perfect%':>9} {'dens%':>6} "
+          f"{'bbox%':>6} {'cross':>6} {'ms p50':>8} {'ms p95':>8} {'bad':>5}")
+    for r in rows:
+        print(f"{r['engine']:<9} {r['attempts']:>8} {str(r['grid']):>5} {r['placement_pct']:>8.2f} "
+              f"{r['perfect_pct']:>9.2f} {r['density_pct']:>6.1f} {r['bbox_density_pct']:>6.1f} "
+              f"{r['intersections']:>6.2f} {r['ms_p50']:>8.3f} {r['ms_p95']:>8.3f} {r['violations']:>5}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark crossword layout quality against time.")
+    parser.add_argument("--lists", type=int, default=2000, help="word lists per configuration")
+    parser.add_argument("--attempts", default="10,50", help="comma-separated attempts values")
+    parser.add_argument("--grid", default="auto", help="comma-separated grid sizes ('auto' = production sizing)")
+    parser.add_argument("--engines", default=",".join(ENGINES), help=f"comma-separated: {', '.join(ENGINES)}")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--out", default="output/bench", help="where the results JSON goes")
+    args = parser.parse_args(argv)
+
+    engines = [e.strip() for e in args.engines.split(",") if e.strip()]
+    unknown = [e for e in engines if e not in ENGINES]
+    if unknown:
+        raise SystemExit(f"Unknown engine(s): {', '.join(unknown)} (known: {', '.join(ENGINES)})")
+    attempts_values = [int(a) for a in args.attempts.split(",")]
+    grid_sizes = [None if g.strip() == "auto" else int(g) for g in args.grid.split(",")]
+
+    topics = load_topics()
+    word_lists = sample_word_lists(topics, args.lists, args.seed)
+    print(f"🧩 {len(word_lists)} word lists from {len(topics)} topics; "
+          f"{len(engines) * len(attempts_values) * len(grid_sizes)} configurations")
+
+    results = []
+    for engine in engines:
+        for attempts in attempts_values:
+            for grid_size in grid_sizes:
+                print(f"   ⏳ {engine}, attempts={attempts}, grid={grid_size or 'auto'}...")
+                results.append(run_config(word_lists, engine, attempts, grid_size, args.seed))
+
+    print_table(results)
+
+    os.makedirs(args.out, exist_ok=True)
+    path = os.path.join(args.out, f"crossword-{datetime.now().strftime('%Y%m%d-%H%M%S')}.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"settings": vars(args), "topics": len(topics), "results": results}, f, indent=2)
+    print(f"\n📝 Results: {path}")
+
+    bad = sum(r["violations"] for r in results)
+    if bad:
+        print(f"❌ {bad} layout(s) broke a crossword property; see violation_examples in the results")
+        return 1
+    print("✅ Every layout passed the property checks")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
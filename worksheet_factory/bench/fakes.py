@@ -0,0 +1,314 @@
+import os
+import csv
+import json
+import time
+import uuid
+import asyncio
+import threading
+from types import SimpleNamespace
+from typing import Any, Dict, List, Optional
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+FIXTURES_DIR = os.path.join(BENCH_DIR, "fixtures")
+LLM_FIXTURES_DIR = os.path.join(FIXTURES_DIR, "llm")
+VOCAB_CSV = os.path.join(BENCH_DIR, "..", "..", "GCSE_processed.csv")
+
+# (route, role, text that identifies it), checked in order
+ROUTES = [
+    ("descriptions", "user", "Write a product description IN ENGLISH"),
+    ("factory_worksheet", "system", "You are a strict JSON generator for language learning worksheets."),
+    ("gcse_generate", "system", "GCSE Modern Foreign Languages Exam Writer"),
+    ("gcse_verify", "system", "You are a helpful AI editor."),
+    ("gcse_repair", "system", "You are a strict editor."),
+]
+
+
+def route_for(messages: List[Dict[str, str]]) -> str:
+    """Which recorded fixture answers this chat request."""
+    for route, role, needle in ROUTES:
+        if any(m["role"] == role and needle in m["content"] for m in messages):
+            return route
+    raise KeyError(f"No LLM fixture route matches this request (known: {[r[0] for r in ROUTES]})")
+
+
+def packed_keys(messages: List[Dict[str, str]]) -> Optional[List[str]]:
+    """Item keys of a packed PromptPacker request (the JSON array after 'Items:'), else None."""
+    prompt = messages[-1]["content"]
+    if "Items:\n" not in prompt:
+        return None
+    items = json.loads(prompt.split("Items:\n", 1)[1])
+    return [str(item["key"]) for item in items]
+
+
+def load_llm_fixtures(path: str = LLM_FIXTURES_DIR) -> Dict[str, Dict[str, Any]]:
+    fixtures = {}
+    for name in sorted(os.listdir(path)):
+        if name.endswith(".json"):
+            with open(os.path.join(path, name), encoding="utf-8") as f:
+                fixtures[name[:-5]] = json.load(f)
+    return fixtures
+
+
+def chat_response(content: str, prompt_tokens: int, completion_tokens: int, model: str):
+    """Just enough of an OpenAI ChatCompletion for the factories and instrumentation."""
+    return SimpleNamespace(
+        model=model,
+        choices=[SimpleNamespace(message=SimpleNamespace(content=content), finish_reason="stop")],
+        usage=SimpleNamespace(prompt_tokens=prompt_tokens, completion_tokens=completion_tokens,
+                              total_tokens=prompt_tokens + completion_tokens),
+    )
+
+
+class FakeOpenAI:
+    """
+    Replays recorded chat completions instead of calling the API.
+
+    Each fixture in bench/fixtures/llm/<route>.json holds the response
+    `content`, its `usage` and the `latency_ms` it took when recorded; the
+    reply is delayed by latency_ms * latency_scale so concurrency behaves as
+    it would against the real API. A null `content` echoes the request's
+    JSON back (the verification pass). Packed fixtures (`"packed": true`)
+    hold one `item` result that is repeated for every key of a packed
+    request, with usage scaled by the number of items; a single-item
+    request gets the item itself.
+
+    Usage:
+        factory.client = FakeOpenAI(load_llm_fixtures(), latency_scale=0.5)
+    """
+
+    def __init__(self, fixtures: Dict[str, Dict[str, Any]], latency_scale: float = 1.0):
+        self.fixtures = fixtures
+        self.latency_scale = latency_scale
+        self.calls: Dict[str, int] = {}
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    async def create(self, model: str, messages: List[Dict[str, str]], **kwargs):
+        route = route_for(messages)
+        fixture = self.fixtures[route]
+        self.calls[route] = self.calls.get(route, 0) + 1
+
+        usage = fixture.get("usage", {})
+        prompt_tokens = usage.get("prompt_tokens", 0)
+        completion_tokens = usage.get("completion_tokens", 0)
+        latency = fixture.get("latency_ms", 0) / 1000
+
+        keys = packed_keys(messages) if fixture.get("packed") else None
+        if fixture.get("packed") and keys is None:
+            scale = 1 / fixture.get("items", 1)
+            prompt_tokens, completion_tokens = int(prompt_tokens * scale), int(completion_tokens * scale)
+            content = json.dumps(fixture["item"], ensure_ascii=False)
+        elif keys is not None:
+            scale = len(keys) / fixture.get("items", 1)
+            prompt_tokens, completion_tokens = int(prompt_tokens * scale), int(completion_tokens * scale)
+            latency *= max(1.0, scale ** 0.5)  # output grows with the pack, prefill mostly doesn't
+            content = json.dumps({"results": [dict(fixture["item"], key=key) for key in keys]}, ensure_ascii=False)
+        elif fixture.get("content") is None:
+            content = messages[-1]["content"]
+        else:
+            content = json.dumps(fixture["content"], ensure_ascii=False)
+
+        if latency and self.latency_scale:
+            await asyncio.sleep(latency * self.latency_scale)
+        return chat_response(content, prompt_tokens, completion_tokens, model)
+
+
+class RecordingOpenAI:
+    """
+    Wraps a real AsyncOpenAI client and saves one fixture per route
+    (the latest response wins) so FakeOpenAI can replay it later.
+    """
+
+    def __init__(self, client, path: str = LLM_FIXTURES_DIR):
+        self.client = client
+        self.path = path
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    async def create(self, model: str, messages: List[Dict[str, str]], **kwargs):
+        route = route_for(messages)
+        start = time.perf_counter()
+        response = await self.client.chat.completions.create(model=model, messages=messages, **kwargs)
+        latency_ms = int((time.perf_counter() - start) * 1000)
+
+        content = json.loads(response.choices[0].message.content)
+        fixture = {
+            "route": route,
+            "model": model,
+            "latency_ms": latency_ms,
+            "usage": {"prompt_tokens": response.usage.prompt_tokens,
+                      "completion_tokens": response.usage.completion_tokens},
+        }
+        if route == "descriptions":
+            results = content.get("results", [content])
+            item = dict(results[0]) if results else {}
+            item.pop("key", None)
+            fixture.update(packed=True, items=max(1, len(results)), item=item)
+        else:
+            fixture["content"] = content
+
+        os.makedirs(self.path, exist_ok=True)
+        with open(os.path.join(self.path, f"{route}.json"), "w", encoding="utf-8") as f:
+            json.dump(fixture, f, ensure_ascii=False, indent=2)
+        return response
+
+
+# ---------------------------------------------------------------------------
+# Supabase / Storage stand-in
+# ---------------------------------------------------------------------------
+
+class FakeQuery:
+    """The subset of the PostgREST query builder the factories use."""
+
+    def __init__(self, db: "FakeSupabase", table: str):
+        self.db = db
+        self.table = table
+        self.op = "select"
+        self.columns: Optional[List[str]] = None
+        self.filters: List[tuple] = []
+        self.bounds: Optional[tuple] = None
+        self.single_row = False
+        self.payload: List[Dict[str, Any]] = []
+        self.on_conflict: Optional[str] = None
+
+    def select(self, columns: str = "*", **kwargs):
+        self.columns = None if columns.strip() == "*" else [c.strip() for c in columns.split(",")]
+        return self
+
+    def eq(self, column: str, value):
+        self.filters.append((column, value))
+        return self
+
+    def range(self, start: int, end: int):
+        self.bounds = (start, end)
+        return self
+
+    def single(self):
+        self.single_row = True
+        return self
+
+    def insert(self, rows):
+        self.op = "insert"
+        self.payload = rows if isinstance(rows, list) else [rows]
+        return self
+
+    def upsert(self, rows, on_conflict: Optional[str] = None, **kwargs):
+        self.op = "upsert"
+        self.payload = rows if isinstance(rows, list) else [rows]
+        self.on_conflict = on_conflict
+        return self
+
+    def execute(self):
+        self.db.round_trip()
+        with self.db.lock:
+            rows = self.db.tables.setdefault(self.table, [])
+            if self.op == "select":
+                data = [r for r in rows if all(r.get(c) == v for c, v in self.filters)]
+                if self.bounds:
+                    data = data[self.bounds[0]:self.bounds[1] + 1]
+                if self.columns:
+                    data = [{c: r.get(c) for c in self.columns} for r in data]
+                else:
+                    data = [dict(r) for r in data]
+                if self.single_row:
+                    return SimpleNamespace(data=data[0] if data else None, count=None)
+                return SimpleNamespace(data=data, count=None)
+
+            written = []
+            for row in self.payload:
+                row = dict(row)
+                row.setdefault("id", str(uuid.uuid4()))
+                existing = None
+                if self.op == "upsert" and self.on_conflict:
+                    existing = next((r for r in rows if r.get(self.on_conflict) == row.get(self.on_conflict)), None)
+                if existing is not None:
+                    existing.update(row)
+                    written.append(dict(existing))
+                else:
+                    rows.append(row)
+                    written.append(dict(row))
+            return SimpleNamespace(data=written, count=None)
+
+
+class FakeBucket:
+    def __init__(self, db: "FakeSupabase", bucket: str):
+        self.db = db
+        self.bucket = bucket
+
+    def upload(self, path: str, file, file_options: Optional[Dict[str, str]] = None):
+        self.db.round_trip()
+        target = os.path.join(self.db.storage_dir, self.bucket, path)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        data = file.read() if hasattr(file, "read") else open(file, "rb").read()
+        with open(target, "wb") as f:
+            f.write(data)
+        with self.db.lock:
+            self.db.uploaded_bytes += len(data)
+        return SimpleNamespace(path=path, full_path=f"{self.bucket}/{path}")
+
+    def get_public_url(self, path: str) -> str:
+        return f"http://127.0.0.1/storage/v1/object/public/{self.bucket}/{path}"
+
+
+class FakeStorage:
+    def __init__(self, db: "FakeSupabase"):
+        self.db = db
+
+    def from_(self, bucket: str) -> FakeBucket:
+        return FakeBucket(self.db, bucket)
+
+
+class FakeSupabase:
+    """
+    In-memory Supabase client: tables are lists of dicts, storage writes to
+    `storage_dir`. Every request waits `latency_ms` to stand in for the
+    network round trip (the real client is synchronous, so this blocks the
+    event loop exactly as it does in production).
+    """
+
+    def __init__(self, tables: Optional[Dict[str, List[Dict[str, Any]]]] = None,
+                 storage_dir: str = "output/bench/storage", latency_ms: float = 0):
+        self.tables = {name: [dict(r) for r in rows] for name, rows in (tables or {}).items()}
+        self.storage_dir = storage_dir
+        self.latency_ms = latency_ms
+        self.storage = FakeStorage(self)
+        self.lock = threading.Lock()
+        self.round_trips = 0
+        self.uploaded_bytes = 0
+
+    def round_trip(self):
+        with self.lock:
+            self.round_trips += 1
+        if self.latency_ms:
+            time.sleep(self.latency_ms / 1000)
+
+    def table(self, name: str) -> FakeQuery:
+        return FakeQuery(self, name)
+
+
+def load_vocabulary_rows(path: str = VOCAB_CSV) -> List[Dict[str, Any]]:
+    """centralized_vocabulary rows (KS4, AQA) from the repo's GCSE vocabulary export."""
+    rows = []
+    with open(path, encoding="utf-8-sig", newline="") as f:
+        for row in csv.DictReader(f):
+            if not row.get("word") or not row.get("translation"):
+                continue
+            rows.append({
+                "language": row["language"],
+                "word": row["word"],
+                "translation": row["translation"],
+                "part_of_speech": row.get("Part of speech") or None,
+                "curriculum_level": "KS4",
+                "category": None,
+                "subcategory": None,
+                "theme_name": row.get("theme_name") or None,
+                "unit_name": row.get("theme_name.1") or None,
+                "exam_board_code": row.get("exam_board_code") or "AQA",
+                "tier": row.get("tier") or "both",
+            })
+    return rows
+
+
+def load_reading_tasks(path: str = os.path.join(FIXTURES_DIR, "reading_tasks.json")):
+    """(tasks, questions) rows for the reading_comprehension_* tables."""
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    return data["tasks"], data["questions"]
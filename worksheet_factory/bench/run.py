@@ -0,0 +1,401 @@
+"""
+End-to-end benchmark for the worksheet factories.
+
+Runs factory.process_job, GCSEWorksheetGenerator.generate and
+publish_assessment against recorded LLM responses (bench/fixtures/llm), an
+in-memory Supabase/Storage seeded from GCSE_processed.csv, and a real
+headless Chromium. For each concurrency level it reports throughput
+(worksheets/min), p50/p95 per stage (from instrumentation.py spans) and
+peak RSS of the process tree, Chromium included.
+
+Usage (from worksheet_factory/):
+    python -m bench.run                                   # all scenarios at 1, 2, 4
+    python -m bench.run --scenario gcse --concurrency 1,8 --jobs 16
+    python -m bench.run --llm-latency 0                   # CPU/render cost only
+    python -m bench.run --baseline output/bench/last.json # exit 1 on regression
+    python -m bench.run --record                          # refresh fixtures from the real API
+"""
+
+import os
+import io
+import sys
+import json
+import time
+import random
+import shutil
+import asyncio
+import logging
+import argparse
+import tempfile
+import threading
+import contextlib
+from datetime import datetime
+
+# The factories read credentials at import time; the clients are replaced below
+for name, value in (("OPENAI_API_KEY", "bench-placeholder"),
+                    ("NEXT_PUBLIC_SUPABASE_URL", "http://127.0.0.1:54321"),
+                    ("SUPABASE_SERVICE_ROLE_KEY", "bench-placeholder"),
+                    ("STRIPE_SECRET_KEY", "")):
+    os.environ.setdefault(name, value)
+
+import factory
+import gcse_factory
+import publish_assessment
+from instrumentation import metrics
+
+from bench.fakes import (FakeOpenAI, FakeSupabase, RecordingOpenAI, load_llm_fixtures,
+                         load_reading_tasks, load_vocabulary_rows)
+
+try:
+    import psutil
+    PSUTIL_AVAILABLE = True
+except ImportError:
+    PSUTIL_AVAILABLE = False
+
+SCENARIOS = ("factory", "gcse", "publish")
+END_TO_END = "end_to_end"
+
+# --- Peak RSS ---
+
+def _proc_tree_rss(pid):
+    """RSS in bytes of `pid` and all its descendants, read from /proc (Linux)."""
+    children = {}
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                ppid = int(f.read().rsplit(")", 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+        children.setdefault(ppid, []).append(int(entry))
+
+    page = os.sysconf("SC_PAGE_SIZE")
+    total, stack = 0, [pid]
+    while stack:
+        current = stack.pop()
+        try:
+            with open(f"/proc/{current}/statm") as f:
+                total += int(f.read().split()[1]) * page
+        except (OSError, IndexError, ValueError):
+            pass
+        stack.extend(children.get(current, []))
+    return total
+
+def tree_rss(pid=None):
+    pid = pid or os.getpid()
+    if PSUTIL_AVAILABLE:
+        try:
+            proc = psutil.Process(pid)
+            total = proc.memory_info().rss
+            for child in proc.children(recursive=True):
+                try:
+                    total += child.memory_info().rss
+                except psutil.NoSuchProcess:
+                    pass
+            return total
+        except psutil.NoSuchProcess:
+            return 0
+    if os.path.isdir("/proc"):
+        return _proc_tree_rss(pid)
+    import resource
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+class PeakRSS:
+    """Samples the RSS of this process and its children (Chromium) in a background thread."""
+
+    def __init__(self, interval=0.05):
+        self.interval = interval
+        self.peak = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.peak = max(self.peak, tree_rss())
+            self._stop.wait(self.interval)
+
+    def __enter__(self):
+        self.peak = tree_rss()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.peak = max(self.peak, tree_rss())
+
+# --- Workloads ---
+
+def install_fakes(llm, db, workdir):
+    """Point every factory module at the fakes and at a scratch output folder."""
+    for module in (factory, gcse_factory):
+        module.client = llm
+        module.supabase = db
+    publish_assessment.openai_client = llm
+    publish_assessment.supabase = db
+    publish_assessment.STRIPE_SECRET_KEY = None
+
+    factory.OUTPUT_DIR = os.path.join(workdir, "factory")
+    gcse_factory.OUTPUT_DIR = os.path.join(workdir, "gcse")
+    publish_assessment.OUTPUT_DIR = os.path.join(workdir, "published")
+    for path in (factory.OUTPUT_DIR, gcse_factory.OUTPUT_DIR, publish_assessment.OUTPUT_DIR):
+        os.makedirs(path, exist_ok=True)
+
+def distinct(items, count, rename):
+    """`count` items cycled from `items`; repeats are renamed so output files never collide."""
+    picked = []
+    for i in range(count):
+        item = dict(items[i % len(items)])
+        if i >= len(items):
+            rename(item, i // len(items))
+        picked.append(item)
+    return picked
+
+def factory_jobs(count):
+    jobs = factory.fetch_jobs_from_supabase()
+    def rename(job, n):
+        job['topic'] = f"{job['topic']} {n + 1}"
+    return distinct(jobs, count, rename)
+
+def gcse_jobs(count, language="es", exam_board="AQA", tier="higher"):
+    rows = gcse_factory.fetch_vocab_paginated(language, exam_board)
+    batches = []
+    for job in gcse_factory.build_jobs(rows, language, exam_board, tier):
+        for batch in gcse_factory.make_batches(job['vocab']):
+            batches.append(dict(job, vocab=batch))
+    def rename(job, n):
+        job['unit'] = f"{job['unit']} {n + 1}"
+    return distinct(batches, count, rename)
+
+def publish_tasks(db, tasks, questions, count):
+    """Seed `count` tasks (cloned from the fixtures) and return their ids."""
+    seeded, seeded_questions = [], []
+    for i in range(count):
+        source = tasks[i % len(tasks)]
+        task = dict(source, id=f"{source['id'][:-4]}{i:04d}", title=f"{source['title']} {i + 1}")
+        seeded.append(task)
+        seeded_questions += [dict(q, task_id=task['id']) for q in questions if q['task_id'] == source['id']]
+    db.tables["reading_comprehension_tasks"] = seeded
+    db.tables["reading_comprehension_questions"] = seeded_questions
+    return [t['id'] for t in seeded]
+
+async def run_factory(job):
+    return await factory.process_job(job)
+
+async def run_gcse(job):
+    generator = gcse_factory.GCSEWorksheetGenerator()
+    return await generator.generate(dict(job), job['batch_num'], job['total_batches']) is not None
+
+async def run_publish(task_id):
+    await publish_assessment.publish_assessment(task_id)
+    return True
+
+RUNNERS = {"factory": run_factory, "gcse": run_gcse, "publish": run_publish}
+
+async def run_level(scenario, items, concurrency):
+    semaphore = asyncio.Semaphore(concurrency)
+    runner = RUNNERS[scenario]
+
+    async def run_one(item):
+        async with semaphore:
+            try:
+                with metrics.span(END_TO_END, scenario=scenario):
+                    return bool(await runner(item))
+            except Exception as e:
+                print(f"   ❌ {scenario}: {e}", file=sys.__stderr__)
+                return False
+
+    return await asyncio.gather(*(run_one(item) for item in items))
+
+def measure(scenario, items, concurrency, quiet):
+    metrics.reset(run_name=f"bench-{scenario}-c{concurrency}")
+    sink = io.StringIO() if quiet else sys.stdout
+    with PeakRSS() as rss, contextlib.redirect_stdout(sink):
+        start = time.perf_counter()
+        results = asyncio.run(run_level(scenario, items, concurrency))
+        wall = time.perf_counter() - start
+
+    ok = sum(results)
+    stages = {
+        stage: {"count": n, "total_s": round(total, 4), "p50_s": round(p50, 4), "p95_s": round(p95, 4)}
+        for stage, n, total, mean, p50, p95 in metrics.summary_rows()
+    }
+    tokens = {"prompt": 0, "completion": 0}
+    errors = {}
+    for (name, labels), value in metrics.counters.items():
+        if name == "llm_prompt_tokens_total":
+            tokens["prompt"] += int(value)
+        elif name == "llm_completion_tokens_total":
+            tokens["completion"] += int(value)
+        elif name == "stage_errors_total":
+            stage = dict(labels).get("stage", "?")
+            errors[stage] = errors.get(stage, 0) + int(value)
+    metrics.write_prometheus(os.path.join(metrics.output_dir, f"{metrics.run_id}.prom"))
+
+    return {
+        "scenario": scenario,
+        "concurrency": concurrency,
+        "jobs": len(items),
+        "ok": ok,
+        "wall_s": round(wall, 3),
+        "throughput_per_min": round(ok / wall * 60, 2) if wall else 0.0,
+        "peak_rss_mb": round(rss.peak / 2 ** 20, 1),
+        "tokens": tokens,
+        "stage_errors": errors,
+        "stages": stages,
+    }
+
+# --- Reporting ---
+
+def print_report(results):
+    print(f"\n{'=' * 72}")
+    print("📊 Benchmark results")
+    print(f"{'=' * 72}")
+    for r in results:
+        e2e = r["stages"].get(END_TO_END, {})
+        print(f"\n▶ {r['scenario']} @ concurrency {r['concurrency']}: "
+              f"{r['ok']}/{r['jobs']} ok in {r['wall_s']:.1f}s")
+        print(f"   ⚡ {r['throughput_per_min']:.1f} worksheets/min   "
+              f"⏱️ p50 {e2e.get('p50_s', 0):.2f}s  p95 {e2e.get('p95_s', 0):.2f}s   "
+              f"🧠 peak RSS {r['peak_rss_mb']:.0f} MB")
+        if r["stage_errors"]:
+            print("   ⚠️ stage errors: " + ", ".join(f"{k}={v}" for k, v in r["stage_errors"].items()))
+        print(f"   {'stage':<18} {'count':>6} {'p50 s':>8} {'p95 s':>8} {'total s':>9}")
+        for stage, s in r["stages"].items():
+            if stage != END_TO_END:
+                print(f"   {stage:<18} {s['count']:>6} {s['p50_s']:>8.3f} {s['p95_s']:>8.3f} {s['total_s']:>9.2f}")
+
+def compare(results, baseline_path, tolerance):
+    """Regressions against a previous results file: lower throughput or higher p95."""
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = {(r["scenario"], r["concurrency"]): r for r in json.load(f)["results"]}
+
+    regressions = []
+    for r in results:
+        base = baseline.get((r["scenario"], r["concurrency"]))
+        if not base:
+            continue
+        label = f"{r['scenario']} @ {r['concurrency']}"
+        if r["throughput_per_min"] < base["throughput_per_min"] * (1 - tolerance):
+            regressions.append(f"{label}: throughput {base['throughput_per_min']} -> {r['throughput_per_min']}/min")
+        for stage, s in r["stages"].items():
+            old = base["stages"].get(stage)
+            if old and old["p95_s"] > 0.05 and s["p95_s"] > old["p95_s"] * (1 + tolerance):
+                regressions.append(f"{label}: {stage} p95 {old['p95_s']:.3f}s -> {s['p95_s']:.3f}s")
+        if r["peak_rss_mb"] > base["peak_rss_mb"] * (1 + tolerance):
+            regressions.append(f"{label}: peak RSS {base['peak_rss_mb']} -> {r['peak_rss_mb']} MB")
+    return regressions
+
+# --- Entry point ---
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the worksheet factories end to end.")
+    parser.add_argument("--scenario", default=",".join(SCENARIOS),
+                        help="comma-separated: factory, gcse, publish")
+    parser.add_argument("--concurrency", default="1,2,4", help="comma-separated concurrency levels")
+    parser.add_argument("--jobs", type=int, default=8, help="worksheets per level")
+    parser.add_argument("--llm-latency", type=float, default=1.0,
+                        help="multiplier on the recorded LLM latency (0 = instant replies)")
+    parser.add_argument("--db-latency-ms", type=float, default=15.0,
+                        help="simulated Supabase round trip per request")
+    parser.add_argument("--seed", type=int, default=1234)
+    parser.add_argument("--out", default="output/bench", help="where results JSON and metrics go")
+    parser.add_argument("--baseline", help="previous results JSON to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed regression (0.2 = 20%%)")
+    parser.add_argument("--keep-output", action="store_true", help="keep the generated PDFs")
+    parser.add_argument("--record", action="store_true",
+                        help="call the real OpenAI API once per scenario and save the responses as fixtures")
+    parser.add_argument("--verbose", action="store_true", help="show the factories' own output")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    scenarios = [s.strip() for s in args.scenario.split(",") if s.strip()]
+    unknown = [s for s in scenarios if s not in SCENARIOS]
+    if unknown:
+        raise SystemExit(f"Unknown scenario(s): {', '.join(unknown)}")
+    levels = [int(c) for c in args.concurrency.split(",")]
+    if args.record:
+        levels, args.jobs = [1], 1
+
+    if not args.verbose:
+        logging.getLogger(gcse_factory.__name__).setLevel(logging.WARNING)
+
+    os.makedirs(args.out, exist_ok=True)
+    workdir = tempfile.mkdtemp(prefix="worksheet-bench-")
+    metrics.output_dir = os.path.join(args.out, "metrics")
+    metrics.reset(run_name="bench-setup")
+
+    if args.record:
+        from openai import AsyncOpenAI
+        llm = RecordingOpenAI(AsyncOpenAI(api_key=os.environ["OPENAI_API_KEY"]))
+        print("🎙️  Recording LLM fixtures from the live API...")
+    else:
+        llm = FakeOpenAI(load_llm_fixtures(), latency_scale=args.llm_latency)
+
+    tasks, questions = load_reading_tasks()
+    db = FakeSupabase({"centralized_vocabulary": load_vocabulary_rows()},
+                      storage_dir=os.path.join(workdir, "storage"), latency_ms=args.db_latency_ms)
+    install_fakes(llm, db, workdir)
+
+    print(f"🏁 Benchmark: {', '.join(scenarios)} at concurrency {levels}, {args.jobs} worksheets per level")
+    print(f"   LLM latency x{args.llm_latency}, Supabase round trip {args.db_latency_ms:g}ms, "
+          f"RSS via {'psutil' if PSUTIL_AVAILABLE else '/proc'}")
+
+    results = []
+    try:
+        for scenario in scenarios:
+            with contextlib.redirect_stdout(io.StringIO()):
+                if scenario == "factory":
+                    items = factory_jobs(args.jobs)
+                elif scenario == "gcse":
+                    items = gcse_jobs(args.jobs)
+                    for i, job in enumerate(items):
+                        job['batch_num'], job['total_batches'] = i + 1, len(items)
+                else:
+                    items = publish_tasks(db, tasks, questions, args.jobs)
+            if not items:
+                print(f"⚠️ No {scenario} jobs could be built, skipping.")
+                continue
+
+            for concurrency in levels:
+                random.seed(args.seed)
+                print(f"   ⏳ {scenario} @ {concurrency}...")
+                results.append(measure(scenario, items, concurrency, quiet=not args.verbose))
+    finally:
+        if not args.keep_output:
+            shutil.rmtree(workdir, ignore_errors=True)
+        else:
+            print(f"📁 Generated files kept in {workdir}")
+
+    print_report(results)
+
+    report = {
+        "created_at": datetime.now().isoformat(),
+        "settings": {k: v for k, v in vars(args).items() if k not in ("baseline",)},
+        "db_round_trips": db.round_trips,
+        "llm_calls": getattr(llm, "calls", {}),
+        "results": results,
+    }
+    # Compare before writing: the baseline may be last.json itself
+    regressions = compare(results, args.baseline, args.tolerance) if args.baseline else []
+
+    path = os.path.join(args.out, f"bench-{datetime.now().strftime('%Y%m%d-%H%M%S')}.json")
+    for target in (path, os.path.join(args.out, "last.json")):
+        with open(target, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    print(f"\n📝 Results: {path}")
+
+    if args.baseline:
+        if regressions:
+            print(f"\n❌ {len(regressions)} regression(s) vs {args.baseline}:")
+            for line in regressions:
+                print(f"   - {line}")
+            return 1
+        print(f"\n✅ No regressions vs {args.baseline} (tolerance {args.tolerance:.0%})")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,158 @@
+import time
+from collections import defaultdict
+from typing import Any, Dict, FrozenSet, List, Optional, Sequence, Tuple
+
+# Columns that must be present on every `products` row sent through upsert.
+# PostgREST turns an upsert into INSERT ... ON CONFLICT, so NOT NULL columns
+# without a default have to be included even when the row already exists.
+PRODUCT_REQUIRED_COLUMNS = ("id", "name", "slug", "price_cents")
+PRODUCT_SELECT = ", ".join(PRODUCT_REQUIRED_COLUMNS)
+
+
+class BulkWriter:
+    """
+    Buffers row changes for one table and writes them with batched upserts.
+
+    Rows are flushed when the buffer reaches `chunk_size` or when more than
+    `flush_interval` seconds have passed since the last flush. If a batch is
+    rejected, its rows are retried one by one so a single bad row is reported
+    in `errors` without losing the rest of the batch.
+
+    Each upsert only carries rows with the same set of columns: PostgREST
+    sends the union of a batch's keys and fills the gaps with NULL, which
+    would wipe columns a row never meant to touch. `update()` rows carry
+    just the key and the changes; the required (NOT NULL) columns the
+    INSERT half of the upsert needs are read fresh right before the write,
+    so a stale copy from the caller's earlier select is never written back.
+
+    Usage:
+        with BulkWriter(supabase, "products") as writer:
+            for product in products:
+                writer.update(product, {"thumbnail_url": url})
+        print(writer.written, writer.errors)
+    """
+
+    def __init__(
+        self,
+        client,
+        table: str,
+        chunk_size: int = 200,
+        flush_interval: Optional[float] = 5.0,
+        on_conflict: str = "id",
+        required_columns: Sequence[str] = PRODUCT_REQUIRED_COLUMNS,
+    ):
+        self.client = client
+        self.table = table
+        self.chunk_size = chunk_size
+        self.flush_interval = flush_interval
+        self.on_conflict = on_conflict
+        self.required_columns = tuple(required_columns)
+
+        self.buffer: List[Tuple[bool, Dict[str, Any]]] = []  # (is_update, row)
+        self.written: List[Dict[str, Any]] = []
+        self.errors: List[Tuple[Dict[str, Any], str]] = []
+        self.round_trips = 0
+        self._last_flush = time.monotonic()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.flush()
+        return False
+
+    def _queue(self, is_update: bool, row: Dict[str, Any]):
+        self.buffer.append((is_update, row))
+        if len(self.buffer) >= self.chunk_size or self._interval_elapsed():
+            self.flush()
+
+    def add(self, row: Dict[str, Any]):
+        """Queue a full row for upsert."""
+        self._queue(False, dict(row))
+
+    def update(self, row: Dict[str, Any], changes: Dict[str, Any]):
+        """
+        Queue `changes` for an existing row. Only the conflict key is taken
+        from `row`; columns not in `changes` are left as they are.
+        """
+        self._queue(True, {self.on_conflict: row[self.on_conflict], **changes})
+
+    def flush(self) -> int:
+        """Write everything in the buffer. Returns the number of rows written."""
+        if not self.buffer:
+            return 0
+
+        pending, self.buffer = self.buffer, []
+        written_before = len(self.written)
+
+        # One upsert per column set, so no row gets NULLs for columns it didn't send
+        groups: Dict[Tuple[bool, FrozenSet[str]], List[Dict[str, Any]]] = defaultdict(list)
+        for is_update, row in pending:
+            groups[(is_update, frozenset(row))].append(row)
+
+        for (is_update, _), rows in groups.items():
+            for i in range(0, len(rows), self.chunk_size):
+                chunk = rows[i:i + self.chunk_size]
+                if is_update:
+                    chunk = self._with_required_columns(chunk)
+                    if not chunk:
+                        continue
+                try:
+                    res = self.client.table(self.table).upsert(chunk, on_conflict=self.on_conflict).execute()
+                    self.round_trips += 1
+                    self.written.extend(res.data or chunk)
+                except Exception as e:
+                    self.round_trips += 1
+                    print(f"   ⚠️ Batch upsert of {len(chunk)} rows into {self.table} failed ({e}). Retrying row by row...")
+                    self._write_rows_individually(chunk)
+
+        self._last_flush = time.monotonic()
+        return len(self.written) - written_before
+
+    def _with_required_columns(self, rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Add the current values of the required columns to update rows (one
+        select per chunk). Rows that no longer exist are reported in `errors`
+        rather than being re-inserted by the upsert.
+        """
+        missing = [col for col in self.required_columns if col not in rows[0]]
+        if not missing:
+            return rows
+        keys = [row[self.on_conflict] for row in rows]
+        columns = ", ".join(dict.fromkeys([self.on_conflict, *missing]))
+        try:
+            res = self.client.table(self.table).select(columns).in_(self.on_conflict, keys).execute()
+            self.round_trips += 1
+        except Exception as e:
+            self.round_trips += 1
+            print(f"   ❌ Could not read {self.table} rows to update ({e}).")
+            self.errors.extend((row, str(e)) for row in rows)
+            return []
+
+        current = {r[self.on_conflict]: r for r in res.data or []}
+        complete = []
+        for row in rows:
+            existing = current.get(row[self.on_conflict])
+            if existing is None:
+                self.errors.append((row, "row not found"))
+                print(f"   ❌ Error writing {row[self.on_conflict]}: row not found")
+                continue
+            complete.append({**{col: existing[col] for col in missing}, **row})
+        return complete
+
+    def _write_rows_individually(self, rows: List[Dict[str, Any]]):
+        for row in rows:
+            try:
+                res = self.client.table(self.table).upsert(row, on_conflict=self.on_conflict).execute()
+                self.round_trips += 1
+                self.written.extend(res.data or [row])
+            except Exception as e:
+                self.round_trips += 1
+                self.errors.append((row, str(e)))
+                label = row.get("name") or row.get(self.on_conflict)
+                print(f"   ❌ Error writing {label}: {e}")
+
+    def _interval_elapsed(self) -> bool:
+        if self.flush_interval is None:
+            return False
+        return time.monotonic() - self._last_flush >= self.flush_interval
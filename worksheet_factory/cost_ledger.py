@@ -0,0 +1,284 @@
+import os
+import sys
+import time
+import sqlite3
+import argparse
+import threading
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+LEDGER_PATH = os.getenv("WORKSHEET_LEDGER", "output/cost_ledger.sqlite")
+
+# USD per 1M tokens (input, output); update when OpenAI pricing changes
+PRICES = {
+    "gpt-4.1-nano": (0.10, 0.40),
+    "gpt-4.1-mini": (0.40, 1.60),
+    "gpt-4.1": (2.00, 8.00),
+    "gpt-4o-mini": (0.15, 0.60),
+    "gpt-4o": (2.50, 10.00),
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    script TEXT NOT NULL,
+    started_at TEXT NOT NULL,
+    finished_at TEXT,
+    budget_tokens INTEGER,
+    budget_seconds REAL,
+    stop_reason TEXT
+);
+CREATE TABLE IF NOT EXISTS calls (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    run_id INTEGER NOT NULL REFERENCES runs(id),
+    ts REAL NOT NULL,
+    topic TEXT,
+    stage TEXT NOT NULL,
+    model TEXT NOT NULL,
+    prompt_tokens INTEGER NOT NULL,
+    completion_tokens INTEGER NOT NULL,
+    latency_s REAL,
+    retries INTEGER NOT NULL DEFAULT 0,
+    cost_usd REAL
+);
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    run_id INTEGER NOT NULL REFERENCES runs(id),
+    ts REAL NOT NULL,
+    topic TEXT,
+    status TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS calls_run_topic ON calls(run_id, topic);
+"""
+
+
+def call_cost(model: str, prompt_tokens: int, completion_tokens: int) -> Optional[float]:
+    """Estimated USD for one call; None for models missing from PRICES."""
+    # Dated snapshots ("gpt-4o-mini-2024-07-18") price like their base model
+    base = max((m for m in PRICES if model == m or model.startswith(m + "-")), key=len, default=None)
+    if base is None:
+        return None
+    price_in, price_out = PRICES[base]
+    return (prompt_tokens * price_in + completion_tokens * price_out) / 1_000_000
+
+
+def _env_number(name: str) -> Optional[float]:
+    value = os.getenv(name)
+    return float(value) if value else None
+
+
+class CostLedger:
+    """
+    Per-call record of tokens, latency, retries and model in a local SQLite
+    file (`output/cost_ledger.sqlite`), plus an optional budget for the run.
+
+    Attach it to the shared metrics so every `metrics.record_usage` call is
+    written as a row, tagged with the topic of the enclosing span. The
+    schedulers ask `exhausted()` before starting each job: once the token or
+    wall-clock budget is used up no new jobs start, while jobs already in
+    flight finish normally.
+
+    Usage:
+        ledger = CostLedger.from_env("factory").attach(metrics)
+        ...
+        if ledger.skip(job['topic']):
+            continue  # budget used up
+        ...
+        ledger.finish()
+    """
+
+    def __init__(self, script: str, path: str = LEDGER_PATH,
+                 max_tokens: Optional[int] = None, max_seconds: Optional[float] = None):
+        self.path = path
+        self.max_tokens = max_tokens
+        self.max_seconds = max_seconds
+        self.tokens = 0
+        self.stop_reason: Optional[str] = None
+        self._metrics = None
+        self._started = time.perf_counter()
+        self._lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.executescript(SCHEMA)
+        cursor = self.db.execute(
+            "INSERT INTO runs (script, started_at, budget_tokens, budget_seconds) VALUES (?, ?, ?, ?)",
+            (script, datetime.now().isoformat(timespec="seconds"), max_tokens, max_seconds),
+        )
+        self.db.commit()
+        self.run_id = cursor.lastrowid
+
+    @classmethod
+    def from_env(cls, script: str, path: str = LEDGER_PATH) -> "CostLedger":
+        """Budget from WORKSHEET_BUDGET_TOKENS / WORKSHEET_BUDGET_SECONDS (unset = unlimited)."""
+        max_tokens = _env_number("WORKSHEET_BUDGET_TOKENS")
+        return cls(script, path=path, max_tokens=int(max_tokens) if max_tokens else None,
+                   max_seconds=_env_number("WORKSHEET_BUDGET_SECONDS"))
+
+    def attach(self, metrics) -> "CostLedger":
+        metrics.sinks.append(self.record_event)
+        self._metrics = metrics
+        return self
+
+    # --- Recording ---
+
+    def record_event(self, event: Dict[str, Any]):
+        """Metrics sink: one `llm_usage` event becomes one row in `calls`."""
+        prompt, completion = event["prompt_tokens"], event["completion_tokens"]
+        with self._lock:
+            self.tokens += prompt + completion
+            self.db.execute(
+                "INSERT INTO calls (run_id, ts, topic, stage, model, prompt_tokens, completion_tokens,"
+                " latency_s, retries, cost_usd) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (self.run_id, time.time(), event.get("topic"), event["stage"], event["model"],
+                 prompt, completion, event.get("latency_s"), event.get("retries", 0),
+                 call_cost(event["model"], prompt, completion)),
+            )
+            self.db.commit()
+
+    def record_job(self, topic: str, status: str):
+        """Outcome of one scheduled job: ok, failed or skipped (budget)."""
+        with self._lock:
+            self.db.execute("INSERT INTO jobs (run_id, ts, topic, status) VALUES (?, ?, ?, ?)",
+                            (self.run_id, time.time(), topic, status))
+            self.db.commit()
+
+    # --- Budget ---
+
+    @property
+    def elapsed(self) -> float:
+        return time.perf_counter() - self._started
+
+    def exhausted(self) -> Optional[str]:
+        """Why the run should stop scheduling new jobs, or None while within budget."""
+        if self.stop_reason is None:
+            if self.max_tokens is not None and self.tokens >= self.max_tokens:
+                self.stop_reason = f"token budget reached ({self.tokens}/{self.max_tokens})"
+            elif self.max_seconds is not None and self.elapsed >= self.max_seconds:
+                self.stop_reason = f"time budget reached ({self.elapsed:.0f}s/{self.max_seconds:.0f}s)"
+            if self.stop_reason:
+                print(f"\n⛔ {self.stop_reason}; not starting any more jobs")
+        return self.stop_reason
+
+    def skip(self, topic: str) -> bool:
+        """True (and records the skip) when the budget says `topic` must not start."""
+        if not self.exhausted():
+            return False
+        self.record_job(topic, "skipped")
+        if self._metrics is not None:
+            self._metrics.count("jobs_skipped_total", reason="budget")
+        return True
+
+    # --- Reporting ---
+
+    def finish(self):
+        with self._lock:
+            self.db.execute("UPDATE runs SET finished_at = ?, stop_reason = ? WHERE id = ?",
+                            (datetime.now().isoformat(timespec="seconds"), self.stop_reason, self.run_id))
+            self.db.commit()
+        print_report(self.db, self.run_id)
+        print(f"   📝 Ledger: {self.path} (run {self.run_id})")
+        if self._metrics is not None and self.record_event in self._metrics.sinks:
+            self._metrics.sinks.remove(self.record_event)
+        self.db.close()
+
+
+def topic_report(db: sqlite3.Connection, run_id: int) -> List[Dict[str, Any]]:
+    """Calls, tokens, cost, latency and retries per topic for one run, most expensive first."""
+    rows = db.execute(
+        """
+        SELECT COALESCE(topic, '(none)'), COUNT(*), SUM(prompt_tokens), SUM(completion_tokens),
+               SUM(cost_usd), SUM(latency_s), MAX(latency_s), SUM(retries > 0),
+               GROUP_CONCAT(DISTINCT model)
+        FROM calls WHERE run_id = ? GROUP BY topic
+        """,
+        (run_id,),
+    ).fetchall()
+    statuses = {}
+    for topic, status in db.execute("SELECT COALESCE(topic, '(none)'), status FROM jobs WHERE run_id = ?", (run_id,)):
+        statuses.setdefault(topic, []).append(status)
+
+    report = []
+    for topic, calls, prompt, completion, cost, latency, slowest, retried, models in rows:
+        report.append({
+            "topic": topic, "calls": calls, "prompt_tokens": prompt or 0,
+            "completion_tokens": completion or 0, "cost_usd": cost or 0.0,
+            "latency_s": latency or 0.0, "slowest_s": slowest or 0.0, "retried_calls": retried or 0,
+            "models": models or "", "jobs": statuses.pop(topic, []),
+        })
+    # Topics that never made a call (skipped by the budget, or failed before the LLM)
+    for topic, jobs in statuses.items():
+        report.append({
+            "topic": topic, "calls": 0, "prompt_tokens": 0, "completion_tokens": 0, "cost_usd": 0.0,
+            "latency_s": 0.0, "slowest_s": 0.0, "retried_calls": 0, "models": "", "jobs": jobs,
+        })
+    return sorted(report, key=lambda r: (r["cost_usd"], r["prompt_tokens"] + r["completion_tokens"]), reverse=True)
+
+
+def print_report(db: sqlite3.Connection, run_id: int):
+    run = db.execute("SELECT script, started_at, budget_tokens, budget_seconds, stop_reason FROM runs WHERE id = ?",
+                     (run_id,)).fetchone()
+    if run is None:
+        print(f"❌ No ledger run {run_id}")
+        return
+    script, started_at, budget_tokens, budget_seconds, stop_reason = run
+    report = topic_report(db, run_id)
+
+    budget = ", ".join(b for b in (f"{budget_tokens} tokens" if budget_tokens else "",
+                                   f"{budget_seconds:.0f}s" if budget_seconds else "") if b) or "none"
+    print(f"\n💰 Cost ledger: run {run_id} ({script}, {started_at}), budget: {budget}")
+    if stop_reason:
+        print(f"   ⛔ Stopped early: {stop_reason}")
+    if not report:
+        print("   (no model calls recorded)")
+        return
+
+    print(f"   {'topic':<48} {'calls':>5} {'tokens':>9} {'cost $':>8} {'llm s':>7} {'max s':>6} {'retry':>5}  jobs")
+    for r in report:
+        jobs = ", ".join(f"{s}={r['jobs'].count(s)}" for s in sorted(set(r["jobs"])))
+        print(f"   {r['topic'][:48]:<48} {r['calls']:>5} {r['prompt_tokens'] + r['completion_tokens']:>9} "
+              f"{r['cost_usd']:>8.4f} {r['latency_s']:>7.1f} {r['slowest_s']:>6.1f} {r['retried_calls']:>5}  {jobs}")
+
+    calls = sum(r["calls"] for r in report)
+    tokens = sum(r["prompt_tokens"] + r["completion_tokens"] for r in report)
+    cost = sum(r["cost_usd"] for r in report)
+    print(f"   {'TOTAL':<48} {calls:>5} {tokens:>9} {cost:>8.4f}")
+    unpriced = db.execute("SELECT DISTINCT model FROM calls WHERE run_id = ? AND cost_usd IS NULL", (run_id,)).fetchall()
+    if unpriced:
+        print(f"   ⚠️ No price for: {', '.join(m for (m,) in unpriced)} (add to PRICES in cost_ledger.py)")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Per-topic cost report from the worksheet factory ledger.")
+    parser.add_argument("--path", default=LEDGER_PATH)
+    parser.add_argument("--run", type=int, help="run id (default: latest)")
+    parser.add_argument("--list", action="store_true", help="list recent runs instead")
+    args = parser.parse_args(argv)
+
+    if not os.path.exists(args.path):
+        print(f"❌ No ledger at {args.path}")
+        return 1
+    db = sqlite3.connect(args.path)
+    if args.list:
+        rows = db.execute(
+            "SELECT r.id, r.script, r.started_at, COUNT(c.id), COALESCE(SUM(c.prompt_tokens + c.completion_tokens), 0),"
+            " COALESCE(SUM(c.cost_usd), 0), r.stop_reason FROM runs r LEFT JOIN calls c ON c.run_id = r.id"
+            " GROUP BY r.id ORDER BY r.id DESC LIMIT 20"
+        ).fetchall()
+        for run_id, script, started_at, calls, tokens, cost, stop_reason in rows:
+            print(f"   {run_id:>5}  {script:<14} {started_at}  {calls:>5} calls {tokens:>9} tokens "
+                  f"${cost:.4f}{'  ⛔ ' + stop_reason if stop_reason else ''}")
+        return 0
+
+    run_id = args.run or db.execute("SELECT MAX(id) FROM runs").fetchone()[0]
+    if run_id is None:
+        print("❌ The ledger has no runs yet")
+        return 1
+    print_report(db, run_id)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,214 @@
+import random
+
+# --- GEOMETRY ENGINE (Custom Implementation) ---
+class CrosswordGenerator:
+    """Randomized greedy layout: each word takes the first valid intersection found."""
+
+    def __init__(self, width=12, height=12):
+        self.width = width
+        self.height = height
+        self.grid = [['' for _ in range(width)] for _ in range(height)]
+        self.words = [] # List of {'answer', 'clue', 'row', 'col', 'orientation'}
+
+    def is_valid(self, word, row, col, orientation):
+        # Check bounds
+        if orientation == 'across':
+            if col + len(word) > self.width: return False
+        else:
+            if row + len(word) > self.height: return False
+
+        # Check collisions and intersections
+        has_intersection = False
+
+        for i in range(len(word)):
+            r = row + (0 if orientation == 'across' else i)
+            c = col + (i if orientation == 'across' else 0)
+
+            cell = self.grid[r][c]
+            if cell == '':
+                pass
+            elif cell == word[i]:
+                has_intersection = True
+            else:
+                return False # Conflict
+
+            # Strict neighbor check to prevent "clumping"
+            if orientation == 'across':
+                # Check top/bottom neighbors
+                if self.grid[r][c] == '': # Only if we are filling a new cell
+                    if r > 0 and self.grid[r-1][c] != '': return False
+                    if r < self.height-1 and self.grid[r+1][c] != '': return False
+                # Check left/right of word start/end
+                if i == 0 and c > 0 and self.grid[r][c-1] != '': return False
+                if i == len(word)-1 and c < self.width-1 and self.grid[r][c+1] != '': return False
+            else: # down
+                # Check left/right neighbors
+                if self.grid[r][c] == '':
+                    if c > 0 and self.grid[r][c-1] != '': return False
+                    if c < self.width-1 and self.grid[r][c+1] != '': return False
+                # Check top/bottom of word start/end
+                if i == 0 and r > 0 and self.grid[r-1][c] != '': return False
+                if i == len(word)-1 and r < self.height-1 and self.grid[r+1][c] != '': return False
+
+        # Must intersect at least one existing word (unless it's the first word)
+        if not self.words: return True
+        return has_intersection
+
+    def place(self, word, row, col, orientation):
+        for i in range(len(word)):
+            r = row + (0 if orientation == 'across' else i)
+            c = col + (i if orientation == 'across' else 0)
+            self.grid[r][c] = word[i]
+
+    def candidate_spots(self, word, current_words):
+        """(row, col, orientation) for every way `word` could cross a placed word."""
+        potential_spots = []
+        for placed_word in current_words:
+            # Find common letters
+            p_word = placed_word['answer']
+            for i, char in enumerate(word):
+                for j, p_char in enumerate(p_word):
+                    if char == p_char:
+                        # Potential intersection
+                        # If placed is across, we try down
+                        if placed_word['orientation'] == 'across':
+                            # Intersection at grid[r][c]
+                            # placed word is at pr, pc. Intersection at pr, pc+j
+                            # new word (down) would start at (pr-i), (pc+j)
+                            r = placed_word['row'] - i
+                            c = placed_word['col'] + j
+                            if 0 <= r and r + len(word) <= self.height:
+                                potential_spots.append((r, c, 'down'))
+                        else: # placed is down
+                            # Intersection at pr+j, pc
+                            # new word (across) starts at (pr+j), (pc-i)
+                            r = placed_word['row'] + j
+                            c = placed_word['col'] - i
+                            if 0 <= c and c + len(word) <= self.width:
+                                potential_spots.append((r, c, 'across'))
+        return potential_spots
+
+    def choose_spot(self, word, potential_spots):
+        """Engines override this to pick among the candidate spots; None = leave the word out."""
+        random.shuffle(potential_spots)
+        for r, c, ori in potential_spots:
+            if self.is_valid(word, r, c, ori):
+                return r, c, ori
+        return None
+
+    def generate(self, word_list, attempts=50):
+        # word_list: [{'answer', 'clue'}]
+        # Sort by length
+        sorted_words = sorted(word_list, key=lambda x: len(x['answer']), reverse=True)
+
+        best_layout = []
+
+        for _ in range(attempts):
+            self.grid = [['' for _ in range(self.width)] for _ in range(self.height)]
+            self.words = []
+
+            if not sorted_words: break
+
+            # Place first word in center
+            first = sorted_words[0]
+            fr = self.height // 2
+            fc = (self.width - len(first['answer'])) // 2
+            placed_first = {**first, 'row': fr, 'col': fc, 'orientation': 'across'}
+            self.place(first['answer'], fr, fc, 'across')
+            self.words.append(placed_first)
+
+            # Try to place others
+            current_words = [placed_first]
+            remaining = sorted_words[1:]
+
+            # Simple randomized greedy placement
+            random.shuffle(remaining)
+
+            for word_obj in remaining:
+                word = word_obj['answer']
+                # Try to find intersection with placed words
+                spot = self.choose_spot(word, self.candidate_spots(word, current_words))
+                if spot:
+                    r, c, ori = spot
+                    self.place(word, r, c, ori)
+                    self.words.append({**word_obj, 'row': r, 'col': c, 'orientation': ori})
+                    current_words.append({**word_obj, 'row': r, 'col': c, 'orientation': ori})
+
+            if len(self.words) > len(best_layout):
+                best_layout = list(self.words)
+                if len(best_layout) == len(sorted_words):
+                    break # Perfect fit
+
+        return best_layout
+
+class BestFitCrosswordGenerator(CrosswordGenerator):
+    """
+    Scores every valid spot instead of taking the first one: most crossings
+    first, then closest to the centre, so grids come out denser and more
+    compact at the cost of checking every candidate.
+    """
+
+    def choose_spot(self, word, potential_spots):
+        best, best_score = None, None
+        centre_r, centre_c = self.height / 2, self.width / 2
+        for r, c, ori in set(potential_spots):
+            if not self.is_valid(word, r, c, ori):
+                continue
+            crossings = sum(
+                1 for i in range(len(word))
+                if self.grid[r + (0 if ori == 'across' else i)][c + (i if ori == 'across' else 0)] != ''
+            )
+            mid_r = r + (0 if ori == 'across' else len(word) / 2)
+            mid_c = c + (len(word) / 2 if ori == 'across' else 0)
+            score = (crossings, -abs(mid_r - centre_r) - abs(mid_c - centre_c), random.random())
+            if best_score is None or score > best_score:
+                best, best_score = (r, c, ori), score
+        return best
+
+# Layout engines by name; anything with __init__(width, height) and generate(word_list, attempts) fits
+ENGINES = {
+    "greedy": CrosswordGenerator,
+    "bestfit": BestFitCrosswordGenerator,
+}
+
+def build_crossword_layout(word_list, attempts=50, grid_size=None, engine="greedy"):
+    """
+    Takes list of {'answer': 'X', 'clue': 'Y'} and calculates
+    valid row/col coordinates for the HTML.
+    `grid_size` fixes the grid (never smaller than the longest word);
+    `engine` is a name from ENGINES or a generator class.
+    """
+    # Filter bad words
+    clean_list = []
+    for item in word_list:
+        # Keep accents, just remove spaces/punctuation
+        clean = item['answer'].upper().replace(" ", "").replace("-", "").replace("'", "")
+        if 2 < len(clean) < 20:
+            clean_list.append({**item, 'answer': clean})
+
+    # Calculate optimal grid size
+    max_len = 0
+    if clean_list:
+        max_len = max(len(item['answer']) for item in clean_list)
+
+    if grid_size:
+        grid_size = max(grid_size, max_len)
+    else:
+        # Dynamic grid size: at least 12, max 18 (or word length if longer)
+        grid_size = max(12, max_len)
+        if grid_size > 18:
+            grid_size = 18 # Try to cap at 18 to prevent tiny cells
+            # If we have a word > 18 chars, we might have issues, but we filtered < 20.
+            # Let's allow up to 20 if absolutely necessary, but prefer smaller.
+            if max_len > 18:
+                grid_size = max_len
+
+    generator_class = ENGINES[engine] if isinstance(engine, str) else engine
+    generator = generator_class(width=grid_size, height=grid_size)
+    layout = generator.generate(clean_list, attempts=attempts)
+
+    if not layout:
+        print("⚠️ Crossword generation failed. Sending empty grid.")
+        return [], 12
+
+    return layout, grid_size
@@ -1,8 +1,10 @@
 import base64
 import os
 
-input_path = '/Users/home/Documents/Projects/language-gems-recovered/worksheet_factory/logo.png'
-output_path = '/Users/home/Documents/Projects/language-gems-recovered/worksheet_factory/logo_base64.txt'
+# Regenerate after changing logo.png; assets.py serves logo_base64.txt when logo.png is missing
+script_dir = os.path.dirname(os.path.abspath(__file__))
+input_path = os.path.join(script_dir, 'logo.png')
+output_path = os.path.join(script_dir, 'logo_base64.txt')
 
 with open(input_path, "rb") as image_file:
     encoded_string = base64.b64encode(image_file.read()).decode('utf-8')
@@ -8,6 +8,13 @@ from supabase import create_client, Client
 import questionary
 import random
 from collections import defaultdict
+from instrumentation import metrics
+from cost_ledger import CostLedger
+from profiling import JobProfiler, current_profile, note_output
+from render_data import send_render_data, render
+from pdf_tools import merge_pdfs
+from job_index import JobIndex
+from crossword_layout import build_crossword_layout
 
 # Load environment variables
 load_dotenv('.env.local')
@@ -99,173 +106,7 @@ Constraints:
 5. Translation: Select 10 items from the provided vocabulary. Provide the 'english' and the expected 'target' translation. Do NOT generate new sentences.
 """
 
-# --- 2. GEOMETRY ENGINE (Custom Implementation) ---
-class CrosswordGenerator:
-    def __init__(self, width=12, height=12):
-        self.width = width
-        self.height = height
-        self.grid = [['' for _ in range(width)] for _ in range(height)]
-        self.words = [] # List of {'answer', 'clue', 'row', 'col', 'orientation'}
-
-    def is_valid(self, word, row, col, orientation):
-        # Check bounds
-        if orientation == 'across':
-            if col + len(word) > self.width: return False
-        else:
-            if row + len(word) > self.height: return False
-
-        # Check collisions and intersections
-        has_intersection = False
-        
-        for i in range(len(word)):
-            r = row + (0 if orientation == 'across' else i)
-            c = col + (i if orientation == 'across' else 0)
-            
-            cell = self.grid[r][c]
-            if cell == '':
-                pass
-            elif cell == word[i]:
-                has_intersection = True
-            else:
-                return False # Conflict
-            
-            # Strict neighbor check to prevent "clumping"
-            if orientation == 'across':
-                # Check top/bottom neighbors
-                if self.grid[r][c] == '': # Only if we are filling a new cell
-                    if r > 0 and self.grid[r-1][c] != '': return False
-                    if r < self.height-1 and self.grid[r+1][c] != '': return False
-                # Check left/right of word start/end
-                if i == 0 and c > 0 and self.grid[r][c-1] != '': return False
-                if i == len(word)-1 and c < self.width-1 and self.grid[r][c+1] != '': return False
-            else: # down
-                # Check left/right neighbors
-                if self.grid[r][c] == '':
-                    if c > 0 and self.grid[r][c-1] != '': return False
-                    if c < self.width-1 and self.grid[r][c+1] != '': return False
-                # Check top/bottom of word start/end
-                if i == 0 and r > 0 and self.grid[r-1][c] != '': return False
-                if i == len(word)-1 and r < self.height-1 and self.grid[r+1][c] != '': return False
-
-        # Must intersect at least one existing word (unless it's the first word)
-        if not self.words: return True
-        return has_intersection
-
-    def place(self, word, row, col, orientation):
-        for i in range(len(word)):
-            r = row + (0 if orientation == 'across' else i)
-            c = col + (i if orientation == 'across' else 0)
-            self.grid[r][c] = word[i]
-
-    def generate(self, word_list, attempts=50):
-        # word_list: [{'answer', 'clue'}]
-        # Sort by length
-        sorted_words = sorted(word_list, key=lambda x: len(x['answer']), reverse=True)
-        
-        best_layout = []
-        
-        for _ in range(attempts):
-            self.grid = [['' for _ in range(self.width)] for _ in range(self.height)]
-            self.words = []
-            
-            if not sorted_words: break
-
-            # Place first word in center
-            first = sorted_words[0]
-            fr = self.height // 2
-            fc = (self.width - len(first['answer'])) // 2
-            placed_first = {**first, 'row': fr, 'col': fc, 'orientation': 'across'}
-            self.place(first['answer'], fr, fc, 'across')
-            self.words.append(placed_first)
-            
-            # Try to place others
-            current_words = [placed_first]
-            remaining = sorted_words[1:]
-            
-            # Simple randomized greedy placement
-            random.shuffle(remaining)
-            
-            for word_obj in remaining:
-                word = word_obj['answer']
-                placed = False
-                # Try to find intersection with placed words
-                potential_spots = []
-                
-                for placed_word in current_words:
-                    # Find common letters
-                    p_word = placed_word['answer']
-                    for i, char in enumerate(word):
-                        for j, p_char in enumerate(p_word):
-                            if char == p_char:
-                                # Potential intersection
-                                # If placed is across, we try down
-                                if placed_word['orientation'] == 'across':
-                                    # Intersection at grid[r][c]
-                                    # placed word is at pr, pc. Intersection at pr, pc+j
-                                    # new word (down) would start at (pr-i), (pc+j)
-                                    r = placed_word['row'] - i
-                                    c = placed_word['col'] + j
-                                    if 0 <= r and r + len(word) <= self.height:
-                                        potential_spots.append((r, c, 'down'))
-                                else: # placed is down
-                                    # Intersection at pr+j, pc
-                                    # new word (across) starts at (pr+j), (pc-i)
-                                    r = placed_word['row'] + j
-                                    c = placed_word['col'] - i
-                                    if 0 <= c and c + len(word) <= self.width:
-                                        potential_spots.append((r, c, 'across'))
-                
-                random.shuffle(potential_spots)
-                for r, c, ori in potential_spots:
-                    if self.is_valid(word, r, c, ori):
-                        self.place(word, r, c, ori)
-                        self.words.append({**word_obj, 'row': r, 'col': c, 'orientation': ori})
-                        current_words.append({**word_obj, 'row': r, 'col': c, 'orientation': ori})
-                        placed = True
-                        break
-            
-            if len(self.words) > len(best_layout):
-                best_layout = list(self.words)
-                if len(best_layout) == len(sorted_words):
-                    break # Perfect fit
-                    
-        return best_layout
-
-def build_crossword_layout(word_list):
-    """
-    Takes list of {'answer': 'X', 'clue': 'Y'} and calculates
-    valid row/col coordinates for the HTML.
-    """
-    # Filter bad words
-    clean_list = []
-    for item in word_list:
-        # Keep accents, just remove spaces/punctuation
-        clean = item['answer'].upper().replace(" ", "").replace("-", "").replace("'", "")
-        if 2 < len(clean) < 20:
-            clean_list.append({**item, 'answer': clean})
-            
-    # Calculate optimal grid size
-    max_len = 0
-    if clean_list:
-        max_len = max(len(item['answer']) for item in clean_list)
-    
-    # Dynamic grid size: at least 12, max 18 (or word length if longer)
-    grid_size = max(12, max_len)
-    if grid_size > 18:
-        grid_size = 18 # Try to cap at 18 to prevent tiny cells
-        # If we have a word > 18 chars, we might have issues, but we filtered < 20.
-        # Let's allow up to 20 if absolutely necessary, but prefer smaller.
-        if max_len > 18:
-            grid_size = max_len
-
-    generator = CrosswordGenerator(width=grid_size, height=grid_size)
-    layout = generator.generate(clean_list)
-    
-    if not layout:
-        print("⚠️ Crossword generation failed. Sending empty grid.")
-        return [], 12
-
-    return layout, grid_size
+# --- 2. GEOMETRY ENGINE (see crossword_layout.py) ---
 
 def validate_data(data):
     """
@@ -319,7 +160,7 @@ def validate_data(data):
 def fetch_jobs_from_supabase():
     """
     Fetches vocabulary from centralized_vocabulary table and groups by curriculum level.
-    Returns list of job dictionaries with 'topic', 'language', and 'vocab' keys.
+    Returns list of job dictionaries with 'topic', 'language', 'vocab', 'level' and 'category' keys.
     """
     print("📡 Fetching vocabulary from Supabase...")
     
@@ -329,9 +170,10 @@ def fetch_jobs_from_supabase():
     offset = 0
     
     while True:
-        response = supabase.table("centralized_vocabulary").select(
-            "language, word, translation, curriculum_level, category, subcategory, theme_name, unit_name"
-        ).range(offset, offset + page_size - 1).execute()
+        with metrics.span("supabase_fetch", table="centralized_vocabulary"):
+            response = supabase.table("centralized_vocabulary").select(
+                "language, word, translation, curriculum_level, category, subcategory, theme_name, unit_name"
+            ).range(offset, offset + page_size - 1).execute()
         
         rows = response.data
         if not rows:
@@ -405,7 +247,9 @@ def fetch_jobs_from_supabase():
                 "language": lang,
                 "language_full": full_language,
                 "vocab": vocab_list,
-                "display_name": f"[{lang.upper()}] {topic}"
+                "display_name": f"[{lang.upper()}] {topic}",
+                "level": "KS3",
+                "category": category
             })
     
     for (lang, theme, unit), vocab_list in ks4_groups.items():
@@ -417,19 +261,25 @@ def fetch_jobs_from_supabase():
                 "language": lang,
                 "language_full": full_language,
                 "vocab": vocab_list,
-                "display_name": f"[{lang.upper()}] {topic}"
+                "display_name": f"[{lang.upper()}] {topic}",
+                "level": "KS4",
+                "category": theme
             })
     
     for (lang, category, subcategory), vocab_list in other_groups.items():
         if len(vocab_list) >= 8:  # Lowered minimum
             topic = f"{category} - {subcategory}"
             full_language = LANGUAGE_MAP.get(lang, lang.capitalize())
+            # ("KS3", category) / ("KS4", theme) fallbacks keep their level
+            is_level = category in ("KS3", "KS4")
             jobs.append({
                 "topic": topic,
                 "language": lang,
                 "language_full": full_language,
                 "vocab": vocab_list,
-                "display_name": f"[{lang.upper()}] {topic}"
+                "display_name": f"[{lang.upper()}] {topic}",
+                "level": category if is_level else "Other",
+                "category": subcategory if is_level else category
             })
     
     # Sort jobs by language then topic
@@ -443,7 +293,14 @@ async def process_job(job):
     """
     Process a job dictionary containing topic, language, and pre-fetched vocab.
     Generates AI-enhanced content and renders PDFs.
+    Each stage is timed as a span under one "job" span (see instrumentation.py).
     """
+    with metrics.span("job", language=job['language'], topic=job['topic']):
+        ok = await _run_job(job)
+    metrics.count("jobs_total", status="ok" if ok else "error")
+    return ok
+
+async def _run_job(job):
     topic = job['topic']
     language_full = job['language_full']
     vocab_list = job['vocab']
@@ -466,14 +323,16 @@ Use ONLY these vocabulary words: {vocab_str}
 Generate worksheet content using ONLY the provided vocabulary.
 """
         
-        response = await client.chat.completions.create(
-            model=MODEL_NAME,
-            messages=[
-                {"role": "system", "content": SYSTEM_PROMPT},
-                {"role": "user", "content": ai_prompt}
-            ],
-            response_format={"type": "json_object"}
-        )
+        with metrics.span("llm", model=MODEL_NAME) as span:
+            response = await client.chat.completions.create(
+                model=MODEL_NAME,
+                messages=[
+                    {"role": "system", "content": SYSTEM_PROMPT},
+                    {"role": "user", "content": ai_prompt}
+                ],
+                response_format={"type": "json_object"}
+            )
+        metrics.record_usage(response, stage="llm", model=MODEL_NAME, latency=span.duration)
         raw_data = json.loads(response.choices[0].message.content)
         
         # Override vocab with database vocab (AI may have slightly modified it)
@@ -481,63 +340,59 @@ Generate worksheet content using ONLY the provided vocabulary.
         raw_data['meta'] = {"topic": formatted_topic, "language": language_full}
         
         # Validate
-        data = validate_data(raw_data)
+        with metrics.span("validate"):
+            data = validate_data(raw_data)
         
         # B. COMPUTE GEOMETRY (Python does this, not AI)
-        data['crossword_layout'], data['grid_size'] = build_crossword_layout(data.get('crossword_words', []))
+        with metrics.span("crossword"):
+            data['crossword_layout'], data['grid_size'] = build_crossword_layout(data.get('crossword_words', []))
         
         # C. RENDER (The "Print Twice" Strategy)
-        async with async_playwright() as p:
-            browser = await p.chromium.launch()
-            page = await browser.new_page()
-            
-            # Load Template
-            script_dir = os.path.dirname(os.path.abspath(__file__))
-            template_path = os.path.join(script_dir, "template.html")
-            await page.goto(f"file://{template_path}")
-            
-            # 1. Inject Data (Generates Random Grids in JS)
-            await page.evaluate(f"renderData({json.dumps(data)}, false)")
-            await page.wait_for_timeout(1000)
-            
-            # 2. Print STUDENT Version to temp file
-            os.makedirs(OUTPUT_DIR, exist_ok=True)
-            safe_name = f"{job['language']}_{formatted_topic.replace(' ', '_').replace(':', '').replace('-', '_')}"
-            student_pdf = f"{OUTPUT_DIR}/{safe_name}_student_temp.pdf"
-            await page.pdf(path=student_pdf, format="A4", print_background=True)
-            
-            # 3. REVEAL ANSWERS
-            await page.evaluate(f"renderData({json.dumps(data)}, true)")
-            await page.wait_for_timeout(500)
-            answers_pdf = f"{OUTPUT_DIR}/{safe_name}_answers_temp.pdf"
-            await page.pdf(path=answers_pdf, format="A4", print_background=True)
-            
-            await browser.close()
+        with metrics.span("chromium"):
+            async with async_playwright() as p:
+                browser = await p.chromium.launch()
+                page = await browser.new_page()
+                profile = current_profile()
+                if profile:
+                    await profile.start_trace(page.context)
+            
+                # Load Template
+                script_dir = os.path.dirname(os.path.abspath(__file__))
+                template_path = os.path.join(script_dir, "template.html")
+                await page.goto(f"file://{template_path}")
+            
+                # 1. Inject Data (Generates Random Grids in JS)
+                await send_render_data(page, data)
+                await render(page, show_answers=False)
+                await page.wait_for_timeout(1000)
+            
+                # 2. Print STUDENT Version to temp file
+                os.makedirs(OUTPUT_DIR, exist_ok=True)
+                safe_name = f"{job['language']}_{formatted_topic.replace(' ', '_').replace(':', '').replace('-', '_')}"
+                student_pdf = f"{OUTPUT_DIR}/{safe_name}_student_temp.pdf"
+                await page.pdf(path=student_pdf, format="A4", print_background=True)
+            
+                # 3. REVEAL ANSWERS
+                await render(page, show_answers=True)
+                await page.wait_for_timeout(500)
+                answers_pdf = f"{OUTPUT_DIR}/{safe_name}_answers_temp.pdf"
+                await page.pdf(path=answers_pdf, format="A4", print_background=True)
+            
+                if profile:
+                    await profile.stop_trace(page.context)
+                await browser.close()
         
         # 4. COMBINE both PDFs into one file
-        from pypdf import PdfReader, PdfWriter
-        
-        writer = PdfWriter()
-        
-        # Add student pages
-        student_reader = PdfReader(student_pdf)
-        for page_obj in student_reader.pages:
-            writer.add_page(page_obj)
-        
-        # Add answer pages
-        answers_reader = PdfReader(answers_pdf)
-        for page_obj in answers_reader.pages:
-            writer.add_page(page_obj)
+        with metrics.span("pdf_merge"):
+            # Student pages then answer pages, with the fonts/images both halves share stored once
+            combined_path = f"{OUTPUT_DIR}/{safe_name}.pdf"
+            merge_pdfs([student_pdf, answers_pdf], combined_path)
         
-        # Write combined PDF
-        combined_path = f"{OUTPUT_DIR}/{safe_name}.pdf"
-        with open(combined_path, "wb") as f:
-            writer.write(f)
-        
-        # Clean up temp files
-        os.remove(student_pdf)
-        os.remove(answers_pdf)
+            # Clean up temp files
+            os.remove(student_pdf)
+            os.remove(answers_pdf)
         
+        note_output(combined_path)
         print(f"   ✅ Saved: {combined_path} (worksheet + answers)")
             
         return True
@@ -579,7 +434,8 @@ async def process_topic(topic_description):
             
             # 1. Inject Data (Generates Random Grids in JS)
             # We pass 'false' for showAnswers initially
-            await page.evaluate(f"renderData({json.dumps(data)}, false)")
+            await send_render_data(page, data)
+            await render(page, show_answers=False)
             await page.wait_for_timeout(1000) # Wait for grids
             
             # 2. Print STUDENT Version
@@ -590,7 +446,7 @@ async def process_topic(topic_description):
             
             # 3. REVEAL ANSWERS (Without reloading page!)
             # This ensures the Word Search grid stays exactly the same
-            await page.evaluate(f"renderData({json.dumps(data)}, true)")
+            await render(page, show_answers=True)
             
             await page.wait_for_timeout(500)
             await page.pdf(path=f"{OUTPUT_DIR}/{safe_name}_Answers.pdf", format="A4", print_background=True)
@@ -601,28 +457,52 @@ async def process_topic(topic_description):
     except Exception as e:
         print(f"❌ Error on {topic_description}: {e}")
 
+REFRESH_CHOICE = "🔄 Refresh topics from database"
+
+def count_vocabulary_rows():
+    """Row count of centralized_vocabulary (one small request), used to spot a stale job index."""
+    try:
+        return supabase.table("centralized_vocabulary").select("word", count="exact").limit(1).execute().count
+    except Exception as e:
+        print(f"   ⚠️ Could not count vocabulary rows: {e}")
+        return None
+
+def load_job_index(refresh=False):
+    """The saved JobIndex, rebuilt via fetch_jobs_from_supabase() when missing, stale or refresh=True."""
+    return JobIndex.load_or_build(fetch_jobs_from_supabase, row_count=count_vocabulary_rows, refresh=refresh)
+
+def topic_choices(index, ids):
+    """Menu choices for the given job ids, valued by id so topics with the same name stay distinct."""
+    return [questionary.Choice(index.jobs[i]['display_name'], value=i) for i in sorted(ids)]
+
 def simple_menu():
     """Run the interactive menu (synchronous) and return selected jobs."""
     print("\n" + "="*60)
     print("🎓 SecondaryMFL Worksheet Factory")
     print("="*60 + "\n")
     
-    # Step 1: Fetch all jobs from database
-    all_jobs = fetch_jobs_from_supabase()
-    
-    if not all_jobs:
-        print("❌ No worksheet jobs found in database. Exiting.")
-        return []
-    
-    # Get unique languages
-    languages = sorted(set(j['language'] for j in all_jobs))
-    lang_display = ['ALL'] + [f"{LANGUAGE_MAP.get(l, l.capitalize())} ({l})" for l in languages]
+    # Step 1: Load the job index (rebuilt from the database when stale)
+    index = load_job_index()
     
-    # Step 2: Language Filter
-    language_choice = questionary.select(
-        "Select Language:",
-        choices=lang_display
-    ).ask()
+    while True:
+        if not index.jobs:
+            print("❌ No worksheet jobs found in database. Exiting.")
+            return []
+        
+        # Get unique languages
+        languages = index.values("language")
+        lang_display = ['ALL'] + [f"{LANGUAGE_MAP.get(l, l.capitalize())} ({l})" for l in languages]
+        lang_display.append(REFRESH_CHOICE)
+        
+        # Step 2: Language Filter
+        language_choice = questionary.select(
+            "Select Language:",
+            choices=lang_display
+        ).ask()
+        
+        if language_choice != REFRESH_CHOICE:
+            break
+        index = load_job_index(refresh=True)
     
     if not language_choice:
         print("❌ No language selected. Exiting.")
@@ -630,17 +510,17 @@ def simple_menu():
     
     # Filter jobs by language
     if language_choice == 'ALL':
-        filtered_jobs = all_jobs
+        lang_code = None
     else:
         # Extract language code from selection (e.g., "French (fr)" -> "fr")
         lang_code = language_choice.split('(')[1].replace(')', '').strip()
-        filtered_jobs = [j for j in all_jobs if j['language'] == lang_code]
+    filtered_ids = sorted(index.select(language=lang_code))
     
-    if not filtered_jobs:
+    if not filtered_ids:
         print(f"❌ No jobs found for {language_choice}. Exiting.")
         return []
     
-    print(f"\n📋 Found {len(filtered_jobs)} topics for {language_choice}\n")
+    print(f"\n📋 Found {len(filtered_ids)} topics for {language_choice}\n")
     
     # Step 3: Show selection mode
     selection_mode = questionary.select(
@@ -662,65 +542,63 @@ def simple_menu():
     if "ALL" in selection_mode:
         # Generate all
         confirm = questionary.confirm(
-            f"This will generate {len(filtered_jobs)} worksheets. Continue?"
+            f"This will generate {len(filtered_ids)} worksheets. Continue?"
         ).ask()
         if confirm:
-            selected_jobs = filtered_jobs
+            selected_jobs = index.jobs_for(filtered_ids)
     
     elif "Search" in selection_mode:
         # Search by keyword
         keyword = questionary.text("Enter keyword to search:").ask()
         if keyword:
-            keyword = keyword.lower()
-            matching = [j for j in filtered_jobs if keyword in j['display_name'].lower()]
+            matching = index.select(language=lang_code, query=keyword)
             if matching:
                 print(f"\n🔍 Found {len(matching)} matching topics:\n")
                 # Use select for single choice, or show list and confirm all
                 if len(matching) == 1:
-                    selected_jobs = matching
-                    print(f"   → {matching[0]['display_name']}")
+                    selected_jobs = index.jobs_for(matching)
+                    print(f"   → {selected_jobs[0]['display_name']}")
                 else:
-                    choices = [j['display_name'] for j in matching]
+                    choices = topic_choices(index, matching)
                     choices.append("✅ Generate ALL matching")
                     choice = questionary.select(
                         "Select a topic:",
                         choices=choices
                     ).ask()
                     if choice == "✅ Generate ALL matching":
-                        selected_jobs = matching
-                    elif choice:
-                        selected_jobs = [j for j in matching if j['display_name'] == choice]
+                        selected_jobs = index.jobs_for(matching)
+                    elif choice is not None:
+                        selected_jobs = [index.jobs[choice]]
             else:
                 print(f"❌ No topics matching '{keyword}'")
     
     elif "one topic" in selection_mode:
         # Quick single select - paginated for large lists
-        if len(filtered_jobs) > 30:
+        if len(filtered_ids) > 30:
             # Show a search first for large lists
             keyword = questionary.text(
-                f"Enter keyword to narrow down {len(filtered_jobs)} topics (or press Enter to browse all):"
+                f"Enter keyword to narrow down {len(filtered_ids)} topics (or press Enter to browse all):"
             ).ask()
             
             if keyword and keyword.strip():
-                keyword = keyword.lower()
-                filtered = [j for j in filtered_jobs if keyword in j['display_name'].lower()]
+                filtered = index.select(language=lang_code, query=keyword)
                 if filtered:
                     print(f"🔍 Found {len(filtered)} matching topics")
-                    choices = [j['display_name'] for j in filtered]
+                    choices = topic_choices(index, filtered)
                 else:
                     print(f"No matches for '{keyword}', showing all...")
-                    choices = [j['display_name'] for j in filtered_jobs]
+                    choices = topic_choices(index, filtered_ids)
             else:
-                choices = [j['display_name'] for j in filtered_jobs]
+                choices = topic_choices(index, filtered_ids)
         else:
-            choices = [j['display_name'] for j in filtered_jobs]
+            choices = topic_choices(index, filtered_ids)
         
         choice = questionary.select(
             "Select a topic to generate:",
             choices=choices
         ).ask()
-        if choice:
-            selected_jobs = [j for j in filtered_jobs if j['display_name'] == choice]
+        if choice is not None:
+            selected_jobs = [index.jobs[choice]]
     
     elif "curriculum" in selection_mode:
         # Select by KS level
@@ -729,10 +607,7 @@ def simple_menu():
             choices=["KS3", "KS4", "Other"]
         ).ask()
         if level:
-            if level == "Other":
-                matching = [j for j in filtered_jobs if not j['topic'].startswith('KS3') and not j['topic'].startswith('KS4')]
-            else:
-                matching = [j for j in filtered_jobs if j['topic'].startswith(level)]
+            matching = index.select(language=lang_code, level=level)
             
             if matching:
                 print(f"\n📚 Found {len(matching)} {level} topics")
@@ -750,57 +625,55 @@ def simple_menu():
                         f"This will generate {len(matching)} worksheets. Continue?"
                     ).ask()
                     if confirm:
-                        selected_jobs = matching
+                        selected_jobs = index.jobs_for(matching)
                 elif "one" in sub_mode:
-                    choices = [j['display_name'] for j in matching]
+                    choices = topic_choices(index, matching)
                     choice = questionary.select(
                         "Select a topic:",
                         choices=choices
                     ).ask()
-                    if choice:
-                        selected_jobs = [j for j in matching if j['display_name'] == choice]
+                    if choice is not None:
+                        selected_jobs = [index.jobs[choice]]
                 elif "Search" in sub_mode:
                     keyword = questionary.text("Enter keyword:").ask()
                     if keyword:
-                        keyword = keyword.lower()
-                        found = [j for j in matching if keyword in j['display_name'].lower()]
+                        found = index.select(language=lang_code, level=level, query=keyword)
                         if found:
-                            choices = [j['display_name'] for j in found]
+                            choices = topic_choices(index, found)
                             choice = questionary.select(
                                 f"Found {len(found)} matches:",
                                 choices=choices
                             ).ask()
-                            if choice:
-                                selected_jobs = [j for j in found if j['display_name'] == choice]
+                            if choice is not None:
+                                selected_jobs = [index.jobs[choice]]
             else:
                 print(f"❌ No {level} topics found")
     
     else:
         # Browse paginated with multi-select
         PAGE_SIZE = 20
-        total_pages = (len(filtered_jobs) + PAGE_SIZE - 1) // PAGE_SIZE
+        total_pages = (len(filtered_ids) + PAGE_SIZE - 1) // PAGE_SIZE
         
-        print(f"\n📖 Browsing {len(filtered_jobs)} topics ({total_pages} pages)")
+        print(f"\n📖 Browsing {len(filtered_ids)} topics ({total_pages} pages)")
         print("   💡 TIP: Press SPACE to select items, then ENTER to confirm\n")
         
-        all_selected = []
+        all_selected = set()
         page = 0
         
         while True:
             start_idx = page * PAGE_SIZE
-            end_idx = min(start_idx + PAGE_SIZE, len(filtered_jobs))
-            page_jobs = filtered_jobs[start_idx:end_idx]
+            end_idx = min(start_idx + PAGE_SIZE, len(filtered_ids))
+            page_ids = filtered_ids[start_idx:end_idx]
             
             # Build choices with pre-selected items marked
             choices = []
             if page > 0:
                 choices.append(questionary.Choice("⬅️  Previous page", checked=False))
             
-            for j in page_jobs:
-                is_selected = j['display_name'] in all_selected
-                choices.append(questionary.Choice(j['display_name'], checked=is_selected))
+            for i in page_ids:
+                choices.append(questionary.Choice(index.jobs[i]['display_name'], value=i, checked=i in all_selected))
             
-            if end_idx < len(filtered_jobs):
+            if end_idx < len(filtered_ids):
                 choices.append(questionary.Choice("➡️  Next page", checked=False))
             choices.append(questionary.Choice("✅ DONE - Generate selected", checked=False))
             choices.append(questionary.Choice("❌ Cancel", checked=False))
@@ -813,21 +686,12 @@ def simple_menu():
             ).ask()
             
             if not result or "Cancel" in result:
-                all_selected = []
+                all_selected = set()
                 break
             
-            # Process selections from this page
-            for item in result:
-                if item in ["⬅️  Previous page", "➡️  Next page", "✅ DONE - Generate selected", "❌ Cancel"]:
-                    continue
-                if item not in all_selected:
-                    all_selected.append(item)
-            
-            # Remove deselected items from this page
-            page_names = [j['display_name'] for j in page_jobs]
-            for name in page_names:
-                if name in all_selected and name not in result:
-                    all_selected.remove(name)
+            # Selections on this page replace whatever was ticked here before
+            all_selected -= set(page_ids)
+            all_selected |= set(page_ids).intersection(result)
             
             # Handle navigation
             if "⬅️  Previous page" in result:
@@ -837,35 +701,61 @@ def simple_menu():
             elif "✅ DONE - Generate selected" in result:
                 break
         
-        selected_jobs = [j for j in filtered_jobs if j['display_name'] in all_selected]
+        selected_jobs = index.jobs_for(all_selected)
     
     return selected_jobs
 
-async def main():
-    # Run the synchronous menu
-    selected_jobs = simple_menu()
-    
-    if not selected_jobs:
-        print("❌ No topics selected. Exiting.")
-        return
-    
+async def generate_worksheets(selected_jobs, concurrency=3, profiler=None):
+    """
+    Process the selected jobs with a concurrency limit, recording every model
+    call in the cost ledger. With WORKSHEET_BUDGET_TOKENS or
+    WORKSHEET_BUDGET_SECONDS set, jobs that haven't started when the budget
+    runs out are skipped; the ones in flight finish.
+    Jobs matching WORKSHEET_PROFILE (or `profiler`) run afterwards, one at a
+    time, under the profiler (see profiling.py).
+    """
     print(f"\n🚀 Generating {len(selected_jobs)} worksheets...\n")
+    ledger = CostLedger.from_env("factory").attach(metrics)
+    profiler = profiler if profiler is not None else JobProfiler.from_env()
     
     # Process selected jobs (batch with concurrency limit)
-    semaphore = asyncio.Semaphore(3)  # Limit concurrent processing
+    semaphore = asyncio.Semaphore(concurrency)
     
     async def process_with_semaphore(job):
         async with semaphore:
-            return await process_job(job)
-    
-    results = await asyncio.gather(*(process_with_semaphore(j) for j in selected_jobs))
+            if ledger.skip(job['topic']):
+                return None
+            ok = await process_job(job)
+            ledger.record_job(job['topic'], "ok" if ok else "failed")
+            return ok
+    
+    profiled_jobs = [j for j in selected_jobs if profiler.wants(j['topic'])]
+    plain_jobs = [j for j in selected_jobs if j not in profiled_jobs]
+    results = await asyncio.gather(*(process_with_semaphore(j) for j in plain_jobs))
+    for job in profiled_jobs:
+        results.append(await profiler.run(job['display_name'], process_with_semaphore(job), OUTPUT_DIR))
     
     # Summary
     success_count = sum(1 for r in results if r)
+    skipped_count = sum(1 for r in results if r is None)
     print(f"\n" + "="*60)
     print(f"✅ Completed: {success_count}/{len(selected_jobs)} worksheets generated")
+    if skipped_count:
+        print(f"⛔ Skipped: {skipped_count} (budget reached)")
     print(f"📁 Output folder: {OUTPUT_DIR}/")
     print("="*60 + "\n")
+    metrics.finish()
+    ledger.finish()
+
+async def main():
+    # Run the synchronous menu
+    selected_jobs = simple_menu()
+    
+    if not selected_jobs:
+        print("❌ No topics selected. Exiting.")
+        return
+    
+    await generate_worksheets(selected_jobs)
 
 if __name__ == "__main__":
     # Run the synchronous menu first (before asyncio event loop starts)
@@ -875,23 +765,4 @@ if __name__ == "__main__":
         print("❌ No topics selected. Exiting.")
     else:
         # Now run the async processing
-        async def run_jobs():
-            print(f"\n🚀 Generating {len(selected_jobs)} worksheets...\n")
-            
-            # Process selected jobs (batch with concurrency limit)
-            semaphore = asyncio.Semaphore(3)  # Limit concurrent processing
-            
-            async def process_with_semaphore(job):
-                async with semaphore:
-                    return await process_job(job)
-            
-            results = await asyncio.gather(*(process_with_semaphore(j) for j in selected_jobs))
-            
-            # Summary
-            success_count = sum(1 for r in results if r)
-            print(f"\n" + "="*60)
-            print(f"✅ Completed: {success_count}/{len(selected_jobs)} worksheets generated")
-            print(f"📁 Output folder: {OUTPUT_DIR}/")
-            print("="*60 + "\n")
-        
-        asyncio.run(run_jobs())
+        asyncio.run(generate_worksheets(selected_jobs))
@@ -1,9 +1,11 @@
 import os
-import json
 import asyncio
 from dotenv import load_dotenv
 from supabase import create_client, Client
 from openai import AsyncOpenAI
+from bulk_writer import BulkWriter
+from prompt_packing import PromptPacker
+from language_id import load_default_identifier
 
 # Load environment variables
 load_dotenv('.env.local')
@@ -20,76 +22,108 @@ if not SUPABASE_URL or not SUPABASE_KEY:
 supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
 openai_client = AsyncOpenAI(api_key=OPENAI_API_KEY)
 
-async def fix_description(product):
-    print(f"Checking: {product['name']}")
-    
+# Shared by every product; sent once per packed request
+FIX_INSTRUCTIONS = """
+Analyze the following product description and summary for a language learning resource.
+
+Task:
+1. Determine if the Description is written primarily in English.
+2. If it is NOT in English (e.g. it is in Spanish, French, or German), rewrite it completely in English.
+3. If it IS in English, return "SKIP".
+
+The new description should be professional, marketing-oriented, and mention that it is a reading comprehension worksheet with questions and answers.
+
+Output JSON:
+{
+    "action": "FIX" or "SKIP",
+    "description": "New English description...",
+    "short_summary": "New English summary..."
+}
+"""
+
+def describe_product(product):
     current_desc = product['description'] or ""
     current_summary = product['short_summary'] or ""
-    
-    # Prompt to detect and fix
-    prompt = f"""
-    Analyze the following product description and summary for a language learning resource.
-    
+    return f"""
     Title: {product['name']}
     Current Description: "{current_desc}"
     Current Summary: "{current_summary}"
-    
-    Task:
-    1. Determine if the Description is written primarily in English.
-    2. If it is NOT in English (e.g. it is in Spanish, French, or German), rewrite it completely in English.
-    3. If it IS in English, return "SKIP".
-    
-    The new description should be professional, marketing-oriented, and mention that it is a reading comprehension worksheet with questions and answers.
-    
-    Output JSON:
-    {{
-        "action": "FIX" or "SKIP",
-        "description": "New English description...",
-        "short_summary": "New English summary..."
-    }}
     """
-    
-    try:
-        response = await openai_client.chat.completions.create(
-            model="gpt-4.1-nano",
-            messages=[{"role": "user", "content": prompt}],
-            response_format={"type": "json_object"}
-        )
-        result = json.loads(response.choices[0].message.content)
-        
-        if result['action'] == "FIX":
-            print(f"   ⚠️  Non-English detected. Fixing...")
-            
-            # Update DB
-            supabase.table("products").update({
-                "description": result['description'],
-                "short_summary": result['short_summary']
-            }).eq("id", product['id']).execute()
-            
-            print(f"   ✅ Updated.")
-        else:
-            print(f"   OK (English)")
-            
-    except Exception as e:
-        print(f"   ❌ Error: {e}")
+
+def valid_fix(product, result):
+    if result.get('action') == "SKIP":
+        return True
+    return (
+        result.get('action') == "FIX"
+        and isinstance(result.get('description'), str) and result['description'].strip() != ""
+        and isinstance(result.get('short_summary'), str) and result['short_summary'].strip() != ""
+    )
+
+def needs_llm_check(products):
+    """
+    Local pre-filter: only descriptions/summaries that are not confidently
+    English (per the vocab-trained language identifier) go to the LLM.
+    """
+    identifier = load_default_identifier()
+    descriptions = [p['description'] or "" for p in products]
+    summaries = [p['short_summary'] or "" for p in products]
+    english_desc = identifier.is_confidently(descriptions, "en")
+    english_summary = identifier.is_confidently(summaries, "en")
+    return [
+        (bool(d.strip()) and not d_en) or (bool(s.strip()) and not s_en)
+        for d, s, d_en, s_en in zip(descriptions, summaries, english_desc, english_summary)
+    ]
+
+def fix_description(product, result, writer):
+    print(f"Checked: {product['name']}")
+
+    if result is None:
+        print(f"   ❌ Error: no valid response")
+        return
+
+    if result['action'] == "FIX":
+        print(f"   ⚠️  Non-English detected. Fixing...")
+
+        # Queue DB update (flushed in batches)
+        writer.update(product, {
+            "description": result['description'],
+            "short_summary": result['short_summary']
+        })
+
+        print(f"   ✅ Queued update.")
+    else:
+        print(f"   OK (English)")
 
 async def main():
     # Fetch all products tagged with 'reading comprehension'
-    # We can't easily filter by array containment in simple select sometimes, 
+    # We can't easily filter by array containment in simple select sometimes,
     # but we can fetch all worksheets or iterate.
     # Let's fetch all products created recently (e.g. today) or just all worksheets.
-    
+
     print("Fetching products...")
     response = supabase.table("products").select("*").eq("resource_type", "Worksheet").execute()
     products = response.data
-    
+
     print(f"Found {len(products)} products. Scanning for language issues...")
-    
-    # Process in chunks to avoid rate limits
-    chunk_size = 5
-    for i in range(0, len(products), chunk_size):
-        chunk = products[i:i+chunk_size]
-        await asyncio.gather(*(fix_description(p) for p in chunk))
+
+    flags = needs_llm_check(products)
+    candidates = [p for p, flag in zip(products, flags) if flag]
+    print(f"   🔤 {len(products) - len(candidates)} confidently English, {len(candidates)} sent to the LLM")
+
+    # 10 products per request, 5 requests in flight
+    packer = PromptPacker(
+        openai_client, "gpt-4.1-nano", FIX_INSTRUCTIONS,
+        render_item=describe_product, validate=valid_fix,
+        pack_size=10, concurrency=5,
+    )
+    results = await packer.run(candidates)
+
+    with BulkWriter(supabase, "products") as writer:
+        for p in candidates:
+            fix_description(p, results.get(p['id']), writer)
+
+    print(f"✅ Updated {len(writer.written)} products ({len(writer.errors)} errors).")
+    print(f"   🤖 {packer.requests} LLM requests for {len(candidates)} products ({packer.fallbacks} single-item retries).")
 
 if __name__ == "__main__":
     asyncio.run(main())
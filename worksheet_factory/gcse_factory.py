@@ -11,6 +11,11 @@ from dotenv import load_dotenv
 from supabase import create_client, Client
 import questionary
 from collections import defaultdict
+from instrumentation import metrics
+from cost_ledger import CostLedger
+from profiling import JobProfiler, current_profile, note_output
+from render_data import send_render_data, render
+from pdf_tools import merge_pdfs
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -172,17 +177,19 @@ CRITICAL CHECKS:
 158: """
         
         try:
-            response = await client.chat.completions.create(
-                model=MODEL_NAME,
-                messages=[
-                    {"role": "system", "content": "You are a helpful AI editor."},
-                    {"role": "user", "content": verification_prompt},
-                    {"role": "user", "content": json.dumps(data)}
-                ],
-                response_format={"type": "json_object"},
-                temperature=0.2,  # Low temperature for strict correction
-                max_tokens=4000
-            )
+            with metrics.span("llm_verify", model=MODEL_NAME) as span:
+                response = await client.chat.completions.create(
+                    model=MODEL_NAME,
+                    messages=[
+                        {"role": "system", "content": "You are a helpful AI editor."},
+                        {"role": "user", "content": verification_prompt},
+                        {"role": "user", "content": json.dumps(data)}
+                    ],
+                    response_format={"type": "json_object"},
+                    temperature=0.2,  # Low temperature for strict correction
+                    max_tokens=4000
+                )
+            metrics.record_usage(response, stage="llm_verify", model=MODEL_NAME, latency=span.duration)
             return json.loads(response.choices[0].message.content)
         except Exception as e:
             logger.error(f"Verification failed: {e}")
@@ -217,6 +224,7 @@ CRITICAL CHECKS:
             return data
             
         logger.warning(f"Found {len(bad_indices)} bad Gap Fill sentences. Repairing...")
+        metrics.count("gap_fill_repairs_total", len(bad_indices))
         
         # Construct repair prompt
         bad_items = [sentences[i] for i in bad_indices]
@@ -252,15 +260,17 @@ Return ONLY a JSON object with the fixed items:
 }}
 """
         try:
-            response = await client.chat.completions.create(
-                model=MODEL_NAME,
-                messages=[
-                    {"role": "system", "content": "You are a strict editor."},
-                    {"role": "user", "content": repair_prompt}
-                ],
-                response_format={"type": "json_object"},
-                temperature=0.1
-            )
+            with metrics.span("llm_repair", model=MODEL_NAME) as span:
+                response = await client.chat.completions.create(
+                    model=MODEL_NAME,
+                    messages=[
+                        {"role": "system", "content": "You are a strict editor."},
+                        {"role": "user", "content": repair_prompt}
+                    ],
+                    response_format={"type": "json_object"},
+                    temperature=0.1
+                )
+            metrics.record_usage(response, stage="llm_repair", model=MODEL_NAME, latency=span.duration)
             result = json.loads(response.choices[0].message.content)
             fixed_items = result.get('fixed_items', [])
             
@@ -577,16 +587,19 @@ OUTPUT FORMAT (JSON)
         
         for attempt in range(self.max_retries):
             try:
-                response = await client.chat.completions.create(
-                    model=MODEL_NAME,
-                    messages=[
-                        {"role": "system", "content": SYSTEM_PROMPT},
-                        {"role": "user", "content": prompt}
-                    ],
-                    response_format={"type": "json_object"},
-                    temperature=0.7,
-                    max_tokens=4000
-                )
+                with metrics.span("llm_generate", model=MODEL_NAME, attempt=attempt + 1) as span:
+                    response = await client.chat.completions.create(
+                        model=MODEL_NAME,
+                        messages=[
+                            {"role": "system", "content": SYSTEM_PROMPT},
+                            {"role": "user", "content": prompt}
+                        ],
+                        response_format={"type": "json_object"},
+                        temperature=0.7,
+                        max_tokens=4000
+                    )
+                metrics.record_usage(response, stage="llm_generate", model=MODEL_NAME,
+                                     latency=span.duration, retries=attempt)
                 
                 raw_content = response.choices[0].message.content
                 data = json.loads(raw_content)
@@ -599,6 +612,7 @@ OUTPUT FORMAT (JSON)
                 
                 if missing_fields:
                     logger.warning(f"Missing fields: {missing_fields}. Retrying...")
+                    metrics.count("llm_retries_total", reason="missing_fields")
                     if attempt < self.max_retries - 1:
                         continue
                 
@@ -609,10 +623,12 @@ OUTPUT FORMAT (JSON)
                 # Safety Check: If verification wiped out Reading or True/False, restore from original
                 if not verified_data.get('reading_tf', {}).get('text'):
                     logger.warning("Verification wiped Activity 8 (True/False). Restoring original.")
+                    metrics.count("verification_restores_total", activity="reading_tf")
                     verified_data['reading_tf'] = data.get('reading_tf')
                     
                 if not verified_data.get('reading', {}).get('text'):
                      logger.warning("Verification wiped Activity 7 (Reading). Restoring original.")
+                     metrics.count("verification_restores_total", activity="reading")
                      verified_data['reading'] = data.get('reading')
                 
                 data = verified_data
@@ -626,6 +642,7 @@ OUTPUT FORMAT (JSON)
             except Exception as e:
                 logger.error(f"AI Error: {e}")
                 if attempt < self.max_retries - 1:
+                    metrics.count("llm_retries_total", reason="error")
                     await asyncio.sleep(self.retry_delay)
                     continue
                 raise
@@ -901,64 +918,63 @@ OUTPUT FORMAT (JSON)
         """Render the worksheet data to PDF using Playwright."""
         logger.info("Rendering PDF...")
         
-        async with async_playwright() as p:
-            browser = await p.chromium.launch()
-            page = await browser.new_page()
-            
-            # Load Template
-            script_dir = os.path.dirname(os.path.abspath(__file__))
-            template_path = os.path.join(script_dir, "gcse_new_template.html")
-            
-            if not os.path.exists(template_path):
-                raise FileNotFoundError(f"Template not found: {template_path}")
-            
-            await page.goto(f"file://{template_path}")
-            
-            # Inject Data - escape for JavaScript
-            json_data = json.dumps(data)
-            await page.evaluate(f"renderData({json_data}, false)")
-            await page.wait_for_timeout(1000)
-            
-            # Save Student Version
-            os.makedirs(OUTPUT_DIR, exist_ok=True)
-            
-            # Create safe filename
-            safe_topic = f"{job['theme']}_{job['unit']}"
-            # Remove unsafe characters
-            for char in [' ', '/', '\\', ':', '*', '?', '"', '<', '>', '|']:
-                safe_topic = safe_topic.replace(char, '_')
-            safe_name = f"{job['language']}_{safe_topic}_Vol{batch_num}"
-            
-            student_pdf = f"{OUTPUT_DIR}/{safe_name}_student.pdf"
-            await page.pdf(path=student_pdf, format="A4", print_background=True)
-            
-            # Inject Answers
-            await page.evaluate(f"renderData({json_data}, true)")
-            await page.wait_for_timeout(500)
-            answers_pdf = f"{OUTPUT_DIR}/{safe_name}_answers.pdf"
-            await page.pdf(path=answers_pdf, format="A4", print_background=True)
-            
-            await browser.close()
-            
-            # Combine PDFs
-            from pypdf import PdfReader, PdfWriter
-            writer = PdfWriter()
-            
-            for pdf in [student_pdf, answers_pdf]:
-                reader = PdfReader(pdf)
-                for page_obj in reader.pages:
-                    writer.add_page(page_obj)
+        with metrics.span("chromium", language=job['language']):
+            async with async_playwright() as p:
+                browser = await p.chromium.launch()
+                page = await browser.new_page()
+                profile = current_profile()
+                if profile:
+                    await profile.start_trace(page.context)
+                
+                # Load Template
+                script_dir = os.path.dirname(os.path.abspath(__file__))
+                template_path = os.path.join(script_dir, "gcse_new_template.html")
+                
+                if not os.path.exists(template_path):
+                    raise FileNotFoundError(f"Template not found: {template_path}")
+                
+                await page.goto(f"file://{template_path}")
+                
+                # Inject Data (sent once, reused for the answers)
+                await send_render_data(page, data)
+                await render(page, show_answers=False)
+                await page.wait_for_timeout(1000)
+                
+                # Save Student Version
+                os.makedirs(OUTPUT_DIR, exist_ok=True)
+                
+                # Create safe filename
+                safe_topic = f"{job['theme']}_{job['unit']}"
+                # Remove unsafe characters
+                for char in [' ', '/', '\\', ':', '*', '?', '"', '<', '>', '|']:
+                    safe_topic = safe_topic.replace(char, '_')
+                safe_name = f"{job['language']}_{safe_topic}_Vol{batch_num}"
+                
+                student_pdf = f"{OUTPUT_DIR}/{safe_name}_student.pdf"
+                await page.pdf(path=student_pdf, format="A4", print_background=True)
+                
+                # Inject Answers
+                await render(page, show_answers=True)
+                await page.wait_for_timeout(500)
+                answers_pdf = f"{OUTPUT_DIR}/{safe_name}_answers.pdf"
+                await page.pdf(path=answers_pdf, format="A4", print_background=True)
+                
+                if profile:
+                    await profile.stop_trace(page.context)
+                await browser.close()
             
+        # Combine PDFs
+        with metrics.span("pdf_merge"):
             final_path = f"{OUTPUT_DIR}/{safe_name}_MASTER.pdf"
-            with open(final_path, "wb") as f:
-                writer.write(f)
+            merge_pdfs([student_pdf, answers_pdf], final_path)
                 
             # Cleanup temporary files
             os.remove(student_pdf)
             os.remove(answers_pdf)
             
-            logger.info(f"Created: {final_path}")
-            return final_path
+        note_output(final_path)
+        logger.info(f"Created: {final_path}")
+        return final_path
 
 def fetch_vocab_paginated(language, exam_board):
     print(f"📡 Fetching vocabulary for {language.upper()} ({exam_board})...")
@@ -967,13 +983,14 @@ def fetch_vocab_paginated(language, exam_board):
     offset = 0
     
     while True:
-        response = supabase.table("centralized_vocabulary")\
-            .select("language, word, translation, part_of_speech, theme_name, unit_name, exam_board_code, tier")\
-            .eq("curriculum_level", "KS4")\
-            .eq("language", language)\
-            .eq("exam_board_code", exam_board)\
-            .range(offset, offset + page_size - 1)\
-            .execute()
+        with metrics.span("supabase_fetch", table="centralized_vocabulary"):
+            response = supabase.table("centralized_vocabulary")\
+                .select("language, word, translation, part_of_speech, theme_name, unit_name, exam_board_code, tier")\
+                .eq("curriculum_level", "KS4")\
+                .eq("language", language)\
+                .eq("exam_board_code", exam_board)\
+                .range(offset, offset + page_size - 1)\
+                .execute()
             
         rows = response.data
         if not rows:
@@ -988,39 +1005,8 @@ def fetch_vocab_paginated(language, exam_board):
         
     return all_rows
 
-def main():
-    print("\n🎓 GCSE Mastery Worksheet Generator\n")
-    
-    # 1. Select Language
-    languages = [
-        questionary.Choice("French", value="fr"),
-        questionary.Choice("German", value="de"),
-        questionary.Choice("Spanish", value="es")
-    ]
-    language = questionary.select("Select Language:", choices=languages).ask()
-    if not language: return
-
-    # 2. Select Exam Board
-    boards = ["AQA", "Edexcel"]
-    exam_board = questionary.select("Select Exam Board:", choices=boards).ask()
-    if not exam_board: return
-
-    # 3. Select Tier
-    tiers = [
-        questionary.Choice("Foundation", value="foundation"),
-        questionary.Choice("Higher", value="higher")
-    ]
-    tier = questionary.select("Select Tier:", choices=tiers).ask()
-    if not tier: return
-
-    # 4. Fetch Data
-    vocab_list = fetch_vocab_paginated(language, exam_board)
-    
-    if not vocab_list:
-        print("❌ No vocabulary found for this combination.")
-        return
-
-    # 5. Filter by Tier & Group by Unit (Aggregating all words for the unit)
+def build_jobs(vocab_list, language, exam_board, tier):
+    """Filter rows by tier and group them into one job per unit (at least 10 words each)."""
     unit_to_words = defaultdict(list)
     unit_to_themes = defaultdict(lambda: defaultdict(int))
     
@@ -1082,6 +1068,57 @@ def main():
             })
             
     jobs.sort(key=lambda x: x['display'])
+    return jobs
+
+def make_batches(full_vocab):
+    """Split a unit's words into worksheets of BATCH_SIZE, sorted alphabetically."""
+    # Sort alphabetically by target word to ensure consistent batches
+    full_vocab.sort(key=lambda x: x['word'].lower())
+    
+    # Use the constant defined at module level
+    batches = [full_vocab[i:i + BATCH_SIZE] for i in range(0, len(full_vocab), BATCH_SIZE)]
+    
+    # Handle last batch if it's too small (less than 10 words)
+    if len(batches) > 1 and len(batches[-1]) < MIN_WORDS_FOR_WORKSHEET:
+        # Merge last batch with second-to-last
+        batches[-2].extend(batches[-1])
+        batches.pop()
+    return batches
+
+def main():
+    print("\n🎓 GCSE Mastery Worksheet Generator\n")
+    
+    # 1. Select Language
+    languages = [
+        questionary.Choice("French", value="fr"),
+        questionary.Choice("German", value="de"),
+        questionary.Choice("Spanish", value="es")
+    ]
+    language = questionary.select("Select Language:", choices=languages).ask()
+    if not language: return
+
+    # 2. Select Exam Board
+    boards = ["AQA", "Edexcel"]
+    exam_board = questionary.select("Select Exam Board:", choices=boards).ask()
+    if not exam_board: return
+
+    # 3. Select Tier
+    tiers = [
+        questionary.Choice("Foundation", value="foundation"),
+        questionary.Choice("Higher", value="higher")
+    ]
+    tier = questionary.select("Select Tier:", choices=tiers).ask()
+    if not tier: return
+
+    # 4. Fetch Data
+    vocab_list = fetch_vocab_paginated(language, exam_board)
+    
+    if not vocab_list:
+        print("❌ No vocabulary found for this combination.")
+        return
+
+    # 5. Filter by Tier & Group by Unit (Aggregating all words for the unit)
+    jobs = build_jobs(vocab_list, language, exam_board, tier)
     
     if not jobs:
         print("❌ No valid topics found.")
@@ -1101,47 +1138,61 @@ def main():
     
     # 7. BATCHING LOGIC
     full_vocab = selected_job['vocab']
-    # Sort alphabetically by target word to ensure consistent batches
-    full_vocab.sort(key=lambda x: x['word'].lower())
-    
-    # Use the constant defined at module level
-    batches = [full_vocab[i:i + BATCH_SIZE] for i in range(0, len(full_vocab), BATCH_SIZE)]
-    
-    # Handle last batch if it's too small (less than 10 words)
-    if len(batches) > 1 and len(batches[-1]) < MIN_WORDS_FOR_WORKSHEET:
-        # Merge last batch with second-to-last
-        batches[-2].extend(batches[-1])
-        batches.pop()
+    batches = make_batches(full_vocab)
     
     print(f"\n📚 Found {len(full_vocab)} words. Creating {len(batches)} worksheets (Vol 1-{len(batches)}).")
     
     generator = GCSEWorksheetGenerator()
+    # Every model call goes to the cost ledger; WORKSHEET_BUDGET_TOKENS/_SECONDS cap the run
+    ledger = CostLedger.from_env("gcse_factory").attach(metrics)
+    # WORKSHEET_PROFILE="Vol 2" (or a unit name, or "all") profiles matching batches
+    profiler = JobProfiler.from_env()
+    topic = f"{selected_job['theme']} - {selected_job['unit']}"
     
     # Track success/failure
     successful = 0
     failed = 0
+    skipped = 0
     
     for i, batch in enumerate(batches):
+        batch_topic = f"{topic} (Vol {i + 1})"
+        if ledger.skip(batch_topic):
+            skipped += 1
+            continue
         try:
             # Create a sub-job for this batch
             batch_job = selected_job.copy()
             batch_job['vocab'] = batch
-            result = asyncio.run(generator.generate(batch_job, i + 1, len(batches)))
+            with metrics.span("worksheet", language=batch_job['language'], batch=i + 1, topic=batch_topic):
+                worksheet = generator.generate(batch_job, i + 1, len(batches))
+                if profiler.wants(batch_topic):
+                    worksheet = profiler.run(batch_topic, worksheet, OUTPUT_DIR)
+                result = asyncio.run(worksheet)
             if result is not None:
                 successful += 1
+                metrics.count("worksheets_total", status="success")
+                ledger.record_job(batch_topic, "ok")
             else:
                 failed += 1
+                metrics.count("worksheets_total", status="failed")
+                ledger.record_job(batch_topic, "failed")
         except Exception as e:
             logger.error(f"Failed to generate batch {i+1}: {e}")
             failed += 1
+            metrics.count("worksheets_total", status="error")
+            ledger.record_job(batch_topic, "failed")
     
     # Summary
     print(f"\n{'='*50}")
     print(f"📊 Generation Complete!")
     print(f"   ✅ Successful: {successful}")
     print(f"   ❌ Failed: {failed}")
+    if skipped:
+        print(f"   ⛔ Skipped: {skipped} (budget reached)")
     print(f"   📁 Output: {OUTPUT_DIR}/")
     print(f"{'='*50}\n")
+    metrics.finish()
+    ledger.finish()
 
 if __name__ == "__main__":
     main()
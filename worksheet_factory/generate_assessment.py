@@ -1,10 +1,11 @@
 import os
-import json
 import asyncio
-import base64
 from playwright.async_api import async_playwright
 from dotenv import load_dotenv
 from supabase import create_client, Client
+from assets import assets
+from render_data import send_render_data, render
+from pdf_tools import merge_pdfs
 
 # Load environment variables
 load_dotenv('.env.local')
@@ -29,14 +30,6 @@ supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
 
 OUTPUT_DIR = "output/assessments"
 
-def get_logo_base64():
-    logo_path = "logo.png"
-    if not os.path.exists(logo_path):
-        return ""
-    with open(logo_path, "rb") as image_file:
-        encoded_string = base64.b64encode(image_file.read()).decode('utf-8')
-        return f"data:image/png;base64,{encoded_string}"
-
 async def generate_assessment_pdf(task_id):
     print(f"🚀 Generating PDF for Task ID: {task_id}")
 
@@ -63,13 +56,14 @@ async def generate_assessment_pdf(task_id):
         "title": task['title'],
         "content": task['content'],
         "questions": questions,
-        "logo_base64": get_logo_base64()
+        "logo_base64": assets.url("logo.png")  # served by assets.install(page)
     }
 
     # 3. Render PDF
     async with async_playwright() as p:
         browser = await p.chromium.launch()
         page = await browser.new_page()
+        await assets.install(page)
 
         # Load Template
         script_dir = os.path.dirname(os.path.abspath(__file__))
@@ -77,7 +71,8 @@ async def generate_assessment_pdf(task_id):
         await page.goto(f"file://{template_path}")
 
         # Inject Data (Student Version)
-        await page.evaluate(f"renderData({json.dumps(data)}, false)")
+        await send_render_data(page, data)
+        await render(page, show_answers=False)
         await page.wait_for_timeout(500)
 
         os.makedirs(OUTPUT_DIR, exist_ok=True)
@@ -88,7 +83,7 @@ async def generate_assessment_pdf(task_id):
         print(f"   ✅ Saved Student PDF: {student_pdf}")
 
         # Inject Data (Answer Key)
-        await page.evaluate(f"renderData({json.dumps(data)}, true)")
+        await render(page, show_answers=True)
         await page.wait_for_timeout(500)
         
         answers_pdf = f"{OUTPUT_DIR}/{safe_title}_Answers.pdf"
@@ -97,23 +92,8 @@ async def generate_assessment_pdf(task_id):
 
         # Merge PDFs (Optional, but requested "one file" usually implies merged or zip)
         # The user said "a PDF", singular. So let's merge them.
-        from pypdf import PdfReader, PdfWriter
-        
-        writer = PdfWriter()
-        
-        # Add student page(s)
-        student_reader = PdfReader(student_pdf)
-        for p_obj in student_reader.pages:
-            writer.add_page(p_obj)
-            
-        # Add answer page(s)
-        answers_reader = PdfReader(answers_pdf)
-        for p_obj in answers_reader.pages:
-            writer.add_page(p_obj)
-            
         final_pdf = f"{OUTPUT_DIR}/{safe_title}.pdf"
-        with open(final_pdf, "wb") as f:
-            writer.write(f)
+        merge_pdfs([student_pdf, answers_pdf], final_pdf)
             
         print(f"   🎉 Final Merged PDF: {final_pdf}")
         
@@ -1,9 +1,10 @@
 import os
 import asyncio
-import json
 from datetime import datetime
 from dotenv import load_dotenv
 from supabase import create_client, Client
+from storage_index import StorageIndex
+from timestamp_matcher import TimestampMatcher, parse_timestamp
 
 # Load environment variables
 load_dotenv('.env.local')
@@ -38,9 +39,11 @@ async def inspect():
         if product['file_path']:
             # Extract filename from URL
             # URL format: .../products/files/1764624753532_filename.pdf
-            print("\n🔎 Listing 'previews' bucket (oldest first)...")
+            print("\n🔎 Loading 'previews' from the storage index (oldest first)...")
             try:
-                files = supabase.storage.from_("products").list("previews", {"limit": 100, "sortBy": {"column": "created_at", "order": "asc"}})
+                index = StorageIndex(supabase)
+                index.refresh(["previews"])
+                files = index.files("previews")
                 
                 print(f"Found {len(files)} files in previews:")
                 for f in files[:20]:
@@ -54,8 +57,10 @@ async def inspect():
                     p_time = datetime.fromisoformat(product['created_at'].replace('Z', '+00:00'))
                     print(f"\nProduct Created At: {p_time}")
                     
-                    # Look for files with timestamp in name close to p_time
-                    # or files with metadata created_at close to p_time
+                    # Look for files with metadata created_at close to p_time
+                    closest, diff = TimestampMatcher(files).nearest(parse_timestamp(product['created_at']))
+                    if closest:
+                        print(f"Closest preview: {closest['name']} ({diff:.1f}s away)")
                     
             except Exception as e:
                 print(f"Error listing bucket: {e}")
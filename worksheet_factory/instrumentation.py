@@ -0,0 +1,251 @@
+import os
+import json
+import time
+import uuid
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+METRICS_DIR = os.getenv("WORKSHEET_METRICS_DIR", "output/metrics")
+
+_current_span: ContextVar[Optional[str]] = ContextVar("current_span", default=None)
+_current_labels: ContextVar[Dict[str, Any]] = ContextVar("current_labels", default={})
+
+LabelKey = Tuple[str, Tuple[Tuple[str, str], ...]]
+
+
+def _key(name: str, labels: Dict[str, Any]) -> LabelKey:
+    return name, tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _quantile(values: List[float], q: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(q * (len(ordered) - 1)))))
+    return ordered[index]
+
+
+def _prom_labels(labels: Tuple[Tuple[str, str], ...], extra: Dict[str, str] = None) -> str:
+    pairs = list(labels) + list((extra or {}).items())
+    if not pairs:
+        return ""
+    escaped = (v.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, v in pairs)
+    return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + "}"
+
+
+class Span:
+    """Handle yielded by Metrics.span(); `duration` is set when the block exits."""
+
+    def __init__(self, span_id: str, stage: str):
+        self.span_id = span_id
+        self.stage = stage
+        self.duration: Optional[float] = None
+
+
+class Metrics:
+    """
+    Spans, counters and histograms for one run of a factory script.
+
+    `span(stage)` times a block (sync or inside async code) and records it as
+    a `stage_seconds` observation plus a JSONL event with its parent span, so
+    nested stages (job -> llm -> ...) can be reconstructed. Labels of outer
+    spans (e.g. topic) are inherited by everything inside them.
+    `record_usage` adds the prompt/completion tokens from an OpenAI response
+    and passes the usage event to every function in `sinks` (see
+    cost_ledger.py). `finish()` writes the Prometheus text file and prints a
+    per-stage summary table.
+
+    Usage:
+        with metrics.span("llm", model=MODEL_NAME) as span:
+            response = await client.chat.completions.create(...)
+        metrics.record_usage(response, stage="llm", model=MODEL_NAME, latency=span.duration)
+        ...
+        metrics.finish()
+    """
+
+    def __init__(self, output_dir: str = METRICS_DIR, run_name: Optional[str] = None):
+        self.output_dir = output_dir
+        self.run_id = run_name or datetime.now().strftime("%Y%m%d-%H%M%S")
+        self.counters: Dict[LabelKey, float] = {}
+        self.histograms: Dict[LabelKey, List[float]] = {}
+        self._lock = threading.Lock()
+        self._events = None
+        self._started = time.perf_counter()
+        self.sinks: List[Callable[[Dict[str, Any]], None]] = []
+
+    @property
+    def events_path(self) -> str:
+        return os.path.join(self.output_dir, f"run-{self.run_id}.jsonl")
+
+    @property
+    def prometheus_path(self) -> str:
+        return os.path.join(self.output_dir, "worksheet_factory.prom")
+
+    # --- Recording ---
+
+    def _emit(self, event: Dict[str, Any]):
+        event.setdefault("run_id", self.run_id)
+        event.setdefault("ts", time.time())
+        line = json.dumps(event, ensure_ascii=False, default=str)
+        with self._lock:
+            if self._events is None:
+                os.makedirs(self.output_dir, exist_ok=True)
+                self._events = open(self.events_path, "a", encoding="utf-8")
+            self._events.write(line + "\n")
+
+    def count(self, name: str, value: float = 1, **labels):
+        key = _key(name, labels)
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name: str, value: float, **labels):
+        key = _key(name, labels)
+        with self._lock:
+            self.histograms.setdefault(key, []).append(value)
+
+    @contextmanager
+    def span(self, stage: str, **labels):
+        handle = Span(uuid.uuid4().hex[:16], stage)
+        parent = _current_span.get()
+        token = _current_span.set(handle.span_id)
+        labels_token = _current_labels.set({**_current_labels.get(), **labels})
+        start = time.perf_counter()
+        status = "ok"
+        try:
+            yield handle
+        except BaseException as e:
+            status = "error"
+            self.count("stage_errors_total", stage=stage, error=type(e).__name__)
+            raise
+        finally:
+            duration = handle.duration = time.perf_counter() - start
+            _current_labels.reset(labels_token)
+            _current_span.reset(token)
+            self.observe("stage_seconds", duration, stage=stage)
+            self._emit({
+                "type": "span", "stage": stage, "span_id": handle.span_id, "parent_id": parent,
+                "duration_s": round(duration, 6), "status": status, "labels": labels,
+            })
+
+    def record_usage(self, response, stage: str, model: Optional[str] = None,
+                     latency: Optional[float] = None, retries: int = 0):
+        """
+        Token counts from an OpenAI chat completion (`response.usage`).
+        `latency` is the call's duration (the span's), `retries` how many
+        attempts came before this one; the topic comes from the enclosing spans.
+        """
+        usage = getattr(response, "usage", None)
+        model = model or getattr(response, "model", None) or "unknown"
+        self.count("llm_requests_total", stage=stage, model=model)
+        if retries:
+            self.count("llm_retried_requests_total", stage=stage, model=model)
+        prompt = (getattr(usage, "prompt_tokens", 0) or 0) if usage is not None else 0
+        completion = (getattr(usage, "completion_tokens", 0) or 0) if usage is not None else 0
+        self.count("llm_prompt_tokens_total", prompt, stage=stage, model=model)
+        self.count("llm_completion_tokens_total", completion, stage=stage, model=model)
+        event = {
+            "type": "llm_usage", "stage": stage, "model": model, "parent_id": _current_span.get(),
+            "topic": _current_labels.get().get("topic"), "prompt_tokens": prompt,
+            "completion_tokens": completion, "latency_s": latency, "retries": retries,
+        }
+        self._emit(dict(event))
+        for sink in self.sinks:
+            sink(event)
+
+    # --- Output ---
+
+    def prometheus_text(self) -> str:
+        lines = []
+        with self._lock:
+            counters = dict(self.counters)
+            histograms = {k: list(v) for k, v in self.histograms.items()}
+
+        seen = set()
+        for (name, labels), value in sorted(counters.items()):
+            metric = f"worksheet_{name}"
+            if metric not in seen:
+                lines.append(f"# TYPE {metric} counter")
+                seen.add(metric)
+            lines.append(f"{metric}{_prom_labels(labels)} {value:g}")
+
+        for (name, labels), values in sorted(histograms.items()):
+            metric = f"worksheet_{name}"
+            if metric not in seen:
+                lines.append(f"# TYPE {metric} summary")
+                seen.add(metric)
+            for q in (0.5, 0.95):
+                lines.append(f"{metric}{_prom_labels(labels, {'quantile': str(q)})} {_quantile(values, q):.6f}")
+            lines.append(f"{metric}_sum{_prom_labels(labels)} {sum(values):.6f}")
+            lines.append(f"{metric}_count{_prom_labels(labels)} {len(values)}")
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path: Optional[str] = None) -> str:
+        path = path or self.prometheus_path
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp = f"{path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(self.prometheus_text())
+        os.replace(tmp, path)  # atomic for textfile collectors
+        return path
+
+    def summary_rows(self) -> List[Tuple[str, int, float, float, float, float]]:
+        """(stage, count, total, mean, p50, p95) per stage, slowest total first."""
+        rows = []
+        for (name, labels), values in self.histograms.items():
+            if name != "stage_seconds":
+                continue
+            stage = dict(labels).get("stage", "?")
+            rows.append((stage, len(values), sum(values), sum(values) / len(values),
+                         _quantile(values, 0.5), _quantile(values, 0.95)))
+        return sorted(rows, key=lambda r: r[2], reverse=True)
+
+    def print_summary(self):
+        rows = self.summary_rows()
+        wall = time.perf_counter() - self._started
+        print(f"\n📈 Run {self.run_id}: {wall:.1f}s wall time")
+        if rows:
+            print(f"   {'stage':<18} {'count':>6} {'total s':>9} {'mean s':>8} {'p50 s':>8} {'p95 s':>8}")
+            for stage, n, total, mean, p50, p95 in rows:
+                print(f"   {stage:<18} {n:>6} {total:>9.2f} {mean:>8.2f} {p50:>8.2f} {p95:>8.2f}")
+
+        tokens = {}
+        for (name, labels), value in self.counters.items():
+            if name in ("llm_prompt_tokens_total", "llm_completion_tokens_total"):
+                stage = dict(labels).get("stage", "?")
+                entry = tokens.setdefault(stage, [0, 0])
+                entry[0 if name == "llm_prompt_tokens_total" else 1] += value
+        if tokens:
+            print(f"   {'llm stage':<18} {'prompt':>9} {'completion':>11}")
+            for stage, (prompt, completion) in sorted(tokens.items()):
+                print(f"   {stage:<18} {int(prompt):>9} {int(completion):>11}")
+
+        errors = {dict(labels).get("stage"): value for (name, labels), value in self.counters.items()
+                  if name == "stage_errors_total"}
+        if errors:
+            print("   ❌ errors: " + ", ".join(f"{stage}={int(n)}" for stage, n in errors.items()))
+
+    def reset(self, run_name: Optional[str] = None):
+        """Start a fresh run (new JSONL file, empty counters), e.g. between benchmark levels."""
+        with self._lock:
+            if self._events is not None:
+                self._events.close()
+                self._events = None
+            self.counters.clear()
+            self.histograms.clear()
+            self.run_id = run_name or datetime.now().strftime("%Y%m%d-%H%M%S")
+        self._started = time.perf_counter()
+
+    def finish(self):
+        """Write the Prometheus file, close the JSONL log and print the summary table."""
+        path = self.write_prometheus()
+        with self._lock:
+            if self._events is not None:
+                self._events.close()
+                self._events = None
+        self.print_summary()
+        print(f"   📝 Metrics: {self.events_path}, {path}")
+
+
+# Shared by every script in the factory
+metrics = Metrics()
@@ -0,0 +1,221 @@
+import os
+import re
+import sys
+import json
+import time
+import argparse
+from bisect import bisect_left
+from collections import defaultdict
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set
+
+INDEX_PATH = "output/job_index.json"
+INDEX_VERSION = 1
+MAX_AGE_HOURS = float(os.getenv("WORKSHEET_JOB_INDEX_MAX_AGE_HOURS", "24"))
+LEVELS = ("KS3", "KS4")
+KEYS = ("language", "level", "category")
+
+_WORD = re.compile(r"\w+")
+
+
+def tokenize(text: str) -> List[str]:
+    return _WORD.findall(text.lower())
+
+
+def trigrams(text: str) -> Set[str]:
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+def job_level(job: Dict[str, Any]) -> str:
+    """KS3 / KS4 / Other, the same split the menu has always made on the topic."""
+    return job.get('level') or next((l for l in LEVELS if job['topic'].startswith(l)), "Other")
+
+
+class JobIndex:
+    """
+    The worksheet jobs from fetch_jobs_from_supabase(), saved to
+    `output/job_index.json` so the menu doesn't refetch and regroup the whole
+    vocabulary table on every launch.
+
+    Jobs are looked up by sets of ids (positions in `jobs`, which is what
+    the menu selects by, since display names need not be unique): one set
+    per language, level and category, a token index over display names
+    (prefix matching, so "doct" finds "doctors") and a trigram index for
+    substring matches. Filters intersect those sets, so selecting among tens
+    of thousands of topics stays instant. The postings are rebuilt when the
+    file is loaded; the file is rebuilt when it is missing, older than
+    MAX_AGE_HOURS, or the vocabulary table's row count has changed.
+    """
+
+    def __init__(self, jobs: List[Dict[str, Any]], built_at: Optional[float] = None,
+                 row_count: Optional[int] = None, path: str = INDEX_PATH):
+        self.jobs = jobs
+        self.built_at = built_at or time.time()
+        self.row_count = row_count
+        self.path = path
+        self._index()
+
+    def _index(self):
+        self.keys: Dict[str, Dict[str, Set[int]]] = {key: defaultdict(set) for key in KEYS}
+        self.tokens: Dict[str, Set[int]] = defaultdict(set)
+        self.grams: Dict[str, Set[int]] = defaultdict(set)
+        for i, job in enumerate(self.jobs):
+            self.keys["language"][job['language']].add(i)
+            self.keys["level"][job_level(job)].add(i)
+            self.keys["category"][job.get('category') or "General"].add(i)
+            for token in tokenize(job['display_name']):
+                self.tokens[token].add(i)
+            for gram in trigrams(job['display_name'].lower()):
+                self.grams[gram].add(i)
+        self._sorted_tokens = sorted(self.tokens)
+
+    # --- Persistence ---
+
+    @classmethod
+    def load(cls, path: str = INDEX_PATH) -> Optional["JobIndex"]:
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"   ⚠️ Ignoring unreadable job index {path}: {e}")
+            return None
+        if data.get('version') != INDEX_VERSION:
+            return None
+        return cls(data['jobs'], built_at=data.get('built_at'), row_count=data.get('row_count'), path=path)
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({"version": INDEX_VERSION, "built_at": self.built_at,
+                       "row_count": self.row_count, "jobs": self.jobs}, f, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+
+    @classmethod
+    def load_or_build(cls, build: Callable[[], List[Dict[str, Any]]],
+                      row_count: Optional[Callable[[], Optional[int]]] = None, refresh: bool = False,
+                      path: str = INDEX_PATH, max_age_hours: float = MAX_AGE_HOURS) -> "JobIndex":
+        """The saved index if it is still current, otherwise `build()` the jobs and save a new one."""
+        index = None if refresh else cls.load(path)
+        current_rows = None
+        if refresh:
+            reason = "refresh requested"
+        elif index is None:
+            reason = "no saved index"
+        elif index.age_hours > max_age_hours:
+            reason = f"older than {max_age_hours:g}h"
+        else:
+            reason = None
+            current_rows = row_count() if row_count else None
+            if current_rows is not None and index.row_count is not None and current_rows != index.row_count:
+                reason = f"vocabulary changed: {index.row_count} -> {current_rows} rows"
+
+        if reason is None:
+            print(f"📇 Job index: {len(index.jobs)} topics (built {index.age_hours:.1f}h ago, {path})")
+            return index
+
+        print(f"📇 Building job index ({reason})...")
+        if current_rows is None and row_count:
+            current_rows = row_count()
+        index = cls(build(), row_count=current_rows, path=path)
+        index.save()
+        return index
+
+    @property
+    def age_hours(self) -> float:
+        return (time.time() - self.built_at) / 3600
+
+    # --- Lookups ---
+
+    def values(self, key: str) -> List[str]:
+        """Distinct languages / levels / categories, sorted."""
+        return sorted(self.keys[key])
+
+    def search(self, query: str, within: Optional[Set[int]] = None) -> Set[int]:
+        """
+        Jobs with a word starting with every word of `query` ("family mem"
+        finds "Members of the family"), plus those whose display name contains
+        `query` (the menu's old substring match, so "phone" still finds
+        "Smartphones"). Queries under three characters only get the
+        substring match when no word matches.
+        """
+        ids: Optional[Set[int]] = None
+        for word in tokenize(query):
+            hits: Set[int] = set()
+            position = bisect_left(self._sorted_tokens, word)
+            while position < len(self._sorted_tokens) and self._sorted_tokens[position].startswith(word):
+                hits |= self.tokens[self._sorted_tokens[position]]
+                position += 1
+            ids = hits if ids is None else ids & hits
+            if not ids:
+                break
+        ids = ids or set()
+        if within is not None:
+            ids &= within
+
+        # Substring matches: only names holding every trigram of the query are
+        # checked. Queries too short for a trigram fall back to a scan, and
+        # only when the token lookup found nothing.
+        needle = query.lower().strip()
+        if len(needle) >= 3:
+            pool = None
+            for gram in trigrams(needle):
+                postings = self.grams.get(gram, set())
+                pool = set(postings) if pool is None else pool & postings
+                if not pool:
+                    break
+            if within is not None:
+                pool &= within
+        elif not ids:
+            pool = within if within is not None else range(len(self.jobs))
+        else:
+            pool = set()
+        ids |= {i for i in pool if i not in ids and needle in self.jobs[i]['display_name'].lower()}
+        return ids
+
+    def select(self, language: Optional[str] = None, level: Optional[str] = None,
+               category: Optional[str] = None, query: Optional[str] = None) -> Set[int]:
+        """Ids matching every given filter (all jobs when none are given)."""
+        ids: Optional[Set[int]] = None
+        for key, value in zip(KEYS, (language, level, category)):
+            if value is not None:
+                matches = self.keys[key].get(value, set())
+                ids = set(matches) if ids is None else ids & matches
+        if query:
+            ids = self.search(query, within=ids)
+        return set(range(len(self.jobs))) if ids is None else ids
+
+    def jobs_for(self, ids: Iterable[int]) -> List[Dict[str, Any]]:
+        """Jobs in index order (language, then topic)."""
+        return [self.jobs[i] for i in sorted(ids)]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Inspect or rebuild the worksheet job index.")
+    parser.add_argument("--refresh", action="store_true", help="rebuild from Supabase")
+    parser.add_argument("--path", default=INDEX_PATH)
+    parser.add_argument("--language")
+    parser.add_argument("--level", choices=LEVELS + ("Other",))
+    parser.add_argument("--category")
+    parser.add_argument("--search", help="keywords to match in topic names")
+    args = parser.parse_args(argv)
+
+    index = None if args.refresh else JobIndex.load(args.path)
+    if index is None:
+        from factory import fetch_jobs_from_supabase, count_vocabulary_rows
+        index = JobIndex.load_or_build(fetch_jobs_from_supabase, row_count=count_vocabulary_rows,
+                                       refresh=True, path=args.path)
+
+    start = time.perf_counter()
+    ids = index.select(language=args.language, level=args.level, category=args.category, query=args.search)
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    for job in index.jobs_for(ids):
+        print(f"   {job['display_name']} ({len(job['vocab'])} words)")
+    print(f"\n📇 {len(ids)}/{len(index.jobs)} topics in {elapsed_ms:.2f}ms "
+          f"(languages: {', '.join(index.values('language'))}; built {index.age_hours:.1f}h ago)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
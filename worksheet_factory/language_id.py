@@ -0,0 +1,122 @@
+import os
+import re
+import csv
+from collections import Counter
+from functools import lru_cache
+from typing import Dict, Iterable, List, Tuple
+
+import numpy as np
+
+LANGUAGES = ("en", "es", "fr", "de")
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Vocab CSVs in the repo root: target-language words/sentences plus their English translations
+VOCAB_CSVS = [
+    "GCSE_processed_with_sentences.csv",
+    "Edexcel_with_articles_and_cleaned.csv",
+    "Vocab.csv",
+    "Vocab_French.csv",
+]
+FOREIGN_COLUMNS = ("word", "example_sentence")
+ENGLISH_COLUMNS = ("translation", "example_translation")
+
+_NON_LETTERS = re.compile(r"[^\w]+|[\d_]+")
+
+
+def _ngrams(text: str, ngram_range: Tuple[int, int]) -> List[str]:
+    """Character n-grams of each word, padded with spaces so word edges count."""
+    grams = []
+    low, high = ngram_range
+    for word in _NON_LETTERS.sub(" ", text.lower()).split():
+        padded = f" {word} "
+        for n in range(low, high + 1):
+            grams.extend(padded[i:i + n] for i in range(len(padded) - n + 1))
+    return grams
+
+
+def load_vocab_corpus(paths: Iterable[str] = None) -> Dict[str, List[str]]:
+    """{language: [texts]} from the vocab CSVs (missing files are skipped)."""
+    corpus = {lang: [] for lang in LANGUAGES}
+    for name in paths or VOCAB_CSVS:
+        path = name if os.path.isabs(name) else os.path.join(REPO_ROOT, name)
+        if not os.path.exists(path):
+            continue
+        with open(path, "r", encoding="utf-8-sig", newline="") as f:
+            for row in csv.DictReader(f):
+                lang = (row.get("language") or "").strip().lower()
+                if lang in corpus:
+                    corpus[lang].extend(row[c] for c in FOREIGN_COLUMNS if row.get(c))
+                corpus["en"].extend(row[c] for c in ENGLISH_COLUMNS if row.get(c))
+    return corpus
+
+
+class LanguageIdentifier:
+    """
+    Naive Bayes language identifier over character 1-3 grams.
+
+    `predict` scores a whole list of texts in one vectorised pass: every
+    n-gram of every text is mapped to a column of the log-probability matrix,
+    and the per-text sums are taken with a single bincount per language.
+    Confidence is the score margin between the best and second-best language
+    per n-gram, so short or mixed texts come out low-confidence.
+
+    Usage:
+        identifier = load_default_identifier()
+        for lang, confidence in identifier.predict(descriptions): ...
+    """
+
+    def __init__(self, ngram_range: Tuple[int, int] = (1, 3), alpha: float = 0.5):
+        self.ngram_range = ngram_range
+        self.alpha = alpha
+        self.languages: Tuple[str, ...] = ()
+        self.vocabulary: Dict[str, int] = {}
+        self.log_probs = np.zeros((0, 0))
+
+    def fit(self, corpus: Dict[str, List[str]]) -> "LanguageIdentifier":
+        self.languages = tuple(lang for lang, texts in corpus.items() if texts)
+        counts = {lang: Counter(g for text in corpus[lang] for g in _ngrams(text, self.ngram_range))
+                  for lang in self.languages}
+        self.vocabulary = {g: i for i, g in enumerate(sorted(set().union(*counts.values())))}
+
+        matrix = np.full((len(self.languages), len(self.vocabulary)), self.alpha)
+        for row, lang in enumerate(self.languages):
+            grams, values = zip(*counts[lang].items())
+            matrix[row, [self.vocabulary[g] for g in grams]] += values
+        self.log_probs = np.log(matrix / matrix.sum(axis=1, keepdims=True))
+        return self
+
+    def predict(self, texts: List[str]) -> List[Tuple[str, float]]:
+        """(language, confidence) per text; texts with no known n-grams get ('unknown', 0.0)."""
+        ids, owners = [], []
+        for i, text in enumerate(texts):
+            known = [self.vocabulary[g] for g in _ngrams(text or "", self.ngram_range) if g in self.vocabulary]
+            ids.extend(known)
+            owners.extend([i] * len(known))
+
+        if not ids:
+            return [("unknown", 0.0)] * len(texts)
+        ids = np.asarray(ids)
+        owners = np.asarray(owners)
+
+        gathered = self.log_probs[:, ids]  # languages x total n-grams
+        scores = np.stack([np.bincount(owners, weights=row, minlength=len(texts)) for row in gathered])
+        lengths = np.bincount(owners, minlength=len(texts))
+
+        ranked = np.sort(scores, axis=0)
+        margin = (ranked[-1] - ranked[-2]) / np.maximum(lengths, 1)
+        best = np.argmax(scores, axis=0)
+        return [
+            (self.languages[b], float(m)) if n else ("unknown", 0.0)
+            for b, m, n in zip(best, margin, lengths)
+        ]
+
+    def is_confidently(self, texts: List[str], language: str = "en", min_confidence: float = 0.15) -> List[bool]:
+        """True where a text is classified as `language` with at least `min_confidence`."""
+        return [lang == language and conf >= min_confidence for lang, conf in self.predict(texts)]
+
+
+@lru_cache(maxsize=1)
+def load_default_identifier() -> LanguageIdentifier:
+    """Identifier trained on the repo's vocab CSVs (built once per process)."""
+    return LanguageIdentifier().fit(load_vocab_corpus())
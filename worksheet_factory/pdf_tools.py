@@ -0,0 +1,65 @@
+import os
+from typing import Any, Dict, List
+
+from pypdf import PdfReader, PdfWriter
+from pypdf.generic import ArrayObject
+
+from instrumentation import metrics
+
+
+def _has_uncompressed_contents(page) -> bool:
+    contents = page.get("/Contents")
+    if contents is None:
+        return False
+    contents = contents.get_object()
+    streams = contents if isinstance(contents, ArrayObject) else [contents]
+    return any("/Filter" not in stream.get_object() for stream in streams)
+
+
+def optimise_writer(writer: PdfWriter, level: int = 9) -> Dict[str, int]:
+    """
+    Shrink a merged document in place: Flate-compress page content streams
+    that aren't compressed yet (Chromium's usually are, so this is cheap),
+    then collapse identical objects - the fonts, images and resources each
+    half of a student/answers merge brings along - and drop orphans.
+    """
+    compressed = 0
+    for page in writer.pages:
+        if _has_uncompressed_contents(page):
+            page.compress_content_streams(level=level)
+            compressed += 1
+
+    objects_before = len(writer._objects)
+    if hasattr(writer, "compress_identical_objects"):  # pypdf >= 4.3
+        writer.compress_identical_objects(remove_duplicates=True, remove_unreferenced=True)
+    deduplicated = objects_before - sum(1 for obj in writer._objects if obj is not None)
+    return {"compressed_pages": compressed, "deduplicated_objects": max(0, deduplicated)}
+
+
+def merge_pdfs(paths: List[str], output_path: str, optimise: bool = True) -> Dict[str, Any]:
+    """
+    Concatenate `paths` into `output_path` (e.g. student + answers halves) and,
+    unless optimise=False, deduplicate and compress the result. Returns and
+    prints the size before (sum of the inputs) and after.
+    """
+    writer = PdfWriter()
+    for path in paths:
+        writer.append(PdfReader(path), import_outline=False)
+
+    stats: Dict[str, Any] = {"compressed_pages": 0, "deduplicated_objects": 0}
+    if optimise:
+        with metrics.span("pdf_optimise"):
+            stats = optimise_writer(writer)
+
+    with open(output_path, "wb") as f:
+        writer.write(f)
+
+    before = sum(os.path.getsize(p) for p in paths)
+    after = os.path.getsize(output_path)
+    metrics.count("pdf_input_bytes_total", before)
+    metrics.count("pdf_output_bytes_total", after)
+    stats.update(bytes_before=before, bytes_after=after)
+    if optimise and before:
+        print(f"   🗜️ PDF {before / 1024:.0f} KB -> {after / 1024:.0f} KB "
+              f"({100 * (after - before) / before:+.0f}%, {stats['deduplicated_objects']} duplicate objects removed)")
+    return stats
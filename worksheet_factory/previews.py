@@ -0,0 +1,245 @@
+import io
+import os
+import sys
+import json
+import glob
+import asyncio
+import hashlib
+import argparse
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional
+
+try:
+    from PIL import Image
+    PIL_AVAILABLE = True
+except ImportError:
+    PIL_AVAILABLE = False
+
+try:
+    import pypdfium2 as pdfium
+    PDFIUM_AVAILABLE = True
+except ImportError:
+    PDFIUM_AVAILABLE = False
+
+from instrumentation import metrics
+
+# name -> width in px; "preview" is the 800x800 top-of-page image the store has always shown
+PREVIEW_SIZES = {"preview": 800, "card": 400, "thumb": 200}
+PREVIEW_VERSION = 1  # bump to regenerate every preview after changing how they look
+MANIFEST_NAME = "previews_manifest.json"
+SAVE_OPTIONS = {
+    "png": {"optimize": True},
+    "webp": {"quality": 82, "method": 4},
+}
+
+
+def _output_path(base: str, size: str, fmt: str) -> str:
+    return f"{base}_{size}.{fmt}"
+
+
+def _write_sizes(image_bytes: bytes, base: str, sizes: Dict[str, int], formats: List[str]) -> Dict[str, str]:
+    """Square top-of-page crop of the image, saved once per size and format (needs Pillow)."""
+    image = Image.open(io.BytesIO(image_bytes)).convert("RGB")
+    image = image.crop((0, 0, image.width, min(image.height, image.width)))
+    written = {}
+    for size, width in sizes.items():
+        resized = image if image.width == width else image.resize((width, width), Image.LANCZOS)
+        for fmt in formats:
+            path = _output_path(base, size, fmt)
+            resized.save(path, format=fmt.upper(), **SAVE_OPTIONS.get(fmt, {}))
+            written[f"{size}.{fmt}"] = path
+    return written
+
+
+def _rasterise_pdf(pdf_path: str, base: str, sizes: Dict[str, int], formats: List[str]) -> Dict[str, str]:
+    """Worker: first page of the PDF at the largest preview width, then every size/format."""
+    pdf = pdfium.PdfDocument(pdf_path)
+    try:
+        page = pdf[0]
+        image = page.render(scale=max(sizes.values()) / page.get_width()).to_pil()
+    finally:
+        pdf.close()
+    buffer = io.BytesIO()
+    image.save(buffer, format="PNG")
+    return _write_sizes(buffer.getvalue(), base, sizes, formats)
+
+
+def file_hash(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def render_hash(data: Dict[str, Any], template_path: str) -> str:
+    """Hash of what a page-based preview shows: the render data plus the template it goes into."""
+    digest = hashlib.sha256(json.dumps(data, sort_keys=True, default=str).encode("utf-8"))
+    digest.update(file_hash(template_path).encode("ascii"))
+    return digest.hexdigest()
+
+
+class PreviewPipeline:
+    """
+    Preview images for finished products, off the print path.
+
+    Previews come either from the final PDF (pypdfium2, in a worker pool,
+    also used for bulk re-thumbnailing) or from a screenshot of a dedicated
+    page that renders next to the print page. With Pillow installed every
+    preview is written in each of `sizes` as PNG and WebP; without it only
+    the full-size PNG screenshot is kept. A manifest next to the images
+    records a content hash per product, so unchanged products are skipped.
+
+    Usage:
+        previews = PreviewPipeline()
+        files = previews.current(base, content_hash) or await previews.from_page(page, base, content_hash)
+        files["preview.png"]
+    """
+
+    def __init__(self, sizes: Optional[Dict[str, int]] = None, formats: Optional[List[str]] = None,
+                 workers: Optional[int] = None):
+        self.sizes = dict(sizes or PREVIEW_SIZES)
+        self.formats = formats or (["png", "webp"] if PIL_AVAILABLE else ["png"])
+        self.workers = workers or min(4, os.cpu_count() or 1)
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._manifests: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    # --- Manifest / content hashes ---
+
+    def _settings_hash(self, content_hash: str) -> str:
+        settings = json.dumps([PREVIEW_VERSION, self.sizes, self.formats, PIL_AVAILABLE], sort_keys=True)
+        return hashlib.sha256(f"{content_hash}:{settings}".encode("utf-8")).hexdigest()
+
+    def _manifest(self, directory: str) -> Dict[str, Any]:
+        if directory not in self._manifests:
+            path = os.path.join(directory, MANIFEST_NAME)
+            data = {}
+            if os.path.exists(path):
+                with open(path, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+            self._manifests[directory] = data
+        return self._manifests[directory]
+
+    def _record(self, base: str, content_hash: str, files: Dict[str, str]):
+        directory = os.path.dirname(base) or "."
+        with self._lock:
+            manifest = self._manifest(directory)
+            manifest[os.path.basename(base)] = {
+                "hash": self._settings_hash(content_hash),
+                "files": {k: os.path.basename(v) for k, v in files.items()},
+            }
+            path = os.path.join(directory, MANIFEST_NAME)
+            tmp_path = f"{path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(manifest, f, indent=1)
+            os.replace(tmp_path, path)
+
+    def current(self, base: str, content_hash: str) -> Optional[Dict[str, str]]:
+        """The existing files for `base` if they were made from the same content and settings."""
+        directory = os.path.dirname(base) or "."
+        with self._lock:
+            entry = self._manifest(directory).get(os.path.basename(base))
+        if not entry or entry.get("hash") != self._settings_hash(content_hash):
+            return None
+        files = {k: os.path.join(directory, v) for k, v in entry["files"].items()}
+        if not all(os.path.exists(p) for p in files.values()):
+            return None
+        metrics.count("previews_total", status="unchanged")
+        return files
+
+    # --- Generation ---
+
+    def _executor(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self.workers)
+        return self._pool
+
+    async def from_screenshot(self, image_bytes: bytes, base: str, content_hash: str) -> Dict[str, str]:
+        os.makedirs(os.path.dirname(base) or ".", exist_ok=True)
+        with metrics.span("preview", source="page"):
+            if PIL_AVAILABLE:
+                loop = asyncio.get_running_loop()
+                files = await loop.run_in_executor(self._executor(), _write_sizes, image_bytes, base,
+                                                   self.sizes, self.formats)
+            else:
+                path = _output_path(base, "preview", "png")
+                with open(path, "wb") as f:
+                    f.write(image_bytes)
+                files = {"preview.png": path}
+        self._record(base, content_hash, files)
+        metrics.count("previews_total", status="generated")
+        return files
+
+    async def from_page(self, page, base: str, content_hash: str) -> Dict[str, str]:
+        """Screenshot a page that is already rendered (at an 800px-wide viewport)."""
+        return await self.from_screenshot(await page.screenshot(), base, content_hash)
+
+    async def from_pdf(self, pdf_path: str, base: Optional[str] = None, force: bool = False) -> Dict[str, str]:
+        """Rasterise the first page of a finished PDF (needs pypdfium2 and Pillow)."""
+        if not (PDFIUM_AVAILABLE and PIL_AVAILABLE):
+            raise RuntimeError("PDF previews need pypdfium2 and Pillow (pip install pypdfium2 pillow)")
+        base = base or os.path.splitext(pdf_path)[0]
+        content_hash = file_hash(pdf_path)
+        files = None if force else self.current(base, content_hash)
+        if files is not None:
+            return files
+        with metrics.span("preview", source="pdf"):
+            loop = asyncio.get_running_loop()
+            files = await loop.run_in_executor(self._executor(), _rasterise_pdf, pdf_path, base,
+                                               self.sizes, self.formats)
+        self._record(base, content_hash, files)
+        metrics.count("previews_total", status="generated")
+        return files
+
+    async def from_pdfs(self, pdf_paths: List[str], force: bool = False) -> Dict[str, Any]:
+        """Bulk re-thumbnailing: every PDF through the worker pool, unchanged ones skipped."""
+        async def one(path):
+            try:
+                return path, await self.from_pdf(path, force=force)
+            except Exception as e:
+                print(f"   ❌ {path}: {e}")
+                return path, None
+        return dict(await asyncio.gather(*(one(p) for p in pdf_paths)))
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate preview images for finished PDFs.")
+    parser.add_argument("pdfs", nargs="+", help="PDF files or glob patterns")
+    parser.add_argument("--sizes", help="name=width,... (default: %s)" % ",".join(f"{k}={v}" for k, v in PREVIEW_SIZES.items()))
+    parser.add_argument("--formats", help="comma-separated: png,webp")
+    parser.add_argument("--workers", type=int)
+    parser.add_argument("--force", action="store_true", help="regenerate even when the PDF is unchanged")
+    args = parser.parse_args(argv)
+
+    if not (PDFIUM_AVAILABLE and PIL_AVAILABLE):
+        print("❌ PDF previews need pypdfium2 and Pillow: pip install pypdfium2 pillow")
+        return 1
+    sizes = None
+    if args.sizes:
+        sizes = {name: int(width) for name, width in (s.split("=") for s in args.sizes.split(","))}
+    formats = args.formats.split(",") if args.formats else None
+    paths = sorted({p for pattern in args.pdfs for p in (glob.glob(pattern) or [pattern]) if p.endswith(".pdf")})
+
+    pipeline = PreviewPipeline(sizes=sizes, formats=formats, workers=args.workers)
+    print(f"🖼️ Previews for {len(paths)} PDFs ({pipeline.workers} workers, {', '.join(pipeline.formats)})")
+    try:
+        results = asyncio.run(pipeline.from_pdfs(paths, force=args.force))
+    finally:
+        pipeline.close()
+
+    generated = sum(v for (name, labels), v in metrics.counters.items()
+                    if name == "previews_total" and dict(labels).get("status") == "generated")
+    failed = sum(1 for files in results.values() if files is None)
+    print(f"✅ {int(generated)} generated, {len(paths) - int(generated) - failed} unchanged, {failed} failed")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
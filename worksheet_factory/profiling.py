@@ -0,0 +1,218 @@
+import os
+import re
+import json
+import time
+import pstats
+import asyncio
+import cProfile
+import collections.abc
+from contextvars import ContextVar
+from typing import Any, Awaitable, Dict, List, Optional
+
+PROFILE_ENV = "WORKSHEET_PROFILE"
+
+_current: ContextVar[Optional["ProfileSession"]] = ContextVar("current_profile", default=None)
+
+
+def _slug(text: str) -> str:
+    return re.sub(r"[^A-Za-z0-9_.-]+", "_", text).strip("_")[:120] or "job"
+
+
+def current_profile() -> Optional["ProfileSession"]:
+    """The session profiling the running job, or None (the normal case)."""
+    return _current.get()
+
+
+def note_output(path: str):
+    """Tell the running profile where the job's PDF went, so artifacts land next to it."""
+    session = _current.get()
+    if session is not None:
+        session.output_path = path
+
+
+class _TimedCoroutine(collections.abc.Coroutine):
+    """Wraps a task's coroutine and times every step it runs on the event loop."""
+
+    def __init__(self, coro, record: Dict[str, Any]):
+        self._coro = coro
+        self._record = record
+
+    def _step(self, method, *args):
+        start = time.perf_counter()
+        if self._record["first_step"] is None:
+            self._record["first_step"] = start
+        try:
+            return method(*args)
+        finally:
+            elapsed = time.perf_counter() - start
+            self._record["steps"] += 1
+            self._record["busy_s"] += elapsed
+            self._record["max_step_s"] = max(self._record["max_step_s"], elapsed)
+
+    def send(self, value):
+        return self._step(self._coro.send, value)
+
+    def throw(self, *args):
+        return self._step(self._coro.throw, *args)
+
+    def close(self):
+        return self._coro.close()
+
+    def __await__(self):
+        return self._coro.__await__()
+
+
+class ProfileSession:
+    """
+    Profiling state for one job: a cProfile profile, per-task timings from a
+    task factory installed on the loop, and (when the render code asks for
+    it) a Playwright trace.
+    """
+
+    def __init__(self, name: str, fallback_dir: str):
+        self.name = name
+        self.fallback_dir = fallback_dir
+        self.output_path: Optional[str] = None
+        self.profile = cProfile.Profile()
+        self.tasks: List[Dict[str, Any]] = []
+        self.trace_path: Optional[str] = None
+        self.wall_s = 0.0
+        self.cpu_s = 0.0
+        self._started = time.perf_counter()
+
+    # --- asyncio task timings ---
+
+    def task_factory(self, loop, coro, **kwargs):
+        record = {
+            "name": None, "coro": getattr(coro, "__qualname__", type(coro).__name__),
+            "created": time.perf_counter(), "first_step": None, "done": None,
+            "steps": 0, "busy_s": 0.0, "max_step_s": 0.0, "status": "pending",
+        }
+        task = asyncio.Task(_TimedCoroutine(coro, record), loop=loop, **kwargs)
+        record["name"] = task.get_name()
+
+        def finished(t):
+            record["done"] = time.perf_counter()
+            record["status"] = "cancelled" if t.cancelled() else ("error" if t.exception() else "ok")
+
+        task.add_done_callback(finished)
+        self.tasks.append(record)
+        return task
+
+    def task_rows(self) -> List[Dict[str, Any]]:
+        rows = []
+        for r in self.tasks:
+            end = r["done"] or time.perf_counter()
+            rows.append({
+                "name": r["name"], "coro": r["coro"], "status": r["status"], "steps": r["steps"],
+                "start_s": round(r["created"] - self._started, 6),
+                "wait_to_start_s": round((r["first_step"] or end) - r["created"], 6),
+                "wall_s": round(end - r["created"], 6),
+                "busy_s": round(r["busy_s"], 6),  # time this task held the event loop
+                "max_step_s": round(r["max_step_s"], 6),
+            })
+        return sorted(rows, key=lambda r: r["busy_s"], reverse=True)
+
+    # --- Playwright trace ---
+
+    async def start_trace(self, context):
+        """Start a Playwright trace on a browser context (call right after creating the page)."""
+        await context.tracing.start(screenshots=True, snapshots=True, sources=False)
+
+    async def stop_trace(self, context):
+        os.makedirs(self.fallback_dir, exist_ok=True)
+        self.trace_path = os.path.join(self.fallback_dir, f".{_slug(self.name)}.trace.zip")
+        await context.tracing.stop(path=self.trace_path)
+
+    # --- Artifacts ---
+
+    def artifact_base(self) -> str:
+        if self.output_path:
+            return os.path.splitext(self.output_path)[0]
+        return os.path.join(self.fallback_dir, _slug(self.name))
+
+    def write(self) -> List[str]:
+        """Write <pdf>.prof, <pdf>.profile.txt, <pdf>.tasks.json and <pdf>.trace.zip."""
+        base = self.artifact_base()
+        os.makedirs(os.path.dirname(base) or ".", exist_ok=True)
+        written = []
+
+        self.profile.dump_stats(f"{base}.prof")  # snakeviz / pstats / gprof2dot
+        written.append(f"{base}.prof")
+
+        with open(f"{base}.profile.txt", "w", encoding="utf-8") as f:
+            f.write(f"{self.name}\nwall {self.wall_s:.3f}s, cpu {self.cpu_s:.3f}s "
+                    f"({100 * self.cpu_s / self.wall_s if self.wall_s else 0:.0f}% on CPU)\n\n")
+            stats = pstats.Stats(self.profile, stream=f)
+            stats.sort_stats("cumulative").print_stats(40)
+            stats.sort_stats("tottime").print_stats(25)
+        written.append(f"{base}.profile.txt")
+
+        with open(f"{base}.tasks.json", "w", encoding="utf-8") as f:
+            json.dump({"job": self.name, "wall_s": round(self.wall_s, 6), "cpu_s": round(self.cpu_s, 6),
+                       "tasks": self.task_rows()}, f, indent=2)
+        written.append(f"{base}.tasks.json")
+
+        if self.trace_path and os.path.exists(self.trace_path):
+            os.replace(self.trace_path, f"{base}.trace.zip")  # npx playwright show-trace <file>
+            written.append(f"{base}.trace.zip")
+        return written
+
+
+class JobProfiler:
+    """
+    Opt-in per-job profiling for the factory runners.
+
+    Chosen jobs (topic contains one of `patterns`, or every job for "all")
+    run inside cProfile with asyncio task timings and a Playwright trace of
+    the render stage. cProfile sees everything on the thread, so runners
+    run profiled jobs one at a time rather than alongside other jobs. The
+    artifacts are written next to the job's PDF. The PID is printed when a
+    profile starts, for attaching a sampler such as `py-spy record --pid`.
+
+    Usage:
+        profiler = JobProfiler.from_env()   # WORKSHEET_PROFILE="at_the_doctors,family"
+        if profiler.wants(job['topic']):
+            ok = await profiler.run(job['topic'], process_job(job), OUTPUT_DIR)
+    """
+
+    def __init__(self, patterns: Optional[List[str]] = None):
+        self.patterns = [p.strip().lower() for p in (patterns or []) if p.strip()]
+
+    @classmethod
+    def from_env(cls) -> "JobProfiler":
+        return cls((os.getenv(PROFILE_ENV) or "").split(","))
+
+    def __bool__(self):
+        return bool(self.patterns)
+
+    def wants(self, topic: str) -> bool:
+        topic = topic.lower()
+        return any(p in ("all", "*") or p in topic for p in self.patterns)
+
+    async def run(self, name: str, job: Awaitable, fallback_dir: str):
+        """Await `job` under the profiler and write its artifacts; returns the job's result."""
+        session = ProfileSession(name, fallback_dir)
+        loop = asyncio.get_running_loop()
+        previous_factory = loop.get_task_factory()
+        token = _current.set(session)
+        print(f"🔬 Profiling {name} (pid {os.getpid()})")
+
+        loop.set_task_factory(session.task_factory)
+        cpu_start, wall_start = time.process_time(), time.perf_counter()
+        result = None
+        session.profile.enable()
+        try:
+            result = await job
+        finally:
+            session.profile.disable()
+            session.cpu_s = time.process_time() - cpu_start
+            session.wall_s = time.perf_counter() - wall_start
+            loop.set_task_factory(previous_factory)
+            _current.reset(token)
+            if isinstance(result, str) and not session.output_path:
+                session.output_path = result  # generators that return the PDF path
+            written = session.write()
+            print(f"   🔬 {name}: wall {session.wall_s:.1f}s, cpu {session.cpu_s:.1f}s -> "
+                  f"{', '.join(os.path.basename(p) for p in written)}")
+        return result
@@ -0,0 +1,150 @@
+import json
+import asyncio
+from typing import Any, Callable, Dict, List, Optional
+
+from instrumentation import metrics
+
+PACK_INSTRUCTIONS = """
+You will receive {count} items as a JSON array. Each item has a "key" and an "input".
+Apply the task above to every item independently.
+
+Respond with a JSON object of this form, with exactly one result per key:
+{{"results": [{{"key": "<key of the item>", ...the output fields described above...}}]}}
+"""
+
+
+def build_packed_prompt(instructions: str, inputs: Dict[str, str]) -> str:
+    """Instructions once, followed by every item's input under its key."""
+    items = [{"key": key, "input": text} for key, text in inputs.items()]
+    return (
+        f"{instructions.strip()}\n"
+        f"{PACK_INSTRUCTIONS.format(count=len(items))}\n"
+        f"Items:\n{json.dumps(items, ensure_ascii=False, indent=1)}"
+    )
+
+
+def parse_packed_response(content: str) -> Dict[str, Dict[str, Any]]:
+    """{key: result} from a packed response. Entries without a key are dropped."""
+    data = json.loads(content)
+    results = data.get("results", []) if isinstance(data, dict) else data
+    parsed = {}
+    for entry in results or []:
+        if isinstance(entry, dict) and "key" in entry:
+            key = str(entry.pop("key"))
+            parsed.setdefault(key, entry)
+    return parsed
+
+
+class PromptPacker:
+    """
+    Sends short LLM tasks several at a time.
+
+    Up to `pack_size` items share one request: the instructions are sent once
+    and the model returns a keyed JSON array. Each result is checked with
+    `validate(item, result)`; items that are missing or invalid are retried
+    with a single-item request. Results come back as {key: result or None}.
+    Requests run under `limiter` (any async context manager, e.g. a shared
+    rate limiter) or else a semaphore of `concurrency`. A `max_tokens` in
+    `completion_params` is per item and is scaled up for packed requests.
+
+    Usage:
+        packer = PromptPacker(openai_client, "gpt-4.1-nano", INSTRUCTIONS, render_item=describe_product)
+        results = await packer.run(products)
+    """
+
+    def __init__(
+        self,
+        client,
+        model: str,
+        instructions: str,
+        render_item: Callable[[Any], str],
+        validate: Optional[Callable[[Any, Dict[str, Any]], bool]] = None,
+        key: Callable[[Any], Any] = lambda item: item['id'],
+        pack_size: int = 10,
+        concurrency: int = 4,
+        system_prompt: Optional[str] = None,
+        completion_params: Optional[Dict[str, Any]] = None,
+        limiter=None,
+    ):
+        self.client = client
+        self.model = model
+        self.instructions = instructions
+        self.render_item = render_item
+        self.validate = validate or (lambda item, result: True)
+        self.key = key
+        self.pack_size = max(1, pack_size)
+        self.system_prompt = system_prompt
+        self.completion_params = completion_params or {}
+        self.limiter = limiter or asyncio.Semaphore(concurrency)
+
+        self.requests = 0
+        self.fallbacks = 0
+
+    async def _complete(self, prompt: str, items: int = 1) -> str:
+        messages = [{"role": "user", "content": prompt}]
+        if self.system_prompt:
+            messages.insert(0, {"role": "system", "content": self.system_prompt})
+        params = {"response_format": {"type": "json_object"}, **self.completion_params}
+        if 'max_tokens' in params:
+            params['max_tokens'] *= items
+        async with self.limiter:
+            self.requests += 1
+            with metrics.span("llm_packed", model=self.model) as span:
+                response = await self.client.chat.completions.create(
+                    model=self.model,
+                    messages=messages,
+                    **params,
+                )
+        metrics.record_usage(response, stage="llm_packed", model=self.model, latency=span.duration)
+        return response.choices[0].message.content
+
+    def _check(self, item, result) -> Optional[Dict[str, Any]]:
+        try:
+            return result if isinstance(result, dict) and self.validate(item, result) else None
+        except Exception:
+            return None
+
+    async def run_single(self, item) -> Optional[Dict[str, Any]]:
+        """One item, one request (also the fallback for failed packed items)."""
+        prompt = f"{self.instructions.strip()}\n\n{self.render_item(item)}"
+        try:
+            return self._check(item, json.loads(await self._complete(prompt)))
+        except Exception as e:
+            print(f"   ❌ LLM error for {self.key(item)}: {e}")
+            return None
+
+    async def run_pack(self, pack: List[Any]) -> Dict[Any, Optional[Dict[str, Any]]]:
+        """Results for one pack of up to `pack_size` items (see run())."""
+        if len(pack) == 1:
+            return {self.key(pack[0]): await self.run_single(pack[0])}
+
+        # Positional keys keep the prompt short and avoid id quoting issues
+        inputs = {str(i): self.render_item(item) for i, item in enumerate(pack)}
+        try:
+            prompt = build_packed_prompt(self.instructions, inputs)
+            parsed = parse_packed_response(await self._complete(prompt, items=len(pack)))
+        except Exception as e:
+            print(f"   ⚠️ Packed request failed ({e}); retrying {len(pack)} items singly")
+            parsed = {}
+
+        results = {}
+        retry = []
+        for i, item in enumerate(pack):
+            result = self._check(item, parsed.get(str(i)))
+            if result is None:
+                retry.append(item)
+            else:
+                results[self.key(item)] = result
+
+        if retry:
+            self.fallbacks += len(retry)
+            singles = await asyncio.gather(*(self.run_single(item) for item in retry))
+            results.update({self.key(item): r for item, r in zip(retry, singles)})
+        return results
+
+    async def run(self, items: List[Any]) -> Dict[Any, Optional[Dict[str, Any]]]:
+        packs = [items[i:i + self.pack_size] for i in range(0, len(items), self.pack_size)]
+        results = {}
+        for pack_results in await asyncio.gather(*(self.run_pack(p) for p in packs)):
+            results.update(pack_results)
+        return results
@@ -1,7 +1,5 @@
 import os
-import json
 import asyncio
-import base64
 import re
 import requests
 from datetime import datetime
@@ -9,7 +7,13 @@ from playwright.async_api import async_playwright
 from dotenv import load_dotenv
 from supabase import create_client, Client
 from openai import AsyncOpenAI
-from pypdf import PdfReader, PdfWriter
+from bulk_writer import BulkWriter
+from prompt_packing import PromptPacker
+from instrumentation import metrics
+from assets import assets
+from render_data import send_render_data, render
+from pdf_tools import merge_pdfs
+from previews import PreviewPipeline, render_hash
 
 # Load environment variables
 load_dotenv('.env.local')
@@ -32,19 +36,7 @@ openai_client = AsyncOpenAI(api_key=OPENAI_API_KEY) if OPENAI_API_KEY else None
 
 OUTPUT_DIR = "output/published"
 os.makedirs(OUTPUT_DIR, exist_ok=True)
-
-def get_logo_base64():
-    logo_path = "worksheet_factory/logo.png"
-    if not os.path.exists(logo_path):
-        # Try current dir
-        logo_path = "logo.png"
-    
-    if not os.path.exists(logo_path):
-        return ""
-        
-    with open(logo_path, "rb") as image_file:
-        encoded_string = base64.b64encode(image_file.read()).decode('utf-8')
-        return f"data:image/png;base64,{encoded_string}"
+previews = PreviewPipeline()
 
 def slugify(text):
     text = text.lower()
@@ -97,41 +89,63 @@ def create_stripe_product(name, description, price_cents):
         print(f"   ❌ Stripe Price Creation Failed: {e}")
         return None
 
-async def generate_description(task):
-    if not openai_client:
-        return f"A reading comprehension worksheet on {task['title']}.", "Reading comprehension worksheet."
+DESCRIPTION_INSTRUCTIONS = """
+Write a product description IN ENGLISH for a reading comprehension worksheet.
 
-    prompt = f"""
-    Write a product description IN ENGLISH for a {task['language']} reading comprehension worksheet titled "{task['title']}".
-    
-    Context:
+The product includes a text, comprehension questions, and an answer key.
+
+IMPORTANT: The description MUST be written in English, even though the resource content is in another language.
+
+Output JSON format:
+{
+    "description": "Full markdown description in English...",
+    "short_summary": "One sentence summary in English..."
+}
+"""
+
+def describe_task(task):
+    return f"""
+    Worksheet: {task['language']} reading comprehension titled "{task['title']}"
     - Level: {task['curriculum_level']}
     - Category: {task['category']}
     - Subcategory: {task['subcategory']}
     - Content snippet: "{task['content'][:200]}..."
-    
-    The product includes a text, comprehension questions, and an answer key.
-    
-    IMPORTANT: The description MUST be written in English, even though the resource content is in {task['language']}.
-    
-    Output JSON format:
-    {{
-        "description": "Full markdown description in English...",
-        "short_summary": "One sentence summary in English..."
-    }}
     """
-    
-    try:
-        response = await openai_client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[{"role": "user", "content": prompt}],
-            response_format={"type": "json_object"}
-        )
-        content = json.loads(response.choices[0].message.content)
-        return content['description'], content['short_summary']
-    except Exception as e:
-        print(f"⚠️ OpenAI Error: {e}")
-        return f"Reading comprehension on {task['title']}.", f"Worksheet on {task['title']}."
+
+def valid_description(task, result):
+    return all(isinstance(result.get(k), str) and result[k].strip() for k in ("description", "short_summary"))
+
+def fallback_description(task):
+    return f"Reading comprehension on {task['title']}.", f"Worksheet on {task['title']}."
+
+async def generate_descriptions(tasks, pack_size=10):
+    """
+    Descriptions for many tasks, several per LLM request.
+    Returns {task_id: (description, short_summary)}.
+    """
+    if not openai_client:
+        return {t['id']: (f"A reading comprehension worksheet on {t['title']}.", "Reading comprehension worksheet.") for t in tasks}
+
+    packer = PromptPacker(
+        openai_client, "gpt-4o-mini", DESCRIPTION_INSTRUCTIONS,
+        render_item=describe_task, validate=valid_description, pack_size=pack_size,
+    )
+    results = await packer.run(tasks)
+
+    descriptions = {}
+    for task in tasks:
+        result = results.get(task['id'])
+        if result is None:
+            print(f"⚠️ OpenAI Error: no valid description for {task['title']}")
+            descriptions[task['id']] = fallback_description(task)
+        else:
+            descriptions[task['id']] = (result['description'], result['short_summary'])
+    if len(tasks) > 1:
+        print(f"   🤖 {packer.requests} LLM requests for {len(tasks)} descriptions")
+    return descriptions
+
+async def generate_description(task):
+    return (await generate_descriptions([task]))[task['id']]
 
 async def upload_file(file_path, bucket, folder):
     file_name = os.path.basename(file_path)
@@ -156,14 +170,22 @@ async def upload_file(file_path, bucket, folder):
             # If it failed because it exists (unlikely with timestamp), try to get url anyway
             return supabase.storage.from_(bucket).get_public_url(storage_path)
 
-async def publish_assessment(task_id):
+async def publish_assessment(task_id, writer=None, description=None):
+    """
+    Render, upload and list one task as a product.
+    If a BulkWriter is given, the product row is queued on it instead of
+    being inserted straight away. `description` is an optional pre-generated
+    (description, short_summary) pair, see generate_descriptions().
+    """
     print(f"🚀 Publishing Assessment for Task ID: {task_id}")
 
     # 1. Fetch Data
-    task_response = supabase.table("reading_comprehension_tasks").select("*").eq("id", task_id).single().execute()
+    with metrics.span("supabase_fetch", table="reading_comprehension_tasks"):
+        task_response = supabase.table("reading_comprehension_tasks").select("*").eq("id", task_id).single().execute()
     task = task_response.data
     
-    questions_response = supabase.table("reading_comprehension_questions").select("*").eq("task_id", task_id).execute()
+    with metrics.span("supabase_fetch", table="reading_comprehension_questions"):
+        questions_response = supabase.table("reading_comprehension_questions").select("*").eq("task_id", task_id).execute()
     questions = questions_response.data
 
     if not task:
@@ -177,7 +199,7 @@ async def publish_assessment(task_id):
         "title": task['title'],
         "content": task['content'],
         "questions": questions,
-        "logo_base64": get_logo_base64()
+        "logo_base64": assets.url("logo.png")  # served by assets.install(page)
     }
 
     # 3. Generate PDF & Thumbnail
@@ -187,57 +209,69 @@ async def publish_assessment(task_id):
     final_pdf = f"{OUTPUT_DIR}/{safe_title}.pdf"
     thumbnail_png = f"{OUTPUT_DIR}/{safe_title}_thumb.png"
 
-    async with async_playwright() as p:
-        browser = await p.chromium.launch()
-        page = await browser.new_page()
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+    template_path = os.path.join(script_dir, "assessment_template.html")
+    preview_hash = render_hash(data, template_path)
+    preview_files = previews.current(f"{OUTPUT_DIR}/{safe_title}", preview_hash)
 
-        # Load Template
-        script_dir = os.path.dirname(os.path.abspath(__file__))
-        template_path = os.path.join(script_dir, "assessment_template.html")
+    async def open_template(browser, **page_options):
+        page = await browser.new_page(**page_options)
+        await assets.install(page)
         await page.goto(f"file://{template_path}")
+        await send_render_data(page, data)
+        return page
 
-        # Render Student Version
-        await page.evaluate(f"renderData({json.dumps(data)}, false)")
-        await page.wait_for_timeout(500) # Wait for render
-
-        # Take Screenshot for Preview
-        preview_png = f"{OUTPUT_DIR}/{safe_title}_preview.png"
-        await page.set_viewport_size({"width": 800, "height": 800})
-        await page.screenshot(path=preview_png)
-        print(f"   📸 Generated Preview: {preview_png}")
-        
-        # Reset viewport for PDF
-        await page.set_viewport_size({"width": 1280, "height": 1024})
+    async def print_pdfs(browser):
+        page = await open_template(browser, viewport={"width": 1280, "height": 1024})
 
         # Save Student PDF
+        await render(page, show_answers=False)
+        await page.wait_for_timeout(500) # Wait for render
         await page.pdf(path=student_pdf, format="A4", print_background=True)
         
         # Render Answer Key
-        await page.evaluate(f"renderData({json.dumps(data)}, true)")
+        await render(page, show_answers=True)
         await page.wait_for_timeout(500)
         await page.pdf(path=answers_pdf, format="A4", print_background=True)
 
-        await browser.close()
+    async def capture_preview(browser):
+        # Own page at the preview size, so the print page never changes viewport
+        page = await open_template(browser, viewport={"width": 800, "height": 800})
+        await render(page, show_answers=False)
+        await page.wait_for_timeout(500)
+        return await previews.from_page(page, f"{OUTPUT_DIR}/{safe_title}", preview_hash)
+
+    with metrics.span("chromium"):
+        async with async_playwright() as p:
+            browser = await p.chromium.launch()
+            if preview_files is None:
+                _, preview_files = await asyncio.gather(print_pdfs(browser), capture_preview(browser))
+                print(f"   📸 Generated Preview: {preview_files['preview.png']}")
+            else:
+                await print_pdfs(browser)
+                print(f"   📸 Preview unchanged: {preview_files['preview.png']}")
+            await browser.close()
+    preview_png = preview_files["preview.png"]
 
     # 4. Merge PDFs
-    writer = PdfWriter()
-    for pdf in [student_pdf, answers_pdf]:
-        reader = PdfReader(pdf)
-        for p_obj in reader.pages:
-            writer.add_page(p_obj)
-    
-    with open(final_pdf, "wb") as f:
-        writer.write(f)
+    with metrics.span("pdf_merge"):
+        merge_pdfs([student_pdf, answers_pdf], final_pdf)
     print(f"   ✅ Generated Final PDF: {final_pdf}")
 
     # 5. Generate Description
-    print("   🤖 Generating Description...")
-    description, short_summary = await generate_description(task)
+    if description:
+        description, short_summary = description
+    else:
+        print("   🤖 Generating Description...")
+        with metrics.span("description"):
+            description, short_summary = await generate_description(task)
 
     # 6. Upload Files
     print("   ☁️  Uploading Files...")
-    pdf_url = await upload_file(final_pdf, "products", "files")
-    preview_url = await upload_file(preview_png, "products", "thumbnails") # Keep in thumbnails bucket for simplicity or move to previews
+    with metrics.span("upload", kind="pdf"):
+        pdf_url = await upload_file(final_pdf, "products", "files")
+    with metrics.span("upload", kind="preview"):
+        preview_url = await upload_file(preview_png, "products", "thumbnails") # Keep in thumbnails bucket for simplicity or move to previews
     
     # Upload STATIC thumbnail (or use existing URL if known to save uploads)
     # We use the local file 'worksheet_factory/thumbnail.png'
@@ -254,7 +288,8 @@ async def publish_assessment(task_id):
         # But we don't have that URL here easily.
         # Let's upload it to `products/thumbnails/static_thumb.png` and reuse that URL?
         # Or just upload it every time. It's small.
-        thumb_url = await upload_file(static_thumb_path, "products", "thumbnails")
+        with metrics.span("upload", kind="thumbnail"):
+            thumb_url = await upload_file(static_thumb_path, "products", "thumbnails")
     else:
         print("   ⚠️ Static thumbnail not found, using placeholder")
         thumb_url = "" 
@@ -265,7 +300,8 @@ async def publish_assessment(task_id):
     # 7. Create Stripe Product
     print("   💳 Creating Stripe Product...")
     price_cents = 200 # £2.00
-    stripe_price_id = create_stripe_product(task['title'], short_summary, price_cents)
+    with metrics.span("stripe"):
+        stripe_price_id = create_stripe_product(task['title'], short_summary, price_cents)
 
     # 8. Create Product in DB
     print("   💾 Saving to Database...")
@@ -304,42 +340,82 @@ async def publish_assessment(task_id):
         "updated_at": datetime.now().isoformat()
     }
     
+    if writer is not None:
+        writer.add(product_data)
+        metrics.count("products_total", status="queued")
+        print(f"   📥 Product queued for batched insert: {safe_title}")
+        return
+
     # Insert
     try:
-        res = supabase.table("products").insert(product_data).execute()
+        with metrics.span("db_insert", table="products"):
+            res = supabase.table("products").insert(product_data).execute()
+        metrics.count("products_total", status="created")
         print(f"   🎉 Product Created Successfully! ID: {res.data[0]['id']}")
         print(f"   🔗 Link: https://www.secondarymfl.com/resources/{safe_title}")
     except Exception as e:
+        metrics.count("products_total", status="failed")
         print(f"   ❌ Database Insert Failed: {e}")
 
 async def process_all_languages():
     languages = ['german']
     
+    # Fetch existing slugs once instead of querying per task
+    existing_slugs = set()
+    offset, page_size = 0, 1000
+    while True:
+        with metrics.span("supabase_fetch", table="products"):
+            rows = supabase.table("products").select("slug").range(offset, offset + page_size - 1).execute().data
+        existing_slugs.update(row['slug'] for row in rows)
+        if len(rows) < page_size:
+            break
+        offset += page_size
+    
+    # Product rows are buffered and upserted on slug in batches.
+    # The flush interval keeps long runs writing as they go.
+    writer = BulkWriter(supabase, "products", chunk_size=25, flush_interval=60, on_conflict="slug")
+    
     for lang in languages:
         print(f"\n🔎 Fetching all {lang.capitalize()} tasks...")
         
-        response = supabase.table("reading_comprehension_tasks").select("*").eq("language", lang).execute()
+        with metrics.span("supabase_fetch", table="reading_comprehension_tasks"):
+            response = supabase.table("reading_comprehension_tasks").select("*").eq("language", lang).execute()
         tasks = response.data
         
         print(f"   Found {len(tasks)} tasks.")
         
+        # Generate descriptions for all new tasks up front, several per request
+        new_tasks = [t for t in tasks if slugify(t['title']) not in existing_slugs]
+        print(f"   🤖 Generating descriptions for {len(new_tasks)} new tasks...")
+        with metrics.span("descriptions", language=lang):
+            descriptions = await generate_descriptions(new_tasks) if new_tasks else {}
+        
         for i, task in enumerate(tasks):
             print(f"\n[{lang.upper()} {i+1}/{len(tasks)}] Processing: {task['title']}")
             
             # Check if product already exists
             safe_title = slugify(task['title'])
-            existing = supabase.table("products").select("id").eq("slug", safe_title).execute()
             
-            if existing.data:
+            if safe_title in existing_slugs:
                 print(f"   ⏭️  Skipping '{task['title']}' (Product already exists)")
                 continue
                 
             try:
-                await publish_assessment(task['id'])
+                with metrics.span("publish", language=lang):
+                    await publish_assessment(task['id'], writer=writer, description=descriptions.get(task['id']))
+                existing_slugs.add(safe_title)
                 # Sleep briefly to be nice to APIs
                 await asyncio.sleep(1) 
             except Exception as e:
                 print(f"   ❌ Failed to process {task['title']}: {e}")
+    
+    with metrics.span("db_insert", table="products"):
+        writer.flush()
+    print(f"\n🎉 Created {len(writer.written)} products ({len(writer.errors)} failed, {writer.round_trips} database round-trips).")
+    for row, error in writer.errors:
+        print(f"   ❌ {row['slug']}: {error}")
+    previews.close()
+    metrics.finish()
 
 if __name__ == "__main__":
     # Run for all languages
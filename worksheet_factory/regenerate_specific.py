@@ -1,14 +1,16 @@
 
 import asyncio
+import argparse
 import os
-from factory import fetch_jobs_from_supabase, process_job, OUTPUT_DIR
+from factory import fetch_jobs_from_supabase, generate_worksheets
+from profiling import JobProfiler
 
 # Define the targets we want to regenerate
 TARGETS = [
     "at_the_doctors"
 ]
 
-async def main():
+async def main(profile=False):
     print("🚀 Starting targeted regeneration...")
     
     # 1. Fetch all jobs
@@ -30,23 +32,12 @@ async def main():
     for job in selected_jobs:
         print(f" - {job['display_name']}")
         
-    # 3. Process them
-    print(f"\n🚀 Regenerating {len(selected_jobs)} worksheets...\n")
-    
-    semaphore = asyncio.Semaphore(3)  # Limit concurrent processing
-    
-    async def process_with_semaphore(job):
-        async with semaphore:
-            return await process_job(job)
-    
-    results = await asyncio.gather(*(process_with_semaphore(j) for j in selected_jobs))
-    
-    # Summary
-    success_count = sum(1 for r in results if r)
-    print(f"\n" + "="*60)
-    print(f"✅ Completed: {success_count}/{len(selected_jobs)} worksheets generated")
-    print(f"📁 Output folder: {OUTPUT_DIR}/")
-    print("="*60 + "\n")
+    # 3. Process them (--profile writes cProfile/task/trace artifacts next to each PDF)
+    profiler = JobProfiler(TARGETS) if profile else JobProfiler.from_env()
+    await generate_worksheets(selected_jobs, profiler=profiler)
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    parser = argparse.ArgumentParser(description="Regenerate the TARGETS worksheets.")
+    parser.add_argument("--profile", action="store_true", help="profile each regenerated worksheet")
+    args = parser.parse_args()
+    asyncio.run(main(profile=args.profile))
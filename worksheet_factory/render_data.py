@@ -0,0 +1,26 @@
+# Each render gets its own copy, as with the old per-call JSON literal, in case
+# renderData shuffles or annotates the object it is given.
+_STORE = "d => { window.__renderData = d; }"
+_RENDER = "a => renderData(structuredClone(window.__renderData), a)"
+
+
+async def send_render_data(page, data):
+    """
+    Send the worksheet data to a template page once per job, as a structured
+    page.evaluate argument rather than a json.dumps'ed script literal: Chromium
+    doesn't parse the payload as code for every version, and quotes or
+    </script> in the content need no escaping. Call again after page.goto().
+
+    Usage:
+        await page.goto(f"file://{template_path}")
+        await send_render_data(page, data)
+        await render(page, show_answers=False)
+        ...
+        await render(page, show_answers=True)
+    """
+    await page.evaluate(_STORE, data)
+
+
+async def render(page, show_answers: bool = False):
+    """Run the template's renderData(data, showAnswers) on the data from send_render_data()."""
+    await page.evaluate(_RENDER, bool(show_answers))
@@ -2,6 +2,8 @@ import os
 import asyncio
 from dotenv import load_dotenv
 from supabase import create_client, Client
+from bulk_writer import BulkWriter, PRODUCT_SELECT
+from url_verifier import UrlVerifier
 
 # Load environment variables
 load_dotenv('.env.local')
@@ -20,12 +22,13 @@ async def restore_previews():
     print("🔎 Fetching all Reading Comprehension products...")
     
     # Fetch all products that are worksheets.
-    response = supabase.table("products").select("id, name, file_path, preview_images").eq("resource_type", "Worksheet").execute()
+    response = supabase.table("products").select(f"{PRODUCT_SELECT}, file_path, preview_images").eq("resource_type", "Worksheet").execute()
     products = response.data
     
     print(f"   Found {len(products)} products to check.")
     
-    updated_count = 0
+    # (product, restored_url) pairs to verify before writing
+    candidates = []
     
     for i, product in enumerate(products):
         # Check if preview_images looks like the static thumbnail
@@ -60,24 +63,27 @@ async def restore_previews():
             
             if "/files/" in file_path and ".pdf" in file_path:
                 restored_url = file_path.replace("/files/", "/thumbnails/").replace(".pdf", "_thumb.png")
-                
-                # Verify if it exists? 
-                # Making a HEAD request is slow for 600 items. 
-                # Let's assume it exists if it was created by our script.
-                
-                print(f"   🔧 Restoring preview for {product['name']}...")
-                
-                try:
-                    supabase.table("products").update({
-                        "preview_images": [restored_url]
-                    }).eq("id", product['id']).execute()
-                    updated_count += 1
-                except Exception as e:
-                    print(f"   ❌ Error updating {product['name']}: {e}")
+                candidates.append((product, restored_url))
             else:
                 print(f"   ⚠️ Could not parse file path for {product['name']}: {file_path}")
 
-    print(f"🎉 Restored {updated_count} products!")
+    # Verify the reconstructed URLs exist (concurrent HEAD requests, cached between runs)
+    print(f"   🔍 Verifying {len(candidates)} reconstructed preview URLs...")
+    exists = await UrlVerifier().verify(url for _, url in candidates)
+    
+    writer = BulkWriter(supabase, "products")
+    
+    for product, restored_url in candidates:
+        if exists.get(restored_url):
+            print(f"   🔧 Restoring preview for {product['name']}...")
+            writer.update(product, {"preview_images": [restored_url]})
+        else:
+            print(f"   ⚠️ Preview not found for {product['name']}: {restored_url}")
+
+    writer.flush()
+    if writer.errors:
+        print(f"   ❌ {len(writer.errors)} products failed to update.")
+    print(f"🎉 Restored {len(writer.written)} products! ({writer.round_trips} database round-trips)")
 
 if __name__ == "__main__":
     asyncio.run(restore_previews())
@@ -0,0 +1,177 @@
+import os
+import sys
+import json
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+from timestamp_matcher import parse_timestamp
+
+INDEX_PATH = "output/storage_index.json"
+DEFAULT_FOLDERS = ["files", "previews", "thumbnails"]
+
+
+def _entry_from_object(obj: Dict[str, Any]) -> Dict[str, Any]:
+    """Keep only what the restore/inspect scripts need from a storage list item."""
+    metadata = obj.get('metadata') or {}
+    return {
+        "name": obj['name'],
+        "size": metadata.get('size') or metadata.get('contentLength'),
+        "created_at": obj.get('created_at'),
+        "hash": (metadata.get('eTag') or '').strip('"') or None,
+        "mimetype": metadata.get('mimetype'),
+    }
+
+
+class StorageIndex:
+    """
+    Local index of objects in a Supabase storage bucket, one list per folder.
+
+    Folders are listed with several pages in flight at once and saved to
+    `output/storage_index.json`. Later refreshes only page through objects
+    newer than the last one seen, so scripts can query the index instead of
+    re-listing the bucket on every run. Use `full=True` to rebuild a folder
+    (e.g. after objects were deleted).
+    """
+
+    def __init__(self, client, bucket: str = "products", path: str = INDEX_PATH,
+                 page_size: int = 100, concurrency: int = 8):
+        self.client = client
+        self.bucket = bucket
+        self.path = path
+        self.page_size = page_size
+        self.concurrency = concurrency
+        self.data = self._load()
+
+    def _load(self) -> Dict[str, Any]:
+        if os.path.exists(self.path):
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get('bucket') == self.bucket:
+                return data
+        return {"bucket": self.bucket, "folders": {}}
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.data, f, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+
+    # --- Listing ---
+
+    def _list_page(self, folder: str, offset: int, order: str) -> List[Dict[str, Any]]:
+        return self.client.storage.from_(self.bucket).list(folder, {
+            "limit": self.page_size,
+            "offset": offset,
+            "sortBy": {"column": "created_at", "order": order},
+        }) or []
+
+    def _list_concurrent(self, folder: str) -> List[Dict[str, Any]]:
+        """List a whole folder, fetching `concurrency` pages per round."""
+        objects = []
+        offset = 0
+        with ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+            while True:
+                offsets = [offset + i * self.page_size for i in range(self.concurrency)]
+                pages = list(pool.map(lambda o: self._list_page(folder, o, "asc"), offsets))
+                done = False
+                for page in pages:
+                    objects.extend(page)
+                    if len(page) < self.page_size:
+                        done = True
+                        break
+                if done:
+                    break
+                offset = offsets[-1] + self.page_size
+        return objects
+
+    def _list_newer_than(self, folder: str, cursor: str) -> List[Dict[str, Any]]:
+        """Page newest-first until we reach objects already in the index."""
+        cursor_ts = _ts(cursor)
+        objects = []
+        offset = 0
+        while True:
+            page = self._list_page(folder, offset, "desc")
+            newer = [o for o in page if _ts(o.get('created_at')) > cursor_ts]
+            objects.extend(newer)
+            if len(newer) < len(page) or len(page) < self.page_size:
+                break
+            offset += self.page_size
+        return objects
+
+    def refresh(self, folders: Optional[List[str]] = None, full: bool = False) -> Dict[str, int]:
+        """
+        Bring the given folders up to date. Returns {folder: new_object_count}.
+        """
+        folders = folders or DEFAULT_FOLDERS
+        added = {}
+        for folder in folders:
+            known = self.data['folders'].get(folder)
+            if full or not known or not known.get('cursor'):
+                objects = self._list_concurrent(folder)
+                entries = {}
+            else:
+                objects = self._list_newer_than(folder, known['cursor'])
+                entries = {e['name']: e for e in known['entries']}
+
+            before = len(entries)
+            for obj in objects:
+                # Skip folder placeholders (no id / metadata)
+                if obj.get('id') is None and not obj.get('metadata'):
+                    continue
+                entries[obj['name']] = _entry_from_object(obj)
+
+            ordered = sorted(entries.values(), key=lambda e: _ts(e.get('created_at')))
+            cursor = next((e['created_at'] for e in reversed(ordered) if e.get('created_at')), None)
+            self.data['folders'][folder] = {
+                "cursor": cursor,
+                "refreshed_at": datetime.now().isoformat(),
+                "entries": ordered,
+            }
+            added[folder] = len(entries) - before
+            print(f"   🗂️  {folder}: {len(ordered)} objects indexed (+{added[folder]})")
+
+        self.save()
+        return added
+
+    # --- Queries ---
+
+    def files(self, folder: str) -> List[Dict[str, Any]]:
+        """All indexed objects in `folder`, oldest first."""
+        return list(self.data['folders'].get(folder, {}).get('entries', []))
+
+    def get(self, folder: str, name: str) -> Optional[Dict[str, Any]]:
+        return next((e for e in self.files(folder) if e['name'] == name), None)
+
+    def find_by_hash(self, content_hash: str) -> List[Dict[str, Any]]:
+        """Objects in any folder with the given content hash (duplicate uploads)."""
+        return [
+            {**e, "folder": folder}
+            for folder, info in self.data['folders'].items()
+            for e in info['entries']
+            if e.get('hash') == content_hash
+        ]
+
+
+def _ts(value: Optional[str]) -> float:
+    return parse_timestamp(value) or 0.0
+
+
+if __name__ == "__main__":
+    from dotenv import load_dotenv
+    from supabase import create_client
+
+    load_dotenv('.env.local')
+    url = os.getenv("NEXT_PUBLIC_SUPABASE_URL")
+    key = os.getenv("SUPABASE_SERVICE_ROLE_KEY")
+    if not url or not key:
+        raise ValueError("Supabase credentials missing.")
+
+    # Usage: python storage_index.py [--full] [folder ...]
+    args = sys.argv[1:]
+    full = "--full" in args
+    folders = [a for a in args if not a.startswith("--")] or None
+
+    print("🔎 Refreshing storage index...")
+    StorageIndex(create_client(url, key)).refresh(folders, full=full)
+    print(f"✅ Index saved to {INDEX_PATH}")
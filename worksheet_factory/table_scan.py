@@ -0,0 +1,93 @@
+import json
+from collections import defaultdict
+from typing import Any, Callable, Dict, List, Optional
+
+from bulk_writer import BulkWriter
+
+
+def scan_rows(client, table: str, columns: str, query_filter: Optional[Callable] = None,
+              page_size: int = 1000) -> List[Dict[str, Any]]:
+    """
+    Fetch all rows of `table` matching the server-side filter.
+    `query_filter(query)` receives the select builder and returns it with
+    filters applied (e.g. `lambda q: q.contains("tags", ["reading comprehension"])`).
+    """
+    rows = []
+    offset = 0
+    while True:
+        query = client.table(table).select(columns)
+        if query_filter:
+            query = query_filter(query)
+        page = query.order("id").range(offset, offset + page_size - 1).execute().data
+        rows.extend(page)
+        if len(page) < page_size:
+            break
+        offset += page_size
+    return rows
+
+
+def scan_and_patch(
+    client,
+    table: str,
+    columns: str,
+    patch: Callable[[Dict[str, Any]], Optional[Dict[str, Any]]],
+    query_filter: Optional[Callable] = None,
+    key: str = "id",
+    batch_size: int = 100,
+    writer: Optional[BulkWriter] = None,
+    dry_run: bool = False,
+) -> Dict[str, Any]:
+    """
+    Scan rows matching `query_filter`, compute changes with `patch(row)` and
+    write them in bulk.
+
+    `patch` returns a dict of column changes, or None/{} to leave the row
+    alone. Rows that receive identical changes are written together with
+    `update(changes).in_(key, ids)`; rows with row-specific changes are
+    upserted through a BulkWriter, which batches rows by the columns they
+    change so e.g. a tags-only patch never touches resource_type.
+
+    Returns a summary: {"scanned", "matched", "updated", "errors", "round_trips"}.
+    """
+    rows = scan_rows(client, table, columns, query_filter)
+
+    groups = defaultdict(list)  # serialised changes -> [(row, changes)]
+    for row in rows:
+        changes = patch(row)
+        if changes:
+            groups[json.dumps(changes, sort_keys=True, default=str)].append((row, changes))
+
+    matched = sum(len(g) for g in groups.values())
+    summary = {"scanned": len(rows), "matched": matched, "updated": 0, "errors": [], "round_trips": 0}
+    if dry_run or not matched:
+        return summary
+
+    writer = writer or BulkWriter(client, table, on_conflict=key)
+    rounds_before = writer.round_trips
+    written_before = len(writer.written)
+    errors_before = len(writer.errors)
+
+    for group in groups.values():
+        if len(group) == 1:
+            row, changes = group[0]
+            writer.update(row, changes)
+            continue
+
+        # Same changes for many rows: one UPDATE per batch of ids
+        changes = group[0][1]
+        ids = [row[key] for row, _ in group]
+        for i in range(0, len(ids), batch_size):
+            batch = ids[i:i + batch_size]
+            try:
+                client.table(table).update(changes).in_(key, batch).execute()
+                summary["updated"] += len(batch)
+            except Exception as e:
+                summary["errors"].append((batch, str(e)))
+                print(f"      ❌ Error updating batch of {len(batch)}: {e}")
+            summary["round_trips"] += 1
+
+    writer.flush()
+    summary["updated"] += len(writer.written) - written_before
+    summary["errors"].extend(writer.errors[errors_before:])
+    summary["round_trips"] += writer.round_trips - rounds_before
+    return summary
@@ -0,0 +1,98 @@
+import heapq
+from bisect import bisect_left
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+
+def parse_timestamp(value: Optional[str]) -> Optional[float]:
+    """
+    Parse a Supabase timestamp (e.g. '2025-11-29T21:56:32.52+00:00' or '...Z')
+    into epoch seconds. Returns None if the value is missing or unparseable.
+    """
+    if not value:
+        return None
+    try:
+        dt = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    except ValueError:
+        # Fallback: parse up to seconds
+        try:
+            dt = datetime.fromisoformat(value[:19] + "+00:00")
+        except ValueError:
+            return None
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return dt.timestamp()
+
+
+class TimestampMatcher:
+    """
+    Matches items (e.g. products) to files by nearest `created_at`.
+
+    File timestamps are parsed once and sorted; each item looks up its
+    neighbours with bisect. Assignment is one-to-one and greedy by smallest
+    time difference, so a file is never given to two items.
+    """
+
+    def __init__(self, files: List[Dict[str, Any]], time_key: str = 'created_at'):
+        entries = []
+        for f in files:
+            ts = parse_timestamp(f.get(time_key))
+            if ts is not None:
+                entries.append((ts, f))
+        entries.sort(key=lambda e: e[0])
+        self.times = [ts for ts, _ in entries]
+        self.files = [f for _, f in entries]
+
+    def nearest(self, ts: float) -> Tuple[Optional[Dict[str, Any]], float]:
+        """Nearest file to `ts` regardless of assignment, with its distance in seconds."""
+        if not self.times:
+            return None, float('inf')
+        pos = bisect_left(self.times, ts)
+        best, best_diff = None, float('inf')
+        for idx in (pos - 1, pos):
+            if 0 <= idx < len(self.times):
+                diff = abs(self.times[idx] - ts)
+                if diff < best_diff:
+                    best, best_diff = self.files[idx], diff
+        return best, best_diff
+
+    def assign(self, items: List[Dict[str, Any]], threshold: float, time_key: str = 'created_at') -> Dict[int, Tuple[Dict[str, Any], float]]:
+        """
+        One-to-one assignment of items to files within `threshold` seconds.
+        Returns {item_index: (file, diff_seconds)} for matched items.
+        """
+        n = len(self.times)
+        heap = []
+        # Per item: next unexplored index to the left and to the right
+        cursors = {}
+
+        def push(item_idx, ts, file_idx, direction):
+            if 0 <= file_idx < n:
+                diff = abs(self.times[file_idx] - ts)
+                if diff < threshold:
+                    heapq.heappush(heap, (diff, item_idx, file_idx, direction))
+
+        for item_idx, item in enumerate(items):
+            ts = parse_timestamp(item.get(time_key))
+            if ts is None:
+                continue
+            pos = bisect_left(self.times, ts)
+            cursors[item_idx] = ts
+            push(item_idx, ts, pos - 1, -1)
+            push(item_idx, ts, pos, 1)
+
+        assigned: Dict[int, Tuple[Dict[str, Any], float]] = {}
+        taken = set()
+
+        while heap:
+            diff, item_idx, file_idx, direction = heapq.heappop(heap)
+            if item_idx in assigned:
+                continue
+            if file_idx in taken:
+                # Walk further out in the same direction for this item
+                push(item_idx, cursors[item_idx], file_idx + direction, direction)
+                continue
+            assigned[item_idx] = (self.files[file_idx], diff)
+            taken.add(file_idx)
+
+        return assigned
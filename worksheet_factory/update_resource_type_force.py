@@ -2,6 +2,7 @@ import os
 import asyncio
 from supabase import create_client, Client
 from dotenv import load_dotenv
+from table_scan import scan_and_patch
 
 load_dotenv('.env.local')
 url = os.getenv("NEXT_PUBLIC_SUPABASE_URL")
@@ -12,52 +13,63 @@ if not url or not key:
 
 supabase = create_client(url, key)
 
+TAG = "reading comprehension"
+
+def tag_casings(tag):
+    """The spellings a tag turns up in: lowercase, Sentence case, Title Case and UPPERCASE."""
+    return sorted({tag.lower(), tag.capitalize(), tag.title(), tag.upper()})
+
+def only_tagged_rows(query):
+    """
+    Server-side filter: products tagged Reading Comprehension in any of the
+    casings from tag_casings(). Array containment is case sensitive, so each
+    casing gets its own `tags.cs` term; fix_reading_comprehension still
+    lowercases the tags as a guard.
+    """
+    return query.or_(",".join(f'tags.cs.{{"{casing}"}}' for casing in tag_casings(TAG)))
+
+def fix_reading_comprehension(p):
+    tags = p.get('tags') or []
+    lower_tags = [t.lower() for t in tags]
+
+    if TAG not in lower_tags:
+        return None
+
+    updates = {}
+
+    # 1. Ensure resource_type is Reading Comprehension
+    if p.get('resource_type') != 'Reading Comprehension':
+        updates['resource_type'] = 'Reading Comprehension'
+
+    # 2. Remove 'worksheet' tag if present
+    if 'worksheet' in lower_tags:
+        # Filter out 'worksheet' (case insensitive)
+        updates['tags'] = [t for t in tags if t.lower() != 'worksheet']
+
+    if updates:
+        print(f"   🔧 Updating {p['name']}...")
+    return updates
+
 async def update_types_force():
-    print("🔎 Fetching products with 'reading comprehension' tag...")
-    
-    # Fetch products that have 'reading comprehension' in tags
-    # We need to be careful. The tags column is an array of text.
-    # We want to find any product where the tags array contains 'reading comprehension' (case insensitive ideally, but tags are usually lower).
-    
-    # Also, let's check if there are products with "Reading Comprehension" (title case) in tags just in case.
-    
-    res = supabase.table("products").select("id, name, tags, resource_type").execute()
-    all_products = res.data
-    
-    print(f"   Scanned {len(all_products)} total products.")
-    
-    ids_to_update = []
-    
-    for p in all_products:
-        tags = p.get('tags') or []
-        lower_tags = [t.lower() for t in tags]
-        
-        is_reading_comp = 'reading comprehension' in lower_tags
-        has_worksheet = 'worksheet' in lower_tags
-        
-        if is_reading_comp:
-            updates = {}
-            
-            # 1. Ensure resource_type is Reading Comprehension
-            if p.get('resource_type') != 'Reading Comprehension':
-                updates['resource_type'] = 'Reading Comprehension'
-                
-            # 2. Remove 'worksheet' tag if present
-            if has_worksheet:
-                # Filter out 'worksheet' (case insensitive)
-                new_tags = [t for t in tags if t.lower() != 'worksheet']
-                updates['tags'] = new_tags
-                
-            if updates:
-                print(f"   🔧 Updating {p['name']}...")
-                try:
-                    supabase.table("products").update(updates).eq("id", p['id']).execute()
-                    ids_to_update.append(p['id'])
-                except Exception as e:
-                    print(f"      ❌ Error updating: {e}")
-
-    print(f"🎉 Updated {len(ids_to_update)} products.")
-            
+    print("🔎 Fetching reading comprehension products that need fixing...")
+
+    # Only Reading Comprehension rows (and only the columns we need) are
+    # transferred; the casing match is repeated here as a guard.
+    # Rows that only need resource_type changed are updated together with one
+    # UPDATE ... WHERE id IN (...) per batch; the rest are upserted in bulk.
+    summary = scan_and_patch(
+        supabase,
+        "products",
+        "id, name, tags, resource_type",
+        patch=fix_reading_comprehension,
+        query_filter=only_tagged_rows,
+    )
+
+    print(f"   Scanned {summary['scanned']} reading comprehension products.")
+    if summary['errors']:
+        print(f"   ❌ {len(summary['errors'])} updates failed.")
+    print(f"🎉 Updated {summary['updated']} products ({summary['round_trips']} database round-trips).")
+
     print("🎉 Done.")
 
 if __name__ == "__main__":
@@ -0,0 +1,173 @@
+import os
+import json
+import time
+import asyncio
+from typing import Dict, Iterable, Optional
+
+import httpx
+
+CACHE_PATH = "output/url_check_cache.json"
+
+
+class UrlVerifier:
+    """
+    Checks that URLs exist with HEAD requests over one pooled async client.
+
+    At most `concurrency` requests are in flight. Results are cached on disk
+    for `ttl` seconds so re-runs only check new URLs. Servers that refuse HEAD
+    (405) get a one-byte ranged GET instead.
+
+    Usage:
+        verifier = UrlVerifier()
+        results = await verifier.verify(urls)   # {url: True/False}
+    """
+
+    def __init__(self, concurrency: int = 32, timeout: float = 10.0,
+                 ttl: Optional[float] = 24 * 3600, cache_path: Optional[str] = CACHE_PATH):
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self.ttl = ttl
+        self.cache_path = cache_path
+        self.cache: Dict[str, Dict] = self._load_cache()
+
+    def _load_cache(self) -> Dict[str, Dict]:
+        if self.cache_path and os.path.exists(self.cache_path):
+            with open(self.cache_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        return {}
+
+    def save_cache(self):
+        if not self.cache_path:
+            return
+        os.makedirs(os.path.dirname(self.cache_path) or '.', exist_ok=True)
+        with open(self.cache_path, 'w', encoding='utf-8') as f:
+            json.dump(self.cache, f)
+
+    def _cached(self, url: str) -> Optional[bool]:
+        entry = self.cache.get(url)
+        if not entry:
+            return None
+        if self.ttl is not None and time.time() - entry['checked_at'] > self.ttl:
+            return None
+        return entry['ok']
+
+    async def _check(self, client: httpx.AsyncClient, semaphore: asyncio.Semaphore, url: str) -> bool:
+        async with semaphore:
+            try:
+                response = await client.head(url)
+                if response.status_code == 405:
+                    response = await client.get(url, headers={"Range": "bytes=0-0"})
+                ok = response.status_code < 400
+                status = response.status_code
+            except httpx.HTTPError as e:
+                # Network errors are not cached so they get retried next run
+                print(f"   ⚠️ Could not reach {url}: {e}")
+                return False
+        self.cache[url] = {"ok": ok, "status": status, "checked_at": time.time()}
+        return ok
+
+    async def verify(self, urls: Iterable[str]) -> Dict[str, bool]:
+        """Return {url: exists} for every URL, checking uncached ones concurrently."""
+        results: Dict[str, bool] = {}
+        to_check = []
+        for url in dict.fromkeys(urls):
+            cached = self._cached(url)
+            if cached is None:
+                to_check.append(url)
+            else:
+                results[url] = cached
+
+        if to_check:
+            semaphore = asyncio.Semaphore(self.concurrency)
+            limits = httpx.Limits(max_connections=self.concurrency, max_keepalive_connections=self.concurrency)
+            async with httpx.AsyncClient(limits=limits, timeout=self.timeout, follow_redirects=True) as client:
+                checked = await asyncio.gather(*(self._check(client, semaphore, u) for u in to_check))
+            results.update(zip(to_check, checked))
+            self.save_cache()
+
+        return results
+
+
+def run_stub_server(port: int = 0, delay: float = 1.0):
+    """
+    Start a local server standing in for storage: /ok (200), /missing (404),
+    /redirect (302 -> /ok), /redirect-missing (302 -> /missing), /no-head
+    (405 on HEAD, 206 on GET) and /slow (answers after `delay` seconds).
+    Returns (server, base_url, hits); call server.shutdown() when done.
+    """
+    import threading
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    hits = {"count": 0}
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"  # keep-alive
+
+        def log_message(self, *args):
+            pass
+
+        def do_HEAD(self):
+            self._answer(head=True)
+
+        def do_GET(self):
+            self._answer(head=False)
+
+        def _answer(self, head: bool):
+            hits["count"] += 1
+            path = self.path.split("?", 1)[0]
+            if path == "/slow":
+                time.sleep(delay)
+                self._send(200)
+            elif path == "/ok":
+                self._send(200)
+            elif path == "/redirect":
+                self._send(302, {"Location": "/ok"})
+            elif path == "/redirect-missing":
+                self._send(302, {"Location": "/missing"})
+            elif path == "/no-head":
+                self._send(405 if head else 206)
+            else:
+                self._send(404)
+
+        def _send(self, status: int, headers: Optional[Dict[str, str]] = None):
+            self.send_response(status)
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+
+    server = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}", hits
+
+
+def main():
+    """Self-check against the stub server (python url_verifier.py)."""
+    server, base_url, hits = run_stub_server(delay=1.0)
+    expected = {
+        f"{base_url}/ok": True,
+        f"{base_url}/missing": False,
+        f"{base_url}/redirect": True,
+        f"{base_url}/redirect-missing": False,
+        f"{base_url}/no-head": True,
+        f"{base_url}/slow": False,  # timeout
+    }
+    try:
+        verifier = UrlVerifier(concurrency=8, timeout=0.3, cache_path=None)
+        start = time.time()
+        results = asyncio.run(verifier.verify(expected))
+        for url, ok in expected.items():
+            assert results[url] == ok, f"{url}: expected {ok}, got {results[url]}"
+        print(f"✅ {len(expected)} URLs checked in {time.time() - start:.2f}s ({hits['count']} requests)")
+
+        # Everything but the timed-out URL is cached, so only /slow is requested again
+        before = hits["count"]
+        assert asyncio.run(verifier.verify(expected)) == results
+        assert hits["count"] - before == 1, hits["count"] - before
+        print("✅ Re-run served from cache (timeouts are retried)")
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()